@@ -0,0 +1,72 @@
+"""
+Conversation context store for TERRA Co-Pilot
+
+Each conversation gets its own context (site, equipment, hour) instead of
+sharing one mutable dict on the orchestrator singleton, so concurrent chats
+cannot overwrite each other's site. Contexts live in a bounded LRU with an
+idle TTL; the store is per process, and requests carry site_id, so a
+conversation that lands on another uvicorn worker simply starts from the
+defaults plus whatever the request supplies.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class ConversationContext:
+    """Per-conversation state threaded through the orchestrator handlers"""
+    conversation_id: str
+    site_id: str = "ALPHA"
+    equipment_id: Optional[str] = None
+    current_hour: int = 10
+    last_seen: float = field(default_factory=time.monotonic)
+
+    def update(self, **kwargs):
+        for key, value in kwargs.items():
+            if not hasattr(self, key):
+                raise AttributeError(f"Unknown context field: {key}")
+            setattr(self, key, value)
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("last_seen")
+        return data
+
+
+class ConversationStore:
+    """Thread-safe bounded LRU of conversation contexts with idle expiry"""
+
+    def __init__(self, max_conversations: int = 1000, idle_ttl: float = 3600.0):
+        self.max_conversations = max_conversations
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._contexts: "OrderedDict[str, ConversationContext]" = OrderedDict()
+
+    def get(self, conversation_id: Optional[str] = None) -> ConversationContext:
+        """Return the context for a conversation, creating it if new or expired."""
+        conversation_id = conversation_id or uuid.uuid4().hex
+        now = time.monotonic()
+        with self._lock:
+            context = self._contexts.get(conversation_id)
+            if context is not None and now - context.last_seen > self.idle_ttl:
+                context = None
+            if context is None:
+                context = ConversationContext(conversation_id=conversation_id)
+                self._contexts[conversation_id] = context
+            context.last_seen = now
+            self._contexts.move_to_end(conversation_id)
+            while len(self._contexts) > self.max_conversations:
+                self._contexts.popitem(last=False)
+            return context
+
+    def discard(self, conversation_id: str):
+        with self._lock:
+            self._contexts.pop(conversation_id, None)
+
+    def __len__(self) -> int:
+        return len(self._contexts)
@@ -3,6 +3,7 @@ Agent Orchestrator - Coordinates all agents for TERRA Co-Pilot
 Uses intent classification to route to appropriate agents
 """
 
+import asyncio
 import re
 from typing import Any, Dict, List, Optional
 import logging
@@ -14,17 +15,113 @@ try:
     from .historian import HistorianAgent
     from .route_advisor import RouteAdvisorAgent
     from .watchdog import WatchdogAgent
+    from .conversation import ConversationContext, ConversationStore
+    from .plan import PlanResult, Step, execute_plan
     from ..services import get_snowflake_service
 except ImportError:
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from agents.historian import HistorianAgent
     from agents.route_advisor import RouteAdvisorAgent
     from agents.watchdog import WatchdogAgent
+    from agents.conversation import ConversationContext, ConversationStore
+    from agents.plan import PlanResult, Step, execute_plan
     from services import get_snowflake_service
 
 logger = logging.getLogger(__name__)
 
 
+# Intent patterns in priority order - the first intent with any match wins
+INTENT_PATTERNS = [
+    # Ghost Cycle / Fuel patterns
+    ("ghost_cycle", [
+        r"ghost.?cycle",
+        r"fuel.?waste",
+        r"idle",
+        r"inefficien",
+        r"burning fuel",
+        r"not working"
+    ]),
+    # Route / Traffic patterns
+    ("route", [
+        r"route",
+        r"traffic",
+        r"choke.?point",
+        r"congestion",
+        r"bottleneck",
+        r"divert",
+        r"alternate"
+    ]),
+    # Cycle time patterns
+    ("cycle_time", [
+        r"cycle.?time",
+        r"how long",
+        r"predict.*time",
+        r"estimate.*time"
+    ]),
+    # ML explanation patterns
+    ("ml_explain", [
+        r"why.*detect",
+        r"explain.*model",
+        r"feature.*import",
+        r"shap",
+        r"what.*predict"
+    ]),
+    # Analytical patterns
+    ("analytical", [
+        r"how many",
+        r"total",
+        r"count",
+        r"average",
+        r"list",
+        r"show me.*data",
+        r"statistics"
+    ]),
+    # Search / History patterns
+    ("search", [
+        r"search",
+        r"find",
+        r"safety",
+        r"geotechnical",
+        r"document",
+        r"procedure",
+        r"history"
+    ]),
+    # Status patterns
+    ("status", [
+        r"status",
+        r"current",
+        r"right now",
+        r"fleet",
+        r"equipment"
+    ]),
+]
+
+_INTENT_RANK = {intent: rank for rank, (intent, _) in enumerate(INTENT_PATTERNS)}
+
+# One zero-width lookahead per position, with one named group per intent in
+# priority order. At each position the highest-priority intent that matches
+# there is reported, so the best rank over all positions equals the result of
+# trying each pattern list in turn - without rescanning the message per
+# pattern, and without greedy ".*" patterns hiding overlapping matches.
+_INTENT_MATCHER = re.compile(
+    "(?=" + "|".join(
+        f"(?P<{intent}>{'|'.join(patterns)})" for intent, patterns in INTENT_PATTERNS
+    ) + ")"
+)
+
+
+def classify_intent(message: str) -> str:
+    """Return the highest-priority intent matched by message, or "general"."""
+    best = len(INTENT_PATTERNS)
+    for match in _INTENT_MATCHER.finditer(message.lower()):
+        rank = _INTENT_RANK[match.lastgroup]
+        if rank < best:
+            best = rank
+            if rank == 0:
+                break
+    return INTENT_PATTERNS[best][0] if best < len(INTENT_PATTERNS) else "general"
+
+
 class AgentOrchestrator:
     """
     Orchestrates multiple agents to handle user requests for construction operations.
@@ -43,17 +140,17 @@ class AgentOrchestrator:
         self.sf = get_snowflake_service()
         self.logger = logging.getLogger("orchestrator")
         
-        # Conversation context
-        self.context = {
-            "site_id": "ALPHA",
-            "equipment_id": None,
-            "current_hour": 10
-        }
+        # Per-conversation context; the orchestrator itself holds no request state
+        self.conversations = ConversationStore(
+            max_conversations=int(os.getenv("TERRA_MAX_CONVERSATIONS", "1000")),
+            idle_ttl=float(os.getenv("TERRA_CONVERSATION_TTL_SECONDS", "3600")),
+        )
     
     async def process_message(
         self, 
         message: str,
-        site_id: Optional[str] = None
+        site_id: Optional[str] = None,
+        conversation_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Process a user message and return response.
@@ -61,15 +158,18 @@ class AgentOrchestrator:
         Args:
             message: User's natural language message
             site_id: Optional site context
+            conversation_id: Conversation to continue; a new one is started if omitted
             
         Returns:
-            Dict with response, sources, and any context updates
+            Dict with response, sources, any context updates and the conversation_id
         """
         self.logger.info(f"Processing message: {message[:100]}")
         
+        ctx = self.conversations.get(conversation_id)
+        
         # Update context if site provided
         if site_id:
-            self.context["site_id"] = site_id
+            ctx.site_id = site_id
         
         # Classify intent
         intent = self._classify_intent(message)
@@ -81,47 +181,47 @@ class AgentOrchestrator:
         context_data = {}
         
         if intent == "analytical":
-            result = await self._handle_analytical(message)
+            result = await self._handle_analytical(message, ctx)
             response_parts.append(result["response"])
             sources.extend(result.get("sources", []))
             context_data["query_results"] = result.get("data", {})
             
         elif intent in ["ghost_cycle", "fuel", "efficiency"]:
-            result = await self._handle_ghost_cycle(message)
+            result = await self._handle_ghost_cycle(message, ctx)
             response_parts.append(result["response"])
             sources.extend(result.get("sources", []))
             context_data["ghost_cycles"] = result.get("data", {})
             
         elif intent in ["route", "traffic", "choke", "congestion"]:
-            result = await self._handle_routing(message)
+            result = await self._handle_routing(message, ctx)
             response_parts.append(result["response"])
             sources.extend(result.get("sources", []))
             context_data["route_recommendations"] = result.get("data", {})
             
         elif intent in ["search", "history", "safety", "document"]:
-            result = await self._handle_search(message)
+            result = await self._handle_search(message, ctx)
             response_parts.append(result["response"])
             sources.extend(result.get("sources", []))
             context_data["document_results"] = result.get("data", {})
             
         elif intent in ["status", "current", "monitor", "fleet"]:
-            result = await self._handle_status(message)
+            result = await self._handle_status(message, ctx)
             response_parts.append(result["response"])
             context_data["fleet_status"] = result.get("data", {})
             
         elif intent == "cycle_time":
-            result = await self._handle_cycle_time(message)
+            result = await self._handle_cycle_time(message, ctx)
             response_parts.append(result["response"])
             context_data["cycle_analysis"] = result.get("data", {})
             
         elif intent == "ml_explain":
-            result = await self._handle_ml_explanation(message)
+            result = await self._handle_ml_explanation(message, ctx)
             response_parts.append(result["response"])
             sources.extend(result.get("sources", []))
             
         else:
             # General question - use multiple agents
-            result = await self._handle_general(message)
+            result = await self._handle_general(message, ctx)
             response_parts.append(result["response"])
             sources.extend(result.get("sources", []))
         
@@ -129,115 +229,31 @@ class AgentOrchestrator:
             "response": "\n\n".join(response_parts),
             "sources": sources,
             "context": context_data,
-            "intent": intent
+            "intent": intent,
+            "conversation_id": ctx.conversation_id
         }
     
     def _classify_intent(self, message: str) -> str:
         """Classify user intent from message"""
-        message_lower = message.lower()
-        
-        # Ghost Cycle / Fuel patterns
-        ghost_patterns = [
-            r"ghost.?cycle",
-            r"fuel.?waste",
-            r"idle",
-            r"inefficien",
-            r"burning fuel",
-            r"not working"
-        ]
-        for pattern in ghost_patterns:
-            if re.search(pattern, message_lower):
-                return "ghost_cycle"
-        
-        # Route / Traffic patterns
-        route_patterns = [
-            r"route",
-            r"traffic",
-            r"choke.?point",
-            r"congestion",
-            r"bottleneck",
-            r"divert",
-            r"alternate"
-        ]
-        for pattern in route_patterns:
-            if re.search(pattern, message_lower):
-                return "route"
-        
-        # Cycle time patterns
-        cycle_patterns = [
-            r"cycle.?time",
-            r"how long",
-            r"predict.*time",
-            r"estimate.*time"
-        ]
-        for pattern in cycle_patterns:
-            if re.search(pattern, message_lower):
-                return "cycle_time"
-        
-        # ML explanation patterns
-        ml_patterns = [
-            r"why.*detect",
-            r"explain.*model",
-            r"feature.*import",
-            r"shap",
-            r"what.*predict"
-        ]
-        for pattern in ml_patterns:
-            if re.search(pattern, message_lower):
-                return "ml_explain"
-        
-        # Analytical patterns
-        analytical_patterns = [
-            r"how many",
-            r"total",
-            r"count",
-            r"average",
-            r"list",
-            r"show me.*data",
-            r"statistics"
-        ]
-        for pattern in analytical_patterns:
-            if re.search(pattern, message_lower):
-                return "analytical"
-        
-        # Search / History patterns
-        search_patterns = [
-            r"search",
-            r"find",
-            r"safety",
-            r"geotechnical",
-            r"document",
-            r"procedure",
-            r"history"
-        ]
-        for pattern in search_patterns:
-            if re.search(pattern, message_lower):
-                return "search"
-        
-        # Status patterns
-        status_patterns = [
-            r"status",
-            r"current",
-            r"right now",
-            r"fleet",
-            r"equipment"
-        ]
-        for pattern in status_patterns:
-            if re.search(pattern, message_lower):
-                return "status"
-        
-        return "general"
+        return classify_intent(message)
     
-    async def _handle_ghost_cycle(self, message: str) -> Dict[str, Any]:
+    async def _handle_ghost_cycle(self, message: str, ctx: ConversationContext) -> Dict[str, Any]:
         """Handle Ghost Cycle related queries"""
         self.logger.info("Handling Ghost Cycle query")
         
-        # Get current Ghost Cycle alerts
-        result = await self.watchdog.process({
-            "site_id": self.context["site_id"],
-            "equipment_data": self.sf.get_equipment_telemetry(self.context["site_id"]),
-            "zone_metrics": []
-        })
+        site_id = ctx.site_id
+        
+        # Alerts (telemetry -> watchdog) and model context are independent branches
+        plan = await execute_plan([
+            Step("telemetry", lambda: self.sf.get_equipment_telemetry(site_id)),
+            Step("watchdog", lambda telemetry: self.watchdog.process({
+                "site_id": site_id,
+                "equipment_data": telemetry,
+                "zone_metrics": []
+            }), deps=("telemetry",)),
+            Step("feature_importance", lambda: self.historian.get_ml_feature_importance("GHOST_CYCLE_DETECTOR")),
+        ])
+        result = plan.get("watchdog", {})
         
         ghost_cycles = result.get("ghost_cycles", [])
         
@@ -257,11 +273,12 @@ class AgentOrchestrator:
             response_parts.append("\n💡 **Recommendation**: Verify equipment is assigned productive work or reallocate")
             
             response = "\n".join(response_parts)
-        else:
+        elif plan.ok("watchdog"):
             response = "✅ No Ghost Cycles currently detected. All equipment appears to be operating productively."
+        else:
+            response = "👻 **Ghost Cycle Alert** - live detection is unavailable right now."
         
-        # Get feature importance for context
-        feature_importance = await self.historian.get_ml_feature_importance("GHOST_CYCLE_DETECTOR")
+        feature_importance = plan.get("feature_importance")
         
         if feature_importance:
             response += "\n\n📊 **Key Detection Factors** (from ML model):\n"
@@ -269,21 +286,30 @@ class AgentOrchestrator:
                 direction = "↑" if feat.get("FEATURE_DIRECTION") == "positive" else "↓"
                 response += f"• {feat.get('FEATURE_NAME')}: {direction} importance\n"
         
+        response += self._unavailable_note(plan, {
+            "watchdog": "Ghost Cycle detection",
+            "feature_importance": "model detection factors",
+        })
+        
         return {
             "response": response,
             "sources": ["GHOST_CYCLE_DETECTOR model", "Real-time telemetry"],
             "data": result
         }
     
-    async def _handle_routing(self, message: str) -> Dict[str, Any]:
+    async def _handle_routing(self, message: str, ctx: ConversationContext) -> Dict[str, Any]:
         """Handle routing and traffic queries"""
         self.logger.info("Handling routing query")
         
-        result = await self.route_advisor.process({
-            "site_id": self.context["site_id"],
-            "question": message,
-            "current_hour": self.context.get("current_hour", 10)
-        })
+        # The advisor queries the warehouse; keep it off the event loop
+        plan = await execute_plan([
+            Step("route_advisor", lambda: self.route_advisor.process({
+                "site_id": ctx.site_id,
+                "question": message,
+                "current_hour": ctx.current_hour
+            })),
+        ])
+        result = plan.get("route_advisor", {})
         
         recommendations = result.get("recommendations", [])
         choke_points = result.get("choke_points", [])
@@ -315,19 +341,24 @@ class AgentOrchestrator:
             )
         
         return {
-            "response": "\n".join(response_parts),
+            "response": "\n".join(response_parts) + self._unavailable_note(plan, {
+                "route_advisor": "route recommendations",
+            }),
             "sources": ["CHOKE_POINT_PREDICTOR model", "CYCLE_TIME_OPTIMIZER model"],
             "data": result
         }
     
-    async def _handle_search(self, message: str) -> Dict[str, Any]:
+    async def _handle_search(self, message: str, ctx: ConversationContext) -> Dict[str, Any]:
         """Handle document search queries"""
         self.logger.info("Handling search query")
         
-        result = await self.historian.process({
-            "query": message,
-            "site_id": self.context["site_id"]
-        })
+        plan = await execute_plan([
+            Step("historian", lambda: self.historian.process({
+                "query": message,
+                "site_id": ctx.site_id
+            })),
+        ])
+        result = plan.get("historian", {})
         
         doc_results = result.get("document_results", [])
         
@@ -341,8 +372,10 @@ class AgentOrchestrator:
                 )
             
             response = "\n\n".join(response_parts)
-        else:
+        elif plan.ok("historian"):
             response = "No relevant documents found. Try rephrasing your search."
+        else:
+            response = "📚 Document search is unavailable right now."
         
         return {
             "response": response,
@@ -350,14 +383,24 @@ class AgentOrchestrator:
             "data": result
         }
     
-    async def _handle_status(self, message: str) -> Dict[str, Any]:
+    async def _handle_status(self, message: str, ctx: ConversationContext) -> Dict[str, Any]:
         """Handle fleet status queries"""
         self.logger.info("Handling status query")
         
-        site_id = self.context["site_id"]
-        
-        # Get fleet summary
-        summary = self.sf.get_fleet_summary(site_id)
+        site_id = ctx.site_id
+        
+        # Fleet summary and alerts (telemetry -> watchdog) are independent branches
+        plan = await execute_plan([
+            Step("summary", lambda: self.sf.get_fleet_summary(site_id)),
+            Step("telemetry", lambda: self.sf.get_equipment_telemetry(site_id)),
+            Step("watchdog", lambda telemetry: self.watchdog.process({
+                "site_id": site_id,
+                "equipment_data": telemetry,
+                "zone_metrics": []
+            }), deps=("telemetry",)),
+        ])
+        summary = plan.get("summary")
+        watchdog_result = plan.get("watchdog", {})
         
         response_parts = [f"📊 **Fleet Status - Site {site_id}**\n"]
         
@@ -366,32 +409,37 @@ class AgentOrchestrator:
             response_parts.append(f"• **Cycles Today**: {summary.get('cycles_today', 'N/A')}")
             response_parts.append(f"• **Volume Moved**: {summary.get('volume_today', 'N/A')} yd³")
             response_parts.append(f"• **Avg Cycle Time**: {summary.get('avg_cycle_time', 'N/A')} min")
-        else:
+        elif plan.ok("summary"):
             response_parts.append("No status data available.")
         
-        # Check for alerts
-        watchdog_result = await self.watchdog.process({
-            "site_id": site_id,
-            "equipment_data": self.sf.get_equipment_telemetry(site_id),
-            "zone_metrics": []
-        })
-        
         if watchdog_result.get("alerts"):
             response_parts.append(f"\n⚠️ **{len(watchdog_result['alerts'])} Active Alert(s)**")
             response_parts.append(watchdog_result.get("summary", ""))
         
+        response = "\n".join(response_parts) + self._unavailable_note(plan, {
+            "summary": "fleet summary",
+            "watchdog": "live alerts",
+        })
+        
         return {
-            "response": "\n".join(response_parts),
-            "data": {"summary": summary, "alerts": watchdog_result.get("alerts", [])}
+            "response": response,
+            "data": {
+                "summary": summary,
+                "alerts": watchdog_result.get("alerts", []),
+                "unavailable": plan.errors
+            }
         }
     
-    async def _handle_cycle_time(self, message: str) -> Dict[str, Any]:
+    async def _handle_cycle_time(self, message: str, ctx: ConversationContext) -> Dict[str, Any]:
         """Handle cycle time prediction queries"""
-        result = await self.route_advisor.process({
-            "site_id": self.context["site_id"],
-            "question": message,
-            "current_hour": self.context.get("current_hour", 10)
-        })
+        plan = await execute_plan([
+            Step("route_advisor", lambda: self.route_advisor.process({
+                "site_id": ctx.site_id,
+                "question": message,
+                "current_hour": ctx.current_hour
+            })),
+        ])
+        result = plan.get("route_advisor", {})
         
         cycle_analysis = result.get("cycle_analysis", {})
         predicted = result.get("predicted_cycle_time", {})
@@ -410,11 +458,13 @@ class AgentOrchestrator:
                 response_parts.append(f"   (includes {predicted.get('choke_delay'):.0f} min choke point delay)")
         
         return {
-            "response": "\n".join(response_parts),
+            "response": "\n".join(response_parts) + self._unavailable_note(plan, {
+                "route_advisor": "cycle time analysis",
+            }),
             "data": result
         }
     
-    async def _handle_ml_explanation(self, message: str) -> Dict[str, Any]:
+    async def _handle_ml_explanation(self, message: str, ctx: ConversationContext) -> Dict[str, Any]:
         """Handle ML model explanation queries"""
         self.logger.info("Handling ML explanation query")
         
@@ -433,8 +483,12 @@ class AgentOrchestrator:
         
         response_parts.append(f"### {model_desc} Model\n")
         
-        # Get feature importance
-        features = await self.historian.get_ml_feature_importance(model_name)
+        # Feature importance and metrics are fetched concurrently
+        plan = await execute_plan([
+            Step("features", lambda: self.historian.get_ml_feature_importance(model_name)),
+            Step("metrics", lambda: self.historian.get_model_metrics(model_name)),
+        ])
+        features = plan.get("features")
         
         if features:
             response_parts.append("**Top Predictive Features (SHAP Analysis)**:")
@@ -444,22 +498,27 @@ class AgentOrchestrator:
                     f"• **{feat.get('FEATURE_NAME')}**: importance {feat.get('SHAP_IMPORTANCE', 0):.3f} ({direction})"
                 )
         
-        # Get model metrics
-        metrics = await self.historian.get_model_metrics(model_name)
+        metrics = plan.get("metrics")
         
         if metrics:
             response_parts.append("\n**Model Performance**:")
             for metric, value in metrics.items():
                 response_parts.append(f"• {metric}: {value:.4f}")
         
+        response = "\n".join(response_parts) + self._unavailable_note(plan, {
+            "features": "feature importance",
+            "metrics": "model metrics",
+        })
+        
         return {
-            "response": "\n".join(response_parts),
+            "response": response,
             "sources": [f"ML.GLOBAL_FEATURE_IMPORTANCE", f"ML.MODEL_METRICS"]
         }
     
-    async def _handle_analytical(self, message: str) -> Dict[str, Any]:
+    async def _handle_analytical(self, message: str, ctx: ConversationContext) -> Dict[str, Any]:
         """Handle analytical queries"""
-        result = self.sf.direct_sql_query(message)
+        # Blocks on the warehouse (with retries); run it in a worker thread
+        result = await asyncio.get_running_loop().run_in_executor(None, self.sf.direct_sql_query, message)
         
         if result.get("results"):
             response_parts = ["📊 **Query Results**\n"]
@@ -488,7 +547,7 @@ class AgentOrchestrator:
             "data": {}
         }
     
-    async def _handle_general(self, message: str) -> Dict[str, Any]:
+    async def _handle_general(self, message: str, ctx: ConversationContext) -> Dict[str, Any]:
         """Handle general questions"""
         response = """
 🏗️ **Terra Construction Co-Pilot**
@@ -506,9 +565,16 @@ What would you like to know?
 """
         return {"response": response, "sources": []}
     
-    def update_context(self, **kwargs):
+    def _unavailable_note(self, plan: PlanResult, labels: Dict[str, str]) -> str:
+        """Footnote listing parts of a partial answer that could not be fetched"""
+        missing = [f"{label} ({plan.errors[name]})" for name, label in labels.items() if name in plan.errors]
+        if not missing:
+            return ""
+        return "\n\n⏳ _Partial answer - unavailable: " + "; ".join(missing) + "_"
+    
+    def update_context(self, conversation_id: str, **kwargs):
         """Update conversation context"""
-        self.context.update(kwargs)
+        self.conversations.get(conversation_id).update(**kwargs)
 
 
 # Singleton orchestrator
@@ -0,0 +1,127 @@
+"""
+Agent call plans for TERRA Co-Pilot
+
+An intent handler describes the agent and warehouse calls it needs as a
+small dependency graph of steps. Independent steps run concurrently, each
+with its own timeout; a step that fails or times out is reported instead of
+failing the whole answer, and steps depending on it are skipped.
+
+Agent coroutines and Snowflake service calls block on warehouse I/O, so
+every step runs in a worker thread (coroutines on their own event loop)
+rather than on the request's event loop. Steps get their own bounded pool,
+so a slow warehouse can't starve the default executor the dashboard cache
+and ingest use, and the step timeout is a query deadline: the warehouse
+calls inside a step stop retrying and time out with it, releasing the
+thread.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from ..services.resilience import query_deadline
+except ImportError:
+    from services.resilience import query_deadline
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STEP_TIMEOUT = float(os.getenv("TERRA_AGENT_STEP_TIMEOUT_SECONDS", "10"))
+PLAN_MAX_WORKERS = int(os.getenv("TERRA_PLAN_MAX_WORKERS", "16"))
+
+
+@dataclass
+class Step:
+    """
+    One call in a plan.
+
+    fn receives the results of its dependencies as keyword arguments named
+    after those steps, and may be a plain function or a coroutine function.
+    """
+    name: str
+    fn: Callable[..., Any]
+    deps: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+
+
+@dataclass
+class PlanResult:
+    results: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+
+    def ok(self, name: str) -> bool:
+        return name in self.results
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.results.get(name, default)
+
+
+# Pool shared by all plans
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PLAN_MAX_WORKERS, thread_name_prefix="plan-step")
+    return _executor
+
+
+def _call(fn: Callable[..., Any], kwargs: Dict[str, Any], deadline: float) -> Any:
+    # The deadline counts from submission, so time spent queued is included
+    with query_deadline(deadline - time.monotonic()):
+        result = fn(**kwargs)
+        if asyncio.iscoroutine(result):
+            result = asyncio.run(result)
+    return result
+
+
+async def execute_plan(steps: List[Step], default_timeout: float = DEFAULT_STEP_TIMEOUT) -> PlanResult:
+    """Run a plan, starting each step as soon as its dependencies have finished."""
+    # Steps may only depend on steps listed before them, which rules out cycles
+    seen = set()
+    for step in steps:
+        missing = [d for d in step.deps if d not in seen]
+        if missing:
+            raise ValueError(f"Step {step.name} depends on {missing}, which are not listed before it")
+        seen.add(step.name)
+
+    outcome = PlanResult()
+    loop = asyncio.get_running_loop()
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(step: Step):
+        if step.deps:
+            await asyncio.gather(*(tasks[d] for d in step.deps))
+            failed = [d for d in step.deps if d in outcome.errors]
+            if failed:
+                outcome.errors[step.name] = f"skipped: {', '.join(failed)} unavailable"
+                return
+        kwargs = {d: outcome.results[d] for d in step.deps}
+        timeout = step.timeout if step.timeout is not None else default_timeout
+        start = time.perf_counter()
+        try:
+            # A timed-out step's queries hit the same deadline and give up
+            outcome.results[step.name] = await asyncio.wait_for(
+                loop.run_in_executor(_get_executor(), _call, step.fn, kwargs, time.monotonic() + timeout),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            outcome.errors[step.name] = f"timed out after {timeout:g}s"
+            logger.warning(f"Plan step {step.name} timed out after {timeout:.1f}s")
+        except Exception as e:
+            outcome.errors[step.name] = str(e)
+            logger.warning(f"Plan step {step.name} failed: {e}")
+        finally:
+            outcome.timings_ms[step.name] = round((time.perf_counter() - start) * 1000, 1)
+
+    for step in steps:
+        tasks[step.name] = asyncio.ensure_future(run(step))
+
+    await asyncio.gather(*tasks.values())
+    return outcome
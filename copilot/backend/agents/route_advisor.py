@@ -11,10 +11,14 @@ import os
 try:
     from .base import BaseAgent
     from ..services import get_snowflake_service
+    from ..services.choke_point_scorer import get_choke_point_scorer
+    from ..services.cycle_time_predictor import BASE_CYCLE_MINUTES, get_cycle_time_predictor
 except ImportError:
     sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     from agents.base import BaseAgent
     from services import get_snowflake_service
+    from services.choke_point_scorer import get_choke_point_scorer
+    from services.cycle_time_predictor import BASE_CYCLE_MINUTES, get_cycle_time_predictor
 
 
 class RouteAdvisorAgent(BaseAgent):
@@ -86,11 +90,14 @@ class RouteAdvisorAgent(BaseAgent):
             "choke_points": choke_points,
             "cycle_analysis": cycle_analysis,
             "reasoning": reasoning,
-            "predicted_cycle_time": self._predict_cycle_time(context, choke_points)
+            "predicted_cycle_time": self._predict_cycle_time(context, choke_points, cycle_analysis)
         }
     
     async def _get_predicted_choke_points(self, site_id: str) -> List[Dict]:
         """Get ML-predicted choke points from the model"""
+        scorer = get_choke_point_scorer()
+        if scorer.has_predictions(site_id):
+            return scorer.predictions(site_id, min_probability=0.5, limit=5)
         sql = f"""
         SELECT 
             ZONE_NAME, ZONE_LAT, ZONE_LNG,
@@ -221,24 +228,29 @@ class RouteAdvisorAgent(BaseAgent):
         
         return " ".join(parts)
     
-    def _predict_cycle_time(self, context: Dict, choke_points: List[Dict]) -> Dict:
-        """Predict cycle time based on current conditions"""
-        base_time = 22.0  # Default average
+    def _predict_cycle_time(self, context: Dict, choke_points: List[Dict], cycle_analysis: Dict) -> Dict:
+        """Predict cycle time with CYCLE_TIME_OPTIMIZER, plus delays at predicted choke points"""
+        predictor = get_cycle_time_predictor()
+        current_hour = context.get("current_hour", 10)
+        row = {
+            "HOUR_OF_DAY": current_hour,
+            "LOAD_VOLUME_YD3": context.get("load_volume_yd3"),
+            "HAUL_DISTANCE_MILES": context.get("haul_distance_miles"),
+        }
+        base_time = float(predictor.predict(
+            [row], base_minutes=cycle_analysis.get("avg_cycle_time") or BASE_CYCLE_MINUTES
+        )[0])
         
         # Add delay for choke points on route
-        choke_delay = sum(cp.get("PREDICTED_WAIT_TIME_MIN", 0) for cp in choke_points)
-        
-        # Adjust for time of day (peak hours add 15%)
-        current_hour = context.get("current_hour", 10)
-        if current_hour in [7, 8, 9, 13, 14]:
-            base_time *= 1.15
+        choke_delay = sum(cp.get("PREDICTED_WAIT_TIME_MIN", 0) or 0 for cp in choke_points)
         
         predicted = base_time + choke_delay
         
         return {
             "predicted_minutes": round(predicted, 1),
-            "base_time": base_time,
+            "base_time": round(base_time, 1),
             "choke_delay": choke_delay,
+            "model": predictor.source,
             "confidence": 0.85 if not choke_points else 0.70
         }
     
@@ -7,8 +7,20 @@ from typing import Any, Dict, List, Optional
 import logging
 from .base import BaseAgent
 
+try:
+    from ..services.position_index import get_position_index
+    from ..services.geofence import RESTRICTED_KINDS, get_geofences
+    from ..services.choke_point_scorer import get_choke_point_scorer
+except ImportError:
+    from services.position_index import get_position_index
+    from services.geofence import RESTRICTED_KINDS, get_geofences
+    from services.choke_point_scorer import get_choke_point_scorer
+
 logger = logging.getLogger(__name__)
 
+# Equipment within this distance of a choke point counts as affected
+CHOKE_POINT_RADIUS_M = 200.0
+
 
 class WatchdogAgent(BaseAgent):
     """
@@ -122,8 +134,9 @@ class WatchdogAgent(BaseAgent):
                         "message": f"Choke Point predicted (ML confidence: {probability:.0%}): {pred.get('ZONE_NAME')} - {pred.get('PREDICTED_TRUCKS_AFFECTED', 0)} trucks affected",
                         "predicted_wait_time": pred.get("PREDICTED_WAIT_TIME_MIN", 0),
                         "predicted_onset_time": pred.get("PREDICTED_ONSET_TIME"),
+                        "nearby_equipment": self._nearby_equipment(site_id, pred.get("ZONE_LAT"), pred.get("ZONE_LNG")),
                         "recommendation": pred.get("RECOMMENDED_ACTION", "Divert incoming trucks to alternate route"),
-                        "model": "CHOKE_POINT_PREDICTOR",
+                        "model": pred.get("MODEL", "CHOKE_POINT_PREDICTOR"),
                         "threshold_used": thresholds.get("choke_point_probability")
                     })
         else:
@@ -140,10 +153,27 @@ class WatchdogAgent(BaseAgent):
                         "confidence": None,
                         "message": f"Choke Point forming (rule-based): {zone.get('zone_name')} - {zone.get('equipment_count')} trucks",
                         "predicted_wait_time": zone.get("equipment_count", 0) * 2.5,
+                        "nearby_equipment": self._nearby_equipment(site_id, zone.get("zone_lat"), zone.get("zone_lng")),
                         "recommendation": "Divert incoming trucks to alternate route",
                         "model": "RULE_BASED_FALLBACK"
                     })
         
+        # Equipment inside exclusion/pedestrian geofences (live telemetry)
+        geofence_violations = self._geofence_violations(site_id)
+        for violation in geofence_violations:
+            alerts.append({
+                "type": "GEOFENCE_VIOLATION",
+                "severity": "CRITICAL",
+                "equipment_id": violation["equipment_id"],
+                "zone_name": violation["fence_name"],
+                "fence_id": violation["fence_id"],
+                "confidence": None,
+                "message": f"Geofence violation: {violation['equipment_id']} inside {violation['kind'].lower()} zone {violation['fence_name']}",
+                "entered_at": violation["entered_at"],
+                "recommendation": "Stop the equipment and clear the restricted area",
+                "model": "GEOFENCE"
+            })
+        
         # Calculate total cost impact
         total_fuel_waste = sum(a.get("estimated_fuel_waste_gal", 0) for a in alerts if a["type"] == "GHOST_CYCLE")
         total_cost_impact = total_fuel_waste * 3.80
@@ -153,6 +183,7 @@ class WatchdogAgent(BaseAgent):
             "ghost_cycles": ghost_cycles,
             "choke_points": choke_points,
             "status": "CRITICAL" if any(a.get("severity") == "CRITICAL" for a in alerts) else "ALERT" if alerts else "NORMAL",
+            "geofence_violations": geofence_violations,
             "summary": self._generate_summary(alerts, ghost_cycles, choke_points, total_cost_impact),
             "thresholds_used": thresholds,
             "cost_impact": {
@@ -211,7 +242,10 @@ class WatchdogAgent(BaseAgent):
         return []
     
     async def _get_ml_choke_point_predictions(self, site_id: Optional[str]) -> List[Dict]:
-        """Get ML-based choke point predictions from ML schema"""
+        """Get ML-based choke point predictions, scored live in the backend or from ML schema"""
+        live = get_choke_point_scorer().predictions(site_id, min_probability=0.4, limit=20)
+        if live:
+            return live
         try:
             if self.sf:
                 site_clause = f"AND SITE_ID = '{site_id}'" if site_id else ""
@@ -255,6 +289,24 @@ class WatchdogAgent(BaseAgent):
         equipment_count = zone.get("equipment_count", 0)
         return avg_speed < 5.0 and equipment_count > 10
     
+    def _nearby_equipment(self, site_id: Optional[str], lat: Optional[float], lng: Optional[float]) -> List[str]:
+        """Equipment currently within CHOKE_POINT_RADIUS_M of a location (live position index)"""
+        if lat is None or lng is None:
+            return []
+        nearby = get_position_index().within_radius(lat, lng, CHOKE_POINT_RADIUS_M, site_id=site_id)
+        return [e["equipment_id"] for e in nearby]
+    
+    def _geofence_violations(self, site_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Equipment currently inside a restricted geofence of the site"""
+        if site_id is None:
+            return []
+        return [
+            {"equipment_id": e["equipment_id"], "entered_at": e["entered_at"],
+             "fence_id": fence["fence_id"], "fence_name": fence["name"], "kind": fence["kind"]}
+            for fence in get_geofences().occupancy(site_id, RESTRICTED_KINDS)
+            for e in fence["equipment"]
+        ]
+    
     def _estimate_fuel_waste(self, equipment: Dict) -> float:
         """Estimate fuel waste from Ghost Cycle in gallons"""
         fuel_rate = equipment.get("fuel_rate_gph", 3.0)
@@ -282,6 +334,10 @@ class WatchdogAgent(BaseAgent):
             else:
                 parts.append(f"🟡 {len(choke_points)} Choke Point(s) detected (rule-based)")
         
+        violations = sum(1 for a in alerts if a["type"] == "GEOFENCE_VIOLATION")
+        if violations:
+            parts.append(f"⛔ {violations} Geofence violation(s) in restricted zones")
+        
         if total_cost > 0:
             parts.append(f"💰 Total cost impact: ${total_cost:.0f}")
         
@@ -304,6 +360,10 @@ class WatchdogAgent(BaseAgent):
                 "name": "get_optimal_thresholds",
                 "description": "Get profit-curve-optimized alert thresholds"
             },
+            {
+                "name": "get_geofence_occupancy",
+                "description": "Get equipment currently inside exclusion and pedestrian geofences"
+            },
             {
                 "name": "get_equipment_telemetry",
                 "description": "Get real-time GPS and telematics for equipment"
@@ -3,7 +3,7 @@ TERRA - Terrain & Equipment Route Resource Advisor API
 FastAPI backend for the agentic geospatial analytics system
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
@@ -13,6 +13,7 @@ import asyncio
 import json
 import sys
 import os
+from contextlib import aclosing
 
 # Configure logging to output to stdout with flush
 logging.basicConfig(
@@ -70,6 +71,39 @@ def get_sf():
 
 get_snowflake_service = get_sf
 
+
+# ============================================================================
+# Dashboard Cache (stale-while-revalidate)
+# ============================================================================
+
+from services.swr_cache import get_dashboard_cache
+
+# Seconds a cached payload is served before a background refresh
+DEFAULT_FRESH_SECONDS = 30.0
+LIVE_FRESH_SECONDS = 5.0
+ML_FRESH_SECONDS = 300.0
+
+
+async def serve_cached(response: Response, key: str, loader, fresh_for: float = DEFAULT_FRESH_SECONDS):
+    """
+    Serve a dashboard payload stale-while-revalidate.
+    
+    Returns the last good result immediately (refreshing it in the background
+    once stale) and reports its age in the Age / X-Cache headers. Only raises
+    when the warehouse fails and no prior result exists.
+    
+    Loaders run with the service's own last-good fallback disabled, so a
+    failed refresh keeps the cached entry and its real age.
+    """
+    def load():
+        with get_snowflake_service().fresh_only():
+            return loader()
+    
+    value, age, status = await get_dashboard_cache().get(key, load, fresh_for)
+    response.headers["Age"] = str(int(age))
+    response.headers["X-Cache"] = status
+    return value
+
 app = FastAPI(
     title="TERRA Geospatial Analytics API",
     description="Terrain & Equipment Route Resource Advisor - Agentic AI for construction operations",
@@ -97,6 +131,7 @@ class HistoryMessage(BaseModel):
 class ChatMessage(BaseModel):
     message: str
     site_id: Optional[str] = None
+    conversation_id: Optional[str] = None
     conversation_history: Optional[List[HistoryMessage]] = None
 
 
@@ -105,6 +140,13 @@ class ChatResponse(BaseModel):
     sources: List[str] = []
     context: Dict[str, Any] = {}
     intent: Optional[str] = None
+    conversation_id: Optional[str] = None
+
+
+class CompleteRequest(BaseModel):
+    prompt: str
+    model: str = "mistral-large2"
+    data_version: Optional[str] = None
 
 
 class SiteParams(BaseModel):
@@ -157,10 +199,34 @@ async def health():
     return {"status": "healthy", "service": "terra-geospatial-analytics"}
 
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Warehouse query health, SPCS token, dashboard cache, live telemetry, position index and model serving counters"""
+    from services.live_telemetry import get_live_telemetry
+    from services.position_index import get_position_index
+    from services.choke_point_scorer import get_choke_point_scorer
+    from services.cycle_time_predictor import get_cycle_time_predictor
+    from services.telemetry_buffer import get_telemetry_buffer
+    from services.model_registry import get_model_registry
+    from services.spcs_token import get_spcs_token_provider
+    sf = get_snowflake_service()
+    return {
+        "warehouse": sf.get_query_metrics(),
+        "spcs_token": get_spcs_token_provider().metrics(),
+        "dashboard_cache": get_dashboard_cache().metrics(),
+        "live_telemetry": get_live_telemetry().metrics(),
+        "position_index": get_position_index().metrics(),
+        "telemetry_buffer": get_telemetry_buffer().metrics(),
+        "choke_point_scorer": get_choke_point_scorer().metrics(),
+        "cycle_time_predictor": get_cycle_time_predictor().metrics(),
+        "model_registry": get_model_registry().metrics(),
+    }
+
+
 @app.get("/api/info")
-async def get_info():
+async def get_info(response: Response):
     """Get system information"""
-    try:
+    def load():
         sf = get_snowflake_service()
         sql = "SELECT COUNT(*) as cycle_count FROM CONSTRUCTION_GEO_DB.RAW.CYCLE_EVENTS"
         results = sf.execute_query(sql)
@@ -177,18 +243,12 @@ async def get_info():
                 "ML Explainability"
             ]
         }
+
+    try:
+        return await serve_cached(response, "info", load)
     except Exception as e:
         logger.error(f"Failed to get info: {str(e)}")
-        return {
-            "cycle_count": 10000,
-            "sites_available": ["ALPHA", "BETA", "GAMMA", "DELTA"],
-            "features": [
-                "Ghost Cycle Detection",
-                "Choke Point Prediction", 
-                "Cycle Time Optimization"
-            ],
-            "note": "Using cached data"
-        }
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 # ============================================================================
@@ -209,14 +269,16 @@ async def chat(message: ChatMessage):
         orchestrator = _orchestrator()
         result = await orchestrator.process_message(
             message=message.message,
-            site_id=message.site_id
+            site_id=message.site_id,
+            conversation_id=message.conversation_id
         )
         
         return ChatResponse(
             response=result["response"],
             sources=result.get("sources", []),
             context=result.get("context", {}),
-            intent=result.get("intent")
+            intent=result.get("intent"),
+            conversation_id=result.get("conversation_id")
         )
     except Exception as e:
         logger.error(f"Chat error: {str(e)}")
@@ -236,6 +298,8 @@ async def chat_stream(message: ChatMessage):
     - type: "error" - Error occurred
     """
     async def event_generator():
+        from services.stream_coalescer import StreamStats, coalesce_text_events
+        stats = StreamStats()
         try:
             from services.cortex_agent_client import get_cortex_agent_client
             agent = get_cortex_agent_client()
@@ -248,10 +312,13 @@ async def chat_stream(message: ChatMessage):
             if message.conversation_history:
                 history = [{"role": m.role, "content": m.content} for m in message.conversation_history]
             
-            async for event in agent.run_agent(message.message, history):
-                # Format as SSE
-                yield f"data: {json.dumps(event)}\n\n"
-                await asyncio.sleep(0.01)  # Small delay for smooth streaming
+            # Batch consecutive text deltas into fewer SSE frames; on client
+            # disconnect both generators are closed, ending the upstream request
+            async with aclosing(agent.run_agent(message.message, history)) as upstream, \
+                    aclosing(coalesce_text_events(upstream, stats=stats)) as events:
+                async for event in events:
+                    # Format as SSE
+                    yield f"data: {json.dumps(event)}\n\n"
             
             yield "data: [DONE]\n\n"
             
@@ -259,6 +326,8 @@ async def chat_stream(message: ChatMessage):
             logger.error(f"Chat stream error: {e}")
             yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
             yield "data: [DONE]\n\n"
+        finally:
+            logger.info(f"Chat stream stats: {stats.as_dict()}")
     
     return StreamingResponse(
         event_generator(),
@@ -271,14 +340,57 @@ async def chat_stream(message: ChatMessage):
     )
 
 
+@app.post("/api/complete/stream")
+async def complete_stream(request: CompleteRequest):
+    """
+    Stream a Cortex COMPLETE response via SSE as tokens are generated.
+    
+    Emits the same "text" / "done" / "error" events as /api/chat/stream.
+    """
+    async def event_generator():
+        from services.stream_coalescer import StreamStats, coalesce_text_events
+        from services.cortex_complete_client import get_cortex_complete_client
+        stats = StreamStats()
+        try:
+            client = get_cortex_complete_client()
+            data_version = request.data_version
+            if data_version is None:
+                sf = get_snowflake_service()
+                data_version = await asyncio.get_running_loop().run_in_executor(None, sf.get_data_version)
+            upstream = client.complete_stream(
+                request.prompt, request.model, data_version,
+                use_cache=data_version is not None
+            )
+            async with aclosing(upstream), aclosing(coalesce_text_events(upstream, stats=stats)) as events:
+                async for event in events:
+                    yield f"data: {json.dumps(event)}\n\n"
+            yield "data: [DONE]\n\n"
+        except Exception as e:
+            logger.error(f"Complete stream error: {e}")
+            yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+            yield "data: [DONE]\n\n"
+        finally:
+            logger.info(f"Complete stream stats: {stats.as_dict()}")
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
 # ============================================================================
 # Fleet & Site Data Endpoints
 # ============================================================================
 
 @app.get("/api/sites")
-async def get_sites():
+async def get_sites(response: Response):
     """Get list of available sites"""
-    try:
+    def load():
         sf = get_snowflake_service()
         sql = """
         SELECT DISTINCT SITE_ID, COUNT(DISTINCT EQUIPMENT_ID) as EQUIPMENT_COUNT
@@ -288,46 +400,48 @@ async def get_sites():
         """
         results = sf.execute_query(sql)
         return {"sites": results}
+
+    try:
+        return await serve_cached(response, "sites", load)
     except Exception as e:
         logger.error(f"Failed to get sites: {str(e)}")
-        return {
-            "sites": [
-                {"SITE_ID": "ALPHA", "EQUIPMENT_COUNT": 12},
-                {"SITE_ID": "BETA", "EQUIPMENT_COUNT": 8},
-                {"SITE_ID": "GAMMA", "EQUIPMENT_COUNT": 15},
-                {"SITE_ID": "DELTA", "EQUIPMENT_COUNT": 10}
-            ]
-        }
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 @app.get("/api/site/{site_id}/summary")
-async def get_site_summary(site_id: str):
+async def get_site_summary(response: Response, site_id: str):
     """Get summary statistics for a site"""
-    try:
+    def load():
         sf = get_snowflake_service()
         summary = sf.get_fleet_summary(site_id)
         return summary
+
+    try:
+        return await serve_cached(response, f"site-summary:{site_id}", load)
     except Exception as e:
         logger.error(f"Failed to get site summary for {site_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/site/{site_id}/equipment")
-async def get_site_equipment(site_id: str):
+async def get_site_equipment(response: Response, site_id: str):
     """Get current equipment telemetry for a site"""
-    try:
+    def load():
         sf = get_snowflake_service()
         equipment = sf.get_equipment_telemetry(site_id)
         return {"equipment": equipment}
+
+    try:
+        return await serve_cached(response, f"site-equipment:{site_id}", load, fresh_for=LIVE_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get equipment for {site_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/site/{site_id}/cycles")
-async def get_site_cycles(site_id: str, limit: int = 100):
+async def get_site_cycles(response: Response, site_id: str, limit: int = 100):
     """Get recent cycle events for a site"""
-    try:
+    def load():
         sf = get_snowflake_service()
         sql = f"""
         SELECT 
@@ -347,11 +461,75 @@ async def get_site_cycles(site_id: str, limit: int = 100):
         """
         results = sf.execute_query(sql)
         return {"cycles": results}
+
+    try:
+        return await serve_cached(response, f"site-cycles:{site_id}:{limit}", load)
     except Exception as e:
         logger.error(f"Failed to get cycles for {site_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================================================
+# Equipment Trail Endpoints
+# ============================================================================
+
+from services.trail_simplify import ALGORITHMS, DEFAULT_TOLERANCE_PX, encode_polyline, simplify_trail
+
+# Breadcrumbs fetched per trail request (a full 1 Hz shift is ~36k)
+TRAIL_MAX_POINTS = 50000
+
+
+@app.get("/api/equipment/{asset_id}/trail")
+async def get_equipment_trail(
+    response: Response,
+    asset_id: str,
+    zoom: float = 16,
+    tolerance_px: float = DEFAULT_TOLERANCE_PX,
+    algorithm: str = "douglas-peucker",
+    format: str = "json",
+    limit: int = TRAIL_MAX_POINTS,
+):
+    """
+    Get a GPS trail simplified for the map zoom level.
+
+    Stops are always kept as vertices. format=polyline returns a Google
+    encoded polyline instead of a point list.
+    """
+    if algorithm not in ALGORITHMS:
+        raise HTTPException(status_code=400, detail=f"algorithm must be one of {ALGORITHMS}")
+    if format not in ("json", "polyline"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'polyline'")
+    limit = max(2, min(limit, TRAIL_MAX_POINTS))
+
+    def load():
+        sf = get_snowflake_service()
+        # Newest first from the warehouse; simplify in time order
+        rows = sf.get_asset_gps_trail(asset_id, limit)[::-1]
+        keep, stats = simplify_trail(
+            [r.get("LATITUDE") for r in rows],
+            [r.get("LONGITUDE") for r in rows],
+            [r.get("SPEED") for r in rows],
+            zoom=zoom, tolerance_px=tolerance_px, algorithm=algorithm,
+        )
+        trail = [rows[i] for i in keep]
+        result = {"asset_id": asset_id, "zoom": zoom, "algorithm": algorithm, **stats}
+        if format == "polyline":
+            result["polyline"] = encode_polyline(
+                [r["LATITUDE"] for r in trail], [r["LONGITUDE"] for r in trail]
+            )
+            result["timestamps"] = [r.get("TIMESTAMP") for r in trail]
+        else:
+            result["points"] = trail
+        return result
+
+    key = f"trail:{asset_id}:{zoom:g}:{tolerance_px:g}:{algorithm}:{format}:{limit}"
+    try:
+        return await serve_cached(response, key, load, fresh_for=LIVE_FRESH_SECONDS)
+    except Exception as e:
+        logger.error(f"Failed to get trail for {asset_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # ============================================================================
 # Ghost Cycle Endpoints
 # ============================================================================
@@ -361,7 +539,9 @@ async def get_ghost_cycles(site_id: str):
     """Get current Ghost Cycle alerts for a site"""
     try:
         sf = get_snowflake_service()
-        predictions = sf.get_ghost_cycle_predictions(site_id)
+        predictions = await asyncio.get_running_loop().run_in_executor(
+            None, sf.get_ghost_cycle_predictions, site_id
+        )
         
         return {
             "alerts": predictions,
@@ -374,9 +554,9 @@ async def get_ghost_cycles(site_id: str):
 
 
 @app.get("/api/ghost-cycles/{site_id}/history")
-async def get_ghost_cycle_history(site_id: str, hours: int = 24):
+async def get_ghost_cycle_history(response: Response, site_id: str, hours: int = 24):
     """Get historical Ghost Cycle data"""
-    try:
+    def load():
         sf = get_snowflake_service()
         sql = f"""
         SELECT 
@@ -392,6 +572,9 @@ async def get_ghost_cycle_history(site_id: str, hours: int = 24):
         """
         results = sf.execute_query(sql)
         return {"history": results}
+
+    try:
+        return await serve_cached(response, f"ghost-history:{site_id}:{hours}", load)
     except Exception as e:
         logger.error(f"Failed to get ghost cycle history: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -401,10 +584,22 @@ async def get_ghost_cycle_history(site_id: str, hours: int = 24):
 # Choke Point Endpoints
 # ============================================================================
 
+from services.spatial_grid import STORED_PRECISION, ZONE_PRECISION, zone_centers
+
 @app.get("/api/choke-points/{site_id}")
-async def get_choke_points(site_id: str):
-    """Get predicted choke points for a site"""
-    try:
+async def get_choke_points(response: Response, site_id: str):
+    """
+    Get predicted choke points for a site.
+    
+    Sites with ingested telemetry are scored in the backend every minute and
+    served from memory; others read ML.CHOKE_POINT_PREDICTIONS.
+    """
+    from services.choke_point_scorer import get_choke_point_scorer
+    scorer = get_choke_point_scorer()
+    if scorer.has_predictions(site_id):
+        return {"choke_points": scorer.predictions(site_id, min_probability=0.5), "source": "live"}
+
+    def load():
         sf = get_snowflake_service()
         sql = f"""
         SELECT 
@@ -423,37 +618,192 @@ async def get_choke_points(site_id: str):
         """
         results = sf.execute_query(sql)
         return {"choke_points": results}
+
+    try:
+        return await serve_cached(response, f"choke-points:{site_id}", load, fresh_for=LIVE_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get choke points for {site_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/choke-points/{site_id}/zones")
-async def get_zone_traffic(site_id: str):
-    """Get current traffic metrics by zone"""
-    try:
+async def get_zone_traffic(response: Response, site_id: str, precision: int = ZONE_PRECISION):
+    """
+    Get current traffic metrics by zone.
+    
+    Zones are geohash cells of the given precision (1-10, default 7 ~ 150 m),
+    grouped on the GRID_CELL stored with each breadcrumb.
+    """
+    if not 1 <= precision <= STORED_PRECISION:
+        raise HTTPException(status_code=400, detail=f"precision must be between 1 and {STORED_PRECISION}")
+    shift = 5 * (STORED_PRECISION - precision)
+
+    def load():
         sf = get_snowflake_service()
         sql = f"""
         SELECT 
-            ROUND(LATITUDE, 3) as ZONE_LAT,
-            ROUND(LONGITUDE, 3) as ZONE_LNG,
+            BITSHIFTRIGHT(GRID_CELL, {shift}) as ZONE_CELL,
             COUNT(DISTINCT EQUIPMENT_ID) as EQUIPMENT_COUNT,
             ROUND(AVG(SPEED_MPH), 1) as AVG_SPEED,
             COUNT(*) as READING_COUNT
         FROM CONSTRUCTION_GEO_DB.RAW.GPS_BREADCRUMBS
         WHERE SITE_ID = '{site_id}'
+          AND GRID_CELL IS NOT NULL
           AND TIMESTAMP >= DATEADD(minute, -15, CURRENT_TIMESTAMP())
-        GROUP BY ROUND(LATITUDE, 3), ROUND(LONGITUDE, 3)
+        GROUP BY ZONE_CELL
         HAVING COUNT(DISTINCT EQUIPMENT_ID) > 1
         ORDER BY EQUIPMENT_COUNT DESC
         """
         results = sf.execute_query(sql)
-        return {"zones": results}
+        centers = zone_centers([r.get("ZONE_CELL") for r in results], precision)
+        return {"zones": [{**center, **r} for center, r in zip(centers, results)], "precision": precision}
+
+    try:
+        return await serve_cached(response, f"zone-traffic:{site_id}:{precision}", load, fresh_for=LIVE_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get zone traffic for {site_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================================================
+# Haul Road Endpoints
+# ============================================================================
+
+@app.post("/api/haul-roads/{site_id}/match")
+async def match_haul_roads(site_id: str, breadcrumbs: List[Dict[str, Any]]):
+    """
+    Snap breadcrumbs to the site's haul-road segments.
+    
+    Each breadcrumb carries latitude, longitude and optionally
+    heading_degrees, speed_mph and equipment_id. Returns the matched
+    segment per breadcrumb and speed/congestion per segment.
+    """
+    from services.map_matching import get_road_networks
+    network = get_road_networks().get(site_id)
+    if network is None:
+        raise HTTPException(status_code=404, detail=f"No haul road network for site {site_id}")
+
+    def run():
+        speed = [b.get("speed_mph") for b in breadcrumbs]
+        result = network.match(
+            [b.get("latitude") for b in breadcrumbs],
+            [b.get("longitude") for b in breadcrumbs],
+            [b.get("heading_degrees") for b in breadcrumbs],
+            speed,
+        )
+        segment = result["segment"]
+        matches = [
+            {"road_segment_id": str(network.segment_ids[s]), "distance_m": round(float(d), 1), "position_m": round(float(p), 1)}
+            if s >= 0 else None
+            for s, d, p in zip(segment, result["distance_m"], result["position_m"])
+        ]
+        equipment = [b.get("equipment_id") for b in breadcrumbs]
+        return {
+            "matches": matches,
+            "matched": int((segment >= 0).sum()),
+            "segments": network.segment_traffic(
+                segment, speed, equipment if all(e is not None for e in equipment) else None,
+            ),
+        }
+
+    return await asyncio.get_running_loop().run_in_executor(None, run)
+
+
+@app.get("/api/haul-roads/{site_id}/traffic")
+async def get_haul_road_traffic(site_id: str):
+    """Live segment speeds and congestion from map-matched ingested telemetry"""
+    from services.map_matching import get_road_networks
+    traffic = get_road_networks().traffic(site_id)
+    if traffic is None:
+        raise HTTPException(status_code=404, detail=f"No haul road network for site {site_id}")
+    return {"segments": traffic.snapshot(), "window_minutes": traffic.window_minutes}
+
+
+@app.put("/api/haul-roads/{site_id}")
+async def put_haul_roads(site_id: str, geojson: Dict[str, Any]):
+    """Replace a site's haul-road network with a GeoJSON FeatureCollection of LineStrings"""
+    from services.map_matching import get_road_networks
+    try:
+        network = get_road_networks().save(site_id, geojson)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"site_id": site_id, "road_segments": len(network.segment_ids)}
+
+
+# ============================================================================
+# Geofence Endpoints
+# ============================================================================
+
+@app.get("/api/geofences/{site_id}")
+async def get_geofences_for_site(site_id: str):
+    """Geofences of a site (exclusion, pedestrian, cut/fill and load/dump zones)"""
+    from services.geofence import get_geofences
+    fences = get_geofences().get(site_id)
+    if fences is None:
+        raise HTTPException(status_code=404, detail=f"No geofences for site {site_id}")
+    return {"fences": fences.summary()}
+
+
+@app.put("/api/geofences/{site_id}")
+async def put_geofences(site_id: str, geojson: Dict[str, Any]):
+    """Replace a site's geofences with a GeoJSON FeatureCollection of polygons"""
+    from services.geofence import get_geofences
+    try:
+        fences = get_geofences().save(site_id, geojson)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"fences": fences.summary()}
+
+
+@app.post("/api/geofences/{site_id}/evaluate")
+async def evaluate_geofences(site_id: str, breadcrumbs: List[Dict[str, Any]]):
+    """
+    Evaluate breadcrumbs against the site's geofences.
+
+    Each breadcrumb carries latitude, longitude and optionally equipment_id
+    and timestamp. Returns the fences each breadcrumb is in and, when
+    equipment_id and timestamp are given, the entry/exit events.
+    """
+    from services.geofence import get_geofences
+    fences = get_geofences().get(site_id)
+    if fences is None:
+        raise HTTPException(status_code=404, detail=f"No geofences for site {site_id}")
+
+    def run():
+        lat = [b.get("latitude") for b in breadcrumbs]
+        lng = [b.get("longitude") for b in breadcrumbs]
+        inside = fences.contains(lat, lng)
+        result = {"fences": [fences.fence_ids[row].tolist() for row in inside]}
+        if breadcrumbs and all(b.get("equipment_id") is not None and b.get("timestamp") for b in breadcrumbs):
+            events, _ = fences.transitions(
+                [b["equipment_id"] for b in breadcrumbs], [b["timestamp"] for b in breadcrumbs], lat, lng,
+            )
+            events["timestamp"] = events["timestamp"].map(lambda t: t.isoformat())
+            result["events"] = events.to_dict("records")
+        return result
+
+    return await asyncio.get_running_loop().run_in_executor(None, run)
+
+
+@app.get("/api/geofences/{site_id}/events")
+async def get_geofence_events(site_id: str, limit: int = 100, kind: Optional[str] = None):
+    """Recent entry/exit events from ingested telemetry, newest first"""
+    from services.geofence import EVENT_HISTORY, get_geofences
+    limit = max(1, min(limit, EVENT_HISTORY))
+    if get_geofences().get(site_id) is None:
+        raise HTTPException(status_code=404, detail=f"No geofences for site {site_id}")
+    return {"events": get_geofences().events(site_id, limit, [kind] if kind else None)}
+
+
+@app.get("/api/geofences/{site_id}/occupancy")
+async def get_geofence_occupancy(site_id: str, kind: Optional[str] = None):
+    """Equipment currently inside each geofence, from ingested telemetry"""
+    from services.geofence import get_geofences
+    if get_geofences().get(site_id) is None:
+        raise HTTPException(status_code=404, detail=f"No geofences for site {site_id}")
+    return {"fences": get_geofences().occupancy(site_id, [kind] if kind else None)}
+
+
 # ============================================================================
 # Cycle Time Optimization Endpoints
 # ============================================================================
@@ -463,17 +813,49 @@ async def get_cycle_time_analysis(site_id: str):
     """Get cycle time analysis for a site"""
     try:
         sf = get_snowflake_service()
-        results = sf.get_cycle_analysis(site_id)
+        results = await asyncio.get_running_loop().run_in_executor(None, sf.get_cycle_analysis, site_id)
         return {"analysis": results}
     except Exception as e:
         logger.error(f"Failed to get cycle time analysis: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/cycle-time/predict")
+async def predict_cycle_times(rows: List[Dict[str, Any]]):
+    """
+    Predict cycle times for a batch of cycles with CYCLE_TIME_OPTIMIZER.
+    
+    Each row carries load_volume_yd3, haul_distance_miles and optionally
+    fuel_consumed_gal, cycle_start or hour_of_day / day_of_week; any other
+    fields (e.g. equipment_id) are echoed back. All rows are scored in one
+    model call.
+    """
+    from services.cycle_time_predictor import feature_frame, get_cycle_time_predictor
+    if not rows:
+        return {"predictions": [], "count": 0}
+    predictor = get_cycle_time_predictor()
+    try:
+        features = feature_frame(rows)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cycle rows: {e}")
+    try:
+        minutes = predictor.predict_features(features)
+    except Exception as e:
+        logger.error(f"Failed to predict cycle times: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "predictions": [
+            {**row, "predicted_cycle_minutes": round(float(m), 2)} for row, m in zip(rows, minutes)
+        ],
+        "count": len(rows),
+        "model": predictor.source,
+    }
+
+
 @app.get("/api/cycle-time/optimal-params")
-async def get_optimal_parameters():
+async def get_optimal_parameters(response: Response):
     """Get optimal cycle parameters by hour of day"""
-    try:
+    def load():
         sf = get_snowflake_service()
         sql = """
         SELECT HOUR_OF_DAY, OPTIMAL_VOLUME, OPTIMAL_DISTANCE, ACHIEVED_CYCLE_TIME
@@ -482,6 +864,9 @@ async def get_optimal_parameters():
         """
         results = sf.execute_query(sql)
         return {"params": results}
+
+    try:
+        return await serve_cached(response, "optimal-params", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get optimal parameters: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -515,10 +900,26 @@ async def get_ml_models():
     }
 
 
+@app.get("/api/ml/registry")
+async def get_model_registry_status():
+    """Model artifacts loaded in the backend: served versions, load times and memory"""
+    from services.model_registry import get_model_registry
+    return get_model_registry().metrics()
+
+
+@app.post("/api/ml/registry/refresh")
+async def refresh_model_registry():
+    """Load new model versions now instead of waiting for the watcher"""
+    from services.model_registry import get_model_registry
+    registry = get_model_registry()
+    served = await asyncio.get_running_loop().run_in_executor(None, registry.refresh_all)
+    return {"served": served, "errors": registry.metrics()["errors"]}
+
+
 @app.get("/api/ml/feature-importance/{model_name}")
-async def get_feature_importance(model_name: str):
+async def get_feature_importance(response: Response, model_name: str):
     """Get SHAP feature importance for a model"""
-    try:
+    def load():
         sf = get_snowflake_service()
         sql = f"""
         SELECT 
@@ -533,15 +934,18 @@ async def get_feature_importance(model_name: str):
         """
         results = sf.execute_query(sql)
         return {"model": model_name, "features": results}
+
+    try:
+        return await serve_cached(response, f"feature-importance:{model_name}", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get feature importance for {model_name}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/ml/metrics/{model_name}")
-async def get_model_metrics(model_name: str):
+async def get_model_metrics(response: Response, model_name: str):
     """Get performance metrics for a model"""
-    try:
+    def load():
         sf = get_snowflake_service()
         sql = f"""
         SELECT METRIC_NAME, METRIC_VALUE, METRIC_CONTEXT
@@ -550,15 +954,18 @@ async def get_model_metrics(model_name: str):
         """
         results = sf.execute_query(sql)
         return {"model": model_name, "metrics": results}
+
+    try:
+        return await serve_cached(response, f"model-metrics:{model_name}", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get metrics for {model_name}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/ml/pdp/{model_name}/{feature_name}")
-async def get_partial_dependence(model_name: str, feature_name: str):
+async def get_partial_dependence(response: Response, model_name: str, feature_name: str):
     """Get Partial Dependence Plot data for a feature"""
-    try:
+    def load():
         sf = get_snowflake_service()
         sql = f"""
         SELECT 
@@ -573,15 +980,18 @@ async def get_partial_dependence(model_name: str, feature_name: str):
         """
         results = sf.execute_query(sql)
         return {"model": model_name, "feature": feature_name, "pdp_data": results}
+
+    try:
+        return await serve_cached(response, f"pdp:{model_name}:{feature_name}", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get PDP for {model_name}/{feature_name}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/ml/calibration/{model_name}")
-async def get_calibration_curve(model_name: str):
+async def get_calibration_curve(response: Response, model_name: str):
     """Get calibration curve data for a model"""
-    try:
+    def load():
         sf = get_snowflake_service()
         sql = f"""
         SELECT 
@@ -594,6 +1004,9 @@ async def get_calibration_curve(model_name: str):
         """
         results = sf.execute_query(sql)
         return {"model": model_name, "calibration_data": results}
+
+    try:
+        return await serve_cached(response, f"calibration:{model_name}", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get calibration for {model_name}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -604,28 +1017,31 @@ async def get_calibration_curve(model_name: str):
 # ============================================================================
 
 @app.get("/api/ml/cost-assumptions")
-async def get_cost_assumptions(model_name: Optional[str] = None):
+async def get_cost_assumptions(response: Response, model_name: Optional[str] = None):
     """
     Get documented cost assumptions for ML models.
     Shows the business logic: fuel cost, labor rates, etc.
     """
-    try:
+    def load():
         sf = get_snowflake_service()
         results = sf.get_cost_assumptions(model_name)
         return {"assumptions": results}
+
+    try:
+        return await serve_cached(response, f"cost-assumptions:{model_name}", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get cost assumptions: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/ml/cost-matrix/{model_name}")
-async def get_cost_matrix(model_name: str, site_id: Optional[str] = None, period_type: str = "MONTHLY"):
+async def get_cost_matrix(response: Response, model_name: str, site_id: Optional[str] = None, period_type: str = "MONTHLY"):
     """
     Get realized business costs from ML predictions.
     Shows: true positives (savings), false positives (investigation cost), 
            false negatives (missed opportunity cost), net value.
     """
-    try:
+    def load():
         sf = get_snowflake_service()
         results = sf.get_cost_matrix(model_name, site_id, period_type)
         
@@ -655,18 +1071,21 @@ async def get_cost_matrix(model_name: str, site_id: Optional[str] = None, period
                 }
             }
         return {"model": model_name, "data": [], "summary": {}}
+
+    try:
+        return await serve_cached(response, f"cost-matrix:{model_name}:{site_id}:{period_type}", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get cost matrix for {model_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/ml/profit-curves/{model_name}")
-async def get_profit_curves(model_name: str, site_id: Optional[str] = None):
+async def get_profit_curves(response: Response, model_name: str, site_id: Optional[str] = None):
     """
     Get profit curves showing expected business value at different thresholds.
     Helps determine optimal alert threshold for maximum business value.
     """
-    try:
+    def load():
         sf = get_snowflake_service()
         results = sf.get_profit_curves(model_name, site_id)
         
@@ -685,60 +1104,72 @@ async def get_profit_curves(model_name: str, site_id: Optional[str] = None):
             } if optimal else None,
             "recommendation": f"Set alert threshold to {optimal.get('PROBABILITY_THRESHOLD', 0.5):.0%} for maximum daily value of ${optimal.get('EXPECTED_NET_DAILY_VALUE_USD', 0):.2f}" if optimal else None
         }
+
+    try:
+        return await serve_cached(response, f"profit-curves:{model_name}:{site_id}", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get profit curves for {model_name}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/ml/site-cost-summary")
-async def get_site_cost_summary(model_name: Optional[str] = None):
+async def get_site_cost_summary(response: Response, model_name: Optional[str] = None):
     """
     Get cost rollup by site - shows which sites are getting most value from ML.
     """
-    try:
+    def load():
         sf = get_snowflake_service()
         results = sf.get_site_cost_summary(model_name)
         return {"sites": results}
+
+    try:
+        return await serve_cached(response, f"site-cost-summary:{model_name}", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get site cost summary: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/ml/portfolio-summary")
-async def get_portfolio_summary(model_name: Optional[str] = None):
+async def get_portfolio_summary(response: Response, model_name: Optional[str] = None):
     """
     Get portfolio-level cost summary - total value across all sites.
     """
-    try:
+    def load():
         sf = get_snowflake_service()
         result = sf.get_portfolio_cost_summary(model_name)
         return result
+
+    try:
+        return await serve_cached(response, f"portfolio-summary:{model_name}", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get portfolio summary: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/ml/optimal-thresholds")
-async def get_optimal_thresholds(model_name: Optional[str] = None):
+async def get_optimal_thresholds(response: Response, model_name: Optional[str] = None):
     """
     Get optimal decision thresholds for each model/site combination.
     """
-    try:
+    def load():
         sf = get_snowflake_service()
         results = sf.get_optimal_thresholds(model_name)
         return {"thresholds": results}
+
+    try:
+        return await serve_cached(response, f"optimal-thresholds:{model_name}", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get optimal thresholds: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/ml/executive-summary")
-async def get_executive_ml_summary():
+async def get_executive_ml_summary(response: Response):
     """
     Executive dashboard: Total ML value across portfolio by model.
     Shows: "ML saved us $X this month across Y sites"
     """
-    try:
+    def load():
         sf = get_snowflake_service()
         
         models = ["GHOST_CYCLE_DETECTOR", "CHOKE_POINT_PREDICTOR", "CYCLE_TIME_OPTIMIZER"]
@@ -772,6 +1203,9 @@ async def get_executive_ml_summary():
                 "projected_annual_usd": round(total_annual, 2)
             }
         }
+
+    try:
+        return await serve_cached(response, "executive-summary", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Failed to get executive summary: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -786,11 +1220,11 @@ async def search_documents(request: SearchRequest):
     """Search safety plans and geotechnical reports"""
     try:
         sf = get_snowflake_service()
-        results = sf.search_documents(
+        results = await asyncio.get_running_loop().run_in_executor(None, lambda: sf.search_documents(
             query=request.query,
             limit=request.limit,
             document_type=request.document_type
-        )
+        ))
         return {"results": results, "count": len(results)}
     except Exception as e:
         logger.error(f"Document search failed: {request.query} - {str(e)}")
@@ -798,41 +1232,20 @@ async def search_documents(request: SearchRequest):
 
 
 @app.get("/api/ml/hidden-pattern-analysis")
-async def get_hidden_pattern_analysis():
+async def get_hidden_pattern_analysis(response: Response):
     """
     Get the Ghost Cycle hidden pattern analysis - THE WOW MOMENT.
     This is the key discovery that shows equipment appearing active but actually wasting fuel.
     """
-    try:
+    def load():
         sf = get_snowflake_service()
         return sf.get_ml_hidden_pattern_analysis()
+
+    try:
+        return await serve_cached(response, "hidden-pattern-analysis", load, fresh_for=ML_FRESH_SECONDS)
     except Exception as e:
         logger.error(f"Hidden pattern analysis error: {e}")
-        # Return fallback data for demo
-        return {
-            "totalGhostCycles": 156,
-            "totalFuelWasted": 1240,
-            "estimatedMonthlyCost": 47120,
-            "affectedEquipment": 23,
-            "affectedSites": 4,
-            "topOffenders": [
-                {"equipmentId": "H-07", "equipmentName": "CAT 793 #7", "ghostCount": 28, "fuelWasted": 224, "siteName": "Project Alpha"},
-                {"equipmentId": "H-12", "equipmentName": "CAT 793 #12", "ghostCount": 24, "fuelWasted": 192, "siteName": "Project Beta"},
-                {"equipmentId": "H-03", "equipmentName": "CAT 793 #3", "ghostCount": 21, "fuelWasted": 168, "siteName": "Project Alpha"},
-                {"equipmentId": "H-19", "equipmentName": "CAT 793 #19", "ghostCount": 18, "fuelWasted": 144, "siteName": "Project Gamma"},
-                {"equipmentId": "H-08", "equipmentName": "CAT 793 #8", "ghostCount": 15, "fuelWasted": 120, "siteName": "Project Delta"},
-            ],
-            "bySite": [
-                {"siteName": "Project Alpha", "ghostCount": 58, "fuelWasted": 464},
-                {"siteName": "Project Beta", "ghostCount": 42, "fuelWasted": 336},
-                {"siteName": "Project Gamma", "ghostCount": 31, "fuelWasted": 248},
-                {"siteName": "Project Delta", "ghostCount": 25, "fuelWasted": 192},
-            ],
-            "byHour": [
-                {"hour": h, "ghostCount": [12, 8, 15, 22, 18, 25, 28, 14, 8, 6][h - 6]}
-                for h in range(6, 16)
-            ]
-        }
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 # ============================================================================
@@ -869,38 +1282,150 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+# Seconds between fleet updates pushed to each realtime client
+REALTIME_PUSH_INTERVAL_SECONDS = float(os.getenv("REALTIME_PUSH_INTERVAL_SECONDS", "5"))
+
+
+# One ingest batch at a time, so per-truck state (previous readings, fence
+# membership) is updated in arrival order
+_ingest_lock = asyncio.Lock()
+
+
+@app.post("/api/ingest/telemetry")
+async def ingest_telemetry(events: List[Dict[str, Any]]):
+    """
+    Ingest a batch of live GPS + telematics readings.
+    
+    Each event carries equipment_id, site_id, timestamp, latitude, longitude,
+    speed_mph, engine_load_percent and fuel_rate_gph. Sites with fresh
+    readings are served to /ws/realtime from memory.
+
+    Events are validated once; invalid ones are counted as rejected and the
+    rest reach every consumer. The fan-out runs off the event loop.
+    """
+    from services.live_telemetry import clean_events, get_live_telemetry
+    from services.position_index import get_position_index
+    from services.map_matching import get_road_networks
+    from services.geofence import get_geofences
+    from services.choke_point_scorer import get_choke_point_scorer
+    from services.telemetry_buffer import get_telemetry_buffer
+
+    def fan_out() -> int:
+        clean, rejected = clean_events(events)
+        accepted = get_live_telemetry().ingest(clean, rejected=rejected)
+        get_position_index().update(clean)
+        get_road_networks().ingest(clean)
+        get_geofences().ingest(clean)
+        get_choke_point_scorer().ingest(clean)
+        get_telemetry_buffer().ingest(clean)
+        return accepted
+
+    async with _ingest_lock:
+        accepted = await asyncio.get_running_loop().run_in_executor(None, fan_out)
+    return {"accepted": accepted, "rejected": len(events) - accepted}
+
+
+@app.get("/api/equipment/{asset_id}/rolling")
+async def get_equipment_rolling_stats(asset_id: str, window_seconds: float = 300):
+    """
+    Rolling statistics of an asset's recent ingested telemetry.
+
+    Mean, standard deviation, min, max and latest speed, engine load, fuel
+    rate and payload over the trailing window, served from memory.
+    """
+    from services.telemetry_buffer import get_telemetry_buffer
+    if window_seconds <= 0:
+        raise HTTPException(status_code=400, detail="window_seconds must be positive")
+    stats = get_telemetry_buffer().rolling_stats(asset_id, window_seconds)
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"No live telemetry for {asset_id}")
+    return stats
+
+
 @app.websocket("/ws/realtime/{site_id}")
 async def websocket_realtime(websocket: WebSocket, site_id: str):
     """WebSocket for real-time fleet monitoring"""
+    from services.live_telemetry import get_live_telemetry
+    from services.position_index import get_position_index
     await manager.connect(websocket, site_id)
     
     try:
         sf = get_snowflake_service()
+        live = get_live_telemetry()
+        positions = get_position_index()
+        loop = asyncio.get_running_loop()
+        
+        def fetch_warehouse():
+            equipment = sf.get_equipment_telemetry(site_id)
+            positions.update(equipment, site_id=site_id)
+            # Check for ghost cycles and choke points
+            return equipment, sf.get_ghost_cycle_predictions(site_id)
         
         while True:
             try:
-                # Get latest equipment telemetry
-                equipment = sf.get_equipment_telemetry(site_id)
-                
-                # Check for ghost cycles and choke points
-                ghost_cycles = sf.get_ghost_cycle_predictions(site_id)
+                if live.has_live_data(site_id):
+                    # Ingested readings - no warehouse round trip
+                    equipment = live.site_equipment(site_id)
+                    ghost_cycles = live.ghost_cycle_alerts(equipment)
+                    source = "live"
+                else:
+                    # Warehouse reads block (and retry); keep them off the event loop
+                    equipment, ghost_cycles = await loop.run_in_executor(None, fetch_warehouse)
+                    source = "warehouse"
                 
                 await websocket.send_json({
                     "type": "fleet_update",
                     "site_id": site_id,
+                    "source": source,
                     "equipment": equipment,
                     "ghost_cycle_count": len(ghost_cycles),
                     "alerts": ghost_cycles[:5]  # Top 5 alerts
                 })
+            except WebSocketDisconnect:
+                raise
             except Exception as e:
                 logger.error(f"Failed to fetch data: {str(e)}")
             
-            await asyncio.sleep(5)
+            await asyncio.sleep(REALTIME_PUSH_INTERVAL_SECONDS)
             
     except WebSocketDisconnect:
         manager.disconnect(websocket, site_id)
 
 
+# ============================================================================
+# Live Position Endpoints
+# ============================================================================
+
+@app.get("/api/positions/{site_id}/radius")
+async def get_positions_in_radius(site_id: str, lat: float, lng: float, radius_m: float = 200.0):
+    """Equipment currently within radius_m metres of a point, nearest first"""
+    from services.position_index import get_position_index
+    if radius_m <= 0:
+        raise HTTPException(status_code=400, detail="radius_m must be positive")
+    equipment = get_position_index().within_radius(lat, lng, radius_m, site_id=site_id)
+    return {"equipment": equipment, "count": len(equipment)}
+
+
+@app.get("/api/positions/{site_id}/bbox")
+async def get_positions_in_bbox(site_id: str, south: float, west: float, north: float, east: float):
+    """Equipment currently inside a map viewport"""
+    from services.position_index import get_position_index
+    if south > north or west > east:
+        raise HTTPException(status_code=400, detail="Expected south <= north and west <= east")
+    equipment = get_position_index().within_bbox(south, west, north, east, site_id=site_id)
+    return {"equipment": equipment, "count": len(equipment)}
+
+
+@app.get("/api/positions/{site_id}/nearest")
+async def get_nearest_positions(site_id: str, lat: float, lng: float, k: int = 5, max_distance_m: Optional[float] = None):
+    """The k pieces of equipment currently nearest to a point"""
+    from services.position_index import get_position_index
+    if k < 1:
+        raise HTTPException(status_code=400, detail="k must be at least 1")
+    equipment = get_position_index().nearest(lat, lng, k, site_id=site_id, max_distance_m=max_distance_m)
+    return {"equipment": equipment, "count": len(equipment)}
+
+
 # ============================================================================
 # Startup/Shutdown Events
 # ============================================================================
@@ -908,14 +1433,25 @@ async def websocket_realtime(websocket: WebSocket, site_id: str):
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
+    from services.choke_point_scorer import get_choke_point_scorer, run_scheduler
+    from services.model_registry import get_model_registry, run_watcher
+    from services.position_index import get_position_index, run_pruner
     logger.info("Starting TERRA Geospatial Analytics API")
     logger.info("Snowflake connection will be established on first request")
+    # Warms the models before the first request, then hot-swaps new versions
+    app.state.model_watcher = asyncio.create_task(run_watcher(get_model_registry()))
+    app.state.choke_point_scorer = asyncio.create_task(run_scheduler(get_choke_point_scorer()))
+    app.state.position_pruner = asyncio.create_task(run_pruner(get_position_index()))
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down TERRA Geospatial Analytics API")
+    for task in ("choke_point_scorer", "model_watcher", "position_pruner"):
+        scheduler = getattr(app.state, task, None)
+        if scheduler is not None:
+            scheduler.cancel()
 
 
 # ============================================================================
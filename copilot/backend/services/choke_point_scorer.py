@@ -0,0 +1,422 @@
+"""
+Choke point scoring for TERRA
+
+Scores choke point risk per zone inside the backend from ingested telemetry,
+so /api/choke-points and the Watchdog no longer depend on an external job
+populating ML.CHOKE_POINT_PREDICTIONS.
+
+Zones are the geohash cells of notebook 03 (ZONE_PRECISION, ~150 m).
+Breadcrumbs are accumulated per site into per-minute zone aggregates (reading
+count, speed sum, sum of squares, minimum and distinct equipment) held in a
+small ring of minutes, like SegmentTraffic, so ingest costs a few bincounts
+and nothing is rescanned. Every SCORE_INTERVAL_SECONDS the scheduler takes
+each site's latest complete minute, builds the notebook features
+
+    AVG_SPEED, MIN_SPEED, SPEED_STD, TRAFFIC_DENSITY, UNIQUE_EQUIPMENT,
+    HOUR_OF_DAY, IS_MORNING, IS_PEAK_HOUR,
+    AVG_SPEED_PREV_5MIN, DENSITY_PREV_5MIN, SPEED_TREND, DENSITY_TREND
+
+for zones with at least MIN_TRAFFIC_DENSITY readings, scores them with the
+exported Random Forest and keeps the predictions in memory.
+
+Minutes are taken from each reading's recorded time, so replayed shifts are
+scored on their own clock. The ring is keyed by UTC minutes whatever the
+offsets in a batch; HOUR_OF_DAY is the site's local hour, as in the
+warehouse data the model was trained on, using the latest non-zero UTC
+offset the site's readings carried (naive and Z readings don't reset it). As in training (rows with no history are
+dropped), a zone is scored once it has been busy in one of the 5 previous
+minutes.
+
+The model is the notebook's fitted scaler + classifier pipeline, served by
+the model registry. Without an artifact, or without scikit-learn to
+unpickle it, zones are scored with the notebook's labelling rule instead.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .model_registry import ModelRegistry, get_model_registry
+    from .spatial_grid import ZONE_PRECISION, decode, encode, to_geohash
+except ImportError:
+    from services.model_registry import ModelRegistry, get_model_registry
+    from services.spatial_grid import ZONE_PRECISION, decode, encode, to_geohash
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "CHOKE_POINT_PREDICTOR"
+
+# Feature order the model was trained with (notebook 03)
+FEATURE_COLS = [
+    "AVG_SPEED", "MIN_SPEED", "SPEED_STD", "TRAFFIC_DENSITY", "UNIQUE_EQUIPMENT",
+    "HOUR_OF_DAY", "IS_MORNING", "IS_PEAK_HOUR",
+    "AVG_SPEED_PREV_5MIN", "DENSITY_PREV_5MIN", "SPEED_TREND", "DENSITY_TREND",
+]
+
+# Zone-minutes with fewer readings are not observations (notebook filter)
+MIN_TRAFFIC_DENSITY = 5
+
+# Minutes averaged into the *_PREV_5MIN lags
+LAG_MINUTES = 5
+
+# The lag minutes, the minute being scored and the one still filling
+RING_MINUTES = LAG_MINUTES + 2
+
+PEAK_HOURS = ((7, 9), (13, 14))
+
+SCORE_INTERVAL_SECONDS = float(os.environ.get("TERRA_CHOKE_SCORE_INTERVAL_SECONDS", "60"))
+
+# Predictions older than this are no longer served
+PREDICTION_MAX_AGE_SECONDS = 180.0
+
+# Same wait estimate as the Watchdog's rule-based fallback
+WAIT_MINUTES_PER_TRUCK = 2.5
+
+
+# UTC offset (or Z) at the end of an ISO time of day
+_UTC_OFFSET = re.compile(r"(\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)\s*(?:Z|[+-]\d{2}(?::?\d{2})?)$")
+
+
+def _minutes(timestamps: Iterable[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    UTC epoch minutes of ISO timestamps (naive ones taken as UTC) and each
+    one's UTC offset in minutes; -1 and 0 where unparseable.
+    """
+    raw = pd.Series([None if t is None else str(t) for t in timestamps], dtype=object)
+    utc = pd.to_datetime(raw, errors="coerce", utc=True, format="mixed")
+    # The same timestamps read as local wall-clock time, offsets dropped
+    wall = pd.to_datetime(raw.str.replace(_UTC_OFFSET, r"\1", regex=True), errors="coerce", format="mixed")
+    utc_ns = utc.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+    wall_ns = wall.to_numpy(dtype="datetime64[ns]")
+    minutes = np.where(np.isnat(utc_ns), -1, utc_ns.astype("datetime64[m]").astype(np.int64))
+    offset = np.where(
+        np.isnat(utc_ns) | np.isnat(wall_ns), 0,
+        np.round((wall_ns - utc_ns).astype("timedelta64[s]").astype(np.int64) / 60),
+    ).astype(np.int64)
+    return minutes, offset
+
+
+def rule_probability(features: pd.DataFrame) -> np.ndarray:
+    """The notebook's choke point label: slow, busy and shared by several trucks."""
+    return (
+        (features["AVG_SPEED"] < 5)
+        & (features["UNIQUE_EQUIPMENT"] > 3)
+        & (features["TRAFFIC_DENSITY"] > 10)
+    ).to_numpy(dtype=np.float64)
+
+
+def severity(probability: float) -> str:
+    if probability >= 0.8:
+        return "HIGH"
+    if probability >= 0.6:
+        return "MEDIUM"
+    return "LOW"
+
+
+class ZoneMinuteWindow:
+    """Rolling per-minute zone aggregates for one site"""
+
+    def __init__(self, ring_minutes: int = RING_MINUTES, precision: int = ZONE_PRECISION):
+        self.ring_minutes = ring_minutes
+        self.precision = precision
+        self._zone_of: Dict[int, int] = {}
+        self._equipment_code: Dict[str, int] = {}
+        self.zones = np.zeros(0, dtype=np.int64)
+        self._count = np.zeros((ring_minutes, 0))
+        self._speed_sum = np.zeros((ring_minutes, 0))
+        self._speed_sq = np.zeros((ring_minutes, 0))
+        self._speed_min = np.full((ring_minutes, 0), np.inf)
+        # (zone << 32 | equipment) pairs seen in each ring row
+        self._pairs: List[set] = [set() for _ in range(ring_minutes)]
+        # Minute (UTC epoch // 60) each ring row currently holds
+        self._minute = np.full(ring_minutes, -1, dtype=np.int64)
+        # Site UTC offset in minutes, for the local hour of day
+        self.utc_offset = 0
+        self._lock = threading.Lock()
+
+    @property
+    def latest_minute(self) -> int:
+        return int(self._minute.max())
+
+    def _zone_columns(self, cells: np.ndarray) -> np.ndarray:
+        """Ring column of each zone cell, adding columns for new zones."""
+        unique, inverse = np.unique(cells, return_inverse=True)
+        columns = np.empty(len(unique), dtype=np.int64)
+        for i, cell in enumerate(unique.tolist()):
+            column = self._zone_of.get(cell)
+            if column is None:
+                column = self._zone_of[cell] = len(self._zone_of)
+            columns[i] = column
+        n = len(self._zone_of)
+        if n > self._count.shape[1]:
+            grow = max(n, 2 * self._count.shape[1]) - self._count.shape[1]
+            pad = ((0, 0), (0, grow))
+            self._count = np.pad(self._count, pad)
+            self._speed_sum = np.pad(self._speed_sum, pad)
+            self._speed_sq = np.pad(self._speed_sq, pad)
+            self._speed_min = np.pad(self._speed_min, pad, constant_values=np.inf)
+            self.zones = np.pad(self.zones, (0, grow), constant_values=-1)
+        self.zones[columns] = unique
+        return columns[inverse]
+
+    def add(self, minute: np.ndarray, lat: np.ndarray, lng: np.ndarray,
+            speed: np.ndarray, equipment_ids: List[str], offset: Optional[np.ndarray] = None):
+        """Accumulate readings (minute = UTC epoch minutes, offset = their UTC offset in minutes)."""
+        if offset is None:
+            offset = np.zeros(len(minute), dtype=np.int64)
+        keep = (minute >= 0) & np.isfinite(lat) & np.isfinite(lng) & np.isfinite(speed)
+        if not keep.any():
+            return
+        minute, lat, lng, speed, offset = minute[keep], lat[keep], lng[keep], speed[keep], offset[keep]
+        equipment_ids = [e for e, k in zip(equipment_ids, keep) if k]
+        with self._lock:
+            latest = max(int(minute.max()), self.latest_minute)
+            fresh = minute > latest - self.ring_minutes
+            if not fresh.all():
+                minute, lat, lng, speed, offset = minute[fresh], lat[fresh], lng[fresh], speed[fresh], offset[fresh]
+                equipment_ids = [e for e, f in zip(equipment_ids, fresh) if f]
+            zone = self._zone_columns(encode(lat, lng, self.precision).astype(np.int64))
+            equipment = np.array(
+                [self._equipment_code.setdefault(e, len(self._equipment_code)) for e in equipment_ids],
+                dtype=np.int64,
+            )
+            row = minute % self.ring_minutes
+            # Recycle ring rows that still hold an older minute
+            for r, m in zip(*np.unique(np.column_stack([row, minute]), axis=0).T):
+                if self._minute[r] != m:
+                    if self._minute[r] > m:
+                        continue
+                    self._count[r] = self._speed_sum[r] = self._speed_sq[r] = 0.0
+                    self._speed_min[r] = np.inf
+                    self._pairs[r] = set()
+                    self._minute[r] = m
+            valid = self._minute[row] == minute
+            row, zone, speed, equipment = row[valid], zone[valid], speed[valid], equipment[valid]
+            local = np.flatnonzero(offset[valid] != 0)
+            if len(local):
+                self.utc_offset = int(offset[valid][local[-1]])
+            np.add.at(self._count, (row, zone), 1.0)
+            np.add.at(self._speed_sum, (row, zone), speed)
+            np.add.at(self._speed_sq, (row, zone), speed * speed)
+            np.minimum.at(self._speed_min, (row, zone), speed)
+            pairs = np.unique(np.column_stack([row, zone << 32 | equipment]), axis=0)
+            for r in np.unique(pairs[:, 0]).tolist():
+                self._pairs[r].update(pairs[pairs[:, 0] == r, 1].tolist())
+
+    def features(self, minute: int) -> pd.DataFrame:
+        """Notebook features of the zones observed in a minute; empty if it has left the ring."""
+        with self._lock:
+            row = minute % self.ring_minutes
+            if self._minute[row] != minute:
+                return pd.DataFrame(columns=["ZONE_CELL"] + FEATURE_COLS)
+            n_zones = len(self._zone_of)
+            count = self._count[row, :n_zones]
+            observed = count >= MIN_TRAFFIC_DENSITY
+
+            # Lags: mean over the zone's observed minutes among the previous LAG_MINUTES
+            prev_speed = np.zeros(n_zones)
+            prev_density = np.zeros(n_zones)
+            prev_n = np.zeros(n_zones)
+            for m in range(minute - LAG_MINUTES, minute):
+                r = m % self.ring_minutes
+                if self._minute[r] != m:
+                    continue
+                c = self._count[r, :n_zones]
+                seen = c >= MIN_TRAFFIC_DENSITY
+                prev_speed[seen] += self._speed_sum[r, :n_zones][seen] / c[seen]
+                prev_density[seen] += c[seen]
+                prev_n += seen
+            zones = np.flatnonzero(observed & (prev_n > 0))
+
+            n = count[zones]
+            speed_sum = self._speed_sum[row, zones]
+            variance = (self._speed_sq[row, zones] - speed_sum * speed_sum / n) / (n - 1)
+            equipment = np.bincount(
+                np.fromiter(self._pairs[row], dtype=np.int64, count=len(self._pairs[row])) >> 32,
+                minlength=n_zones,
+            )[zones]
+            frame = pd.DataFrame({
+                "ZONE_CELL": self.zones[zones],
+                "AVG_SPEED": speed_sum / n,
+                "MIN_SPEED": self._speed_min[row, zones],
+                "SPEED_STD": np.sqrt(np.maximum(variance, 0.0)),
+                "TRAFFIC_DENSITY": n,
+                "UNIQUE_EQUIPMENT": equipment.astype(np.float64),
+                "AVG_SPEED_PREV_5MIN": prev_speed[zones] / prev_n[zones],
+                "DENSITY_PREV_5MIN": prev_density[zones] / prev_n[zones],
+            })
+            local_minute = minute + self.utc_offset
+        hour = (local_minute // 60) % 24
+        frame["HOUR_OF_DAY"] = float(hour)
+        frame["IS_MORNING"] = float(hour < 12)
+        frame["IS_PEAK_HOUR"] = float(any(lo <= hour <= hi for lo, hi in PEAK_HOURS))
+        frame["SPEED_TREND"] = frame["AVG_SPEED"] - frame["AVG_SPEED_PREV_5MIN"]
+        frame["DENSITY_TREND"] = frame["TRAFFIC_DENSITY"] - frame["DENSITY_PREV_5MIN"]
+        return frame[["ZONE_CELL"] + FEATURE_COLS]
+
+
+class ChokePointScorer:
+    """Per-site zone windows and the latest choke point predictions"""
+
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        self.registry = registry or get_model_registry()
+        self._windows: Dict[str, ZoneMinuteWindow] = {}
+        self._predictions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.last_run_seconds = 0.0
+
+    def ingest(self, events: List[Dict[str, Any]]) -> int:
+        """Add live events to their site's zone window; returns how many were used."""
+        by_site: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events:
+            if event.get("site_id") and event.get("equipment_id"):
+                by_site.setdefault(event["site_id"], []).append(event)
+        used = 0
+        for site_id, site_events in by_site.items():
+            with self._lock:
+                window = self._windows.setdefault(site_id, ZoneMinuteWindow())
+            lat = np.array([e.get("latitude") for e in site_events], dtype=np.float64)
+            lng = np.array([e.get("longitude") for e in site_events], dtype=np.float64)
+            speed = np.array([e.get("speed_mph") for e in site_events], dtype=np.float64)
+            minute, offset = _minutes(e.get("source_timestamp") or e.get("timestamp") for e in site_events)
+            window.add(minute, lat, lng, speed, [str(e["equipment_id"]) for e in site_events], offset)
+            used += len(site_events)
+        return used
+
+    def score_site(self, site_id: str, minute: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Score a site's latest complete minute (or a given one) and keep the predictions."""
+        window = self._windows.get(site_id)
+        if window is None:
+            return []
+        if minute is None:
+            minute = window.latest_minute - 1
+        features = window.features(minute)
+        # Held for the whole run, so a hot swap can't change the model mid-site
+        loaded = self.registry.get(MODEL_NAME)
+        if features.empty:
+            probability, source = np.zeros(0), MODEL_NAME
+        elif loaded is not None:
+            probability, source = loaded.model.predict_proba(features[FEATURE_COLS])[:, 1], MODEL_NAME
+        else:
+            probability, source = rule_probability(features), "RULE_BASED_LIVE"
+        version = loaded.version if loaded is not None else None
+
+        lat, lng = decode(features["ZONE_CELL"].to_numpy(dtype=np.int64), window.precision)
+        names = to_geohash(features["ZONE_CELL"].to_numpy(dtype=np.int64), window.precision)
+        scored_at = pd.Timestamp(minute * 60, unit="s", tz="UTC").isoformat()
+        predictions = []
+        for i, p in enumerate(probability):
+            trucks = int(features["UNIQUE_EQUIPMENT"].iat[i])
+            level = severity(float(p))
+            predictions.append({
+                "PREDICTION_ID": f"{site_id}:{names[i]}:{minute}",
+                "SITE_ID": site_id,
+                "ZONE_NAME": str(names[i]),
+                "ZONE_LAT": round(float(lat[i]), 6),
+                "ZONE_LNG": round(float(lng[i]), 6),
+                "PREDICTION_TIMESTAMP": scored_at,
+                "CHOKE_PROBABILITY": round(float(p), 3),
+                "PREDICTED_SEVERITY": level,
+                "PREDICTED_WAIT_TIME_MIN": round(trucks * WAIT_MINUTES_PER_TRUCK, 1),
+                "PREDICTED_TRUCKS_AFFECTED": trucks,
+                # Scored on the zone's current traffic: the choke point is forming now
+                "PREDICTED_ONSET_TIME": scored_at,
+                "PREDICTION_HORIZON_MIN": 0,
+                "RECOMMENDED_ACTION": (
+                    "Divert incoming trucks to alternate route" if level == "HIGH"
+                    else "Stagger dispatch to this zone" if level == "MEDIUM"
+                    else "Monitor"
+                ),
+                "AVG_SPEED": round(float(features["AVG_SPEED"].iat[i]), 1),
+                "TRAFFIC_DENSITY": int(features["TRAFFIC_DENSITY"].iat[i]),
+                "SPEED_TREND": round(float(features["SPEED_TREND"].iat[i]), 1),
+                "DENSITY_TREND": round(float(features["DENSITY_TREND"].iat[i]), 1),
+                "MODEL": source,
+                "MODEL_VERSION": version,
+            })
+        predictions.sort(key=lambda r: r["CHOKE_PROBABILITY"], reverse=True)
+        with self._lock:
+            self._predictions[site_id] = {
+                "minute": minute, "scored_at": time.monotonic(), "predictions": predictions,
+            }
+        return predictions
+
+    def score_all(self) -> int:
+        """Score every site with a newly completed minute; returns sites scored."""
+        start = time.perf_counter()
+        scored = 0
+        with self._lock:
+            sites = list(self._windows.items())
+        for site_id, window in sites:
+            minute = window.latest_minute - 1
+            last = self._predictions.get(site_id)
+            if last is not None and last["minute"] >= minute:
+                continue
+            try:
+                self.score_site(site_id, minute)
+                scored += 1
+            except Exception as e:
+                logger.error(f"Choke point scoring failed for {site_id}: {e}")
+        self.runs += 1
+        self.last_run_seconds = time.perf_counter() - start
+        return scored
+
+    def has_predictions(self, site_id: str) -> bool:
+        last = self._predictions.get(site_id)
+        return last is not None and time.monotonic() - last["scored_at"] <= PREDICTION_MAX_AGE_SECONDS
+
+    def predictions(self, site_id: Optional[str] = None, min_probability: float = 0.0,
+                    limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Fresh predictions of a site (or all sites), most likely first."""
+        with self._lock:
+            sites = [site_id] if site_id is not None else list(self._predictions)
+            rows = [
+                p for s in sites if self.has_predictions(s)
+                for p in self._predictions[s]["predictions"] if p["CHOKE_PROBABILITY"] > min_probability
+            ]
+        rows.sort(key=lambda r: r["CHOKE_PROBABILITY"], reverse=True)
+        return rows[:limit] if limit is not None else rows
+
+    def metrics(self) -> Dict[str, Any]:
+        loaded = self.registry.get(MODEL_NAME, load=False)
+        with self._lock:
+            return {
+                "sites": len(self._windows),
+                "scored_sites": sum(1 for s in self._predictions if self.has_predictions(s)),
+                "runs": self.runs,
+                "last_run_seconds": round(self.last_run_seconds, 4),
+                "model": MODEL_NAME if loaded is not None else "RULE_BASED_LIVE",
+                "model_version": loaded.version if loaded is not None else None,
+            }
+
+
+async def run_scheduler(scorer: "ChokePointScorer", interval: float = SCORE_INTERVAL_SECONDS):
+    """Score all sites every interval seconds, off the event loop."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(None, scorer.score_all)
+        except Exception as e:
+            logger.error(f"Choke point scoring run failed: {e}")
+
+
+# Singleton instance
+_scorer: Optional[ChokePointScorer] = None
+
+
+def get_choke_point_scorer() -> ChokePointScorer:
+    """Get or create the choke point scorer singleton"""
+    global _scorer
+    if _scorer is None:
+        _scorer = ChokePointScorer()
+    return _scorer
@@ -0,0 +1,106 @@
+"""
+Cortex COMPLETE response cache for TERRA
+
+Supervisors on the same site tend to ask the same questions over the same
+context within minutes of each other. Completions are cached under a key
+built from the normalized prompt (case-folded, whitespace collapsed), the
+model and a data-version fingerprint (the source tables' latest
+LAST_ALTERED), so a repeated question is answered instantly without
+spending LLM credits, while a question asked against refreshed data
+misses. Entries expire after a TTL and the cache is bounded with LRU
+eviction.
+
+The cache is filled by the streaming client behind /api/complete/stream;
+SnowflakeServiceSPCS.cortex_complete also checks it but has no callers
+yet.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+_WHITESPACE = re.compile(r"\s+")
+
+COMPLETION_CACHE_MAX_ENTRIES = int(os.environ.get("CORTEX_COMPLETION_CACHE_MAX_ENTRIES", "512"))
+COMPLETION_CACHE_TTL_SECONDS = float(os.environ.get("CORTEX_COMPLETION_CACHE_TTL_SECONDS", "900"))
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case-fold and collapse whitespace so trivially different prompts share a key."""
+    return _WHITESPACE.sub(" ", prompt).strip().casefold()
+
+
+def completion_key(prompt: str, model: str, data_version: Optional[str] = None) -> str:
+    """Cache key for a completion: normalized prompt + model + data version."""
+    digest = hashlib.sha256()
+    for part in (model.lower(), data_version or "", normalize_prompt(prompt)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class CompletionCache:
+    """Thread-safe LRU + TTL cache of completion text"""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 900.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (completion, stored at)
+        self._entries: OrderedDict[str, Tuple[str, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, response: str):
+        with self._lock:
+            self._entries[key] = (response, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "ttl_s": self.ttl,
+            }
+
+
+# Singleton instance, shared by the SQL and streaming completion paths
+_completion_cache: Optional[CompletionCache] = None
+
+
+def get_completion_cache() -> CompletionCache:
+    """Get or create the completion cache singleton"""
+    global _completion_cache
+    if _completion_cache is None:
+        _completion_cache = CompletionCache(COMPLETION_CACHE_MAX_ENTRIES, COMPLETION_CACHE_TTL_SECONDS)
+    return _completion_cache
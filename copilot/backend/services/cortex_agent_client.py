@@ -11,6 +11,13 @@ import logging
 import httpx
 from typing import AsyncGenerator, Optional, Dict, Any, List
 
+try:
+    from .sse_decoder import SSEDecoder, SSEEvent
+    from .spcs_token import get_spcs_token_provider
+except ImportError:
+    from services.sse_decoder import SSEDecoder, SSEEvent
+    from services.spcs_token import get_spcs_token_provider
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,16 +36,15 @@ class CortexAgentClient:
         self.schema = "CONSTRUCTION_GEO"
         self.agent_name = "TERRA_COPILOT"
         self.host = os.environ.get("SNOWFLAKE_HOST", "")
-        self._token = None
+        self._token_provider = get_spcs_token_provider()
         
         logger.info(f"CortexAgentClient initialized: db={self.database}, schema={self.schema}, agent={self.agent_name}")
     
     def _get_token(self) -> str:
-        """Get OAuth token from SPCS session file."""
-        token_path = "/snowflake/session/token"
-        if os.path.exists(token_path):
-            with open(token_path, "r") as f:
-                return f.read().strip()
+        """Get OAuth token from SPCS session file (cached until rotated)."""
+        token = self._token_provider.get_token()
+        if token:
+            return token
         raise RuntimeError("No SPCS token available - not running in SPCS?")
     
     def _get_base_url(self) -> str:
@@ -142,23 +148,17 @@ class CortexAgentClient:
                         }
                         return
                     
-                    # Process SSE stream
-                    buffer = ""
-                    async for chunk in response.aiter_text():
-                        buffer += chunk
-                        
-                        # Process complete events (separated by double newlines)
-                        while "\n\n" in buffer:
-                            event_str, buffer = buffer.split("\n\n", 1)
-                            
-                            # Parse SSE event
-                            event = self._parse_sse_event(event_str)
+                    # Process SSE stream incrementally as bytes arrive
+                    decoder = SSEDecoder()
+                    async for chunk in response.aiter_bytes():
+                        for sse_event in decoder.feed(chunk):
+                            event = self._parse_sse_event(sse_event)
                             if event:
                                 yield event
                     
-                    # Process any remaining buffer
-                    if buffer.strip():
-                        event = self._parse_sse_event(buffer)
+                    # Process any event left unterminated at end of stream
+                    for sse_event in decoder.flush():
+                        event = self._parse_sse_event(sse_event)
                         if event:
                             yield event
             
@@ -171,9 +171,9 @@ class CortexAgentClient:
                 "content": str(e)
             }
     
-    def _parse_sse_event(self, event_str: str) -> Optional[Dict[str, Any]]:
+    def _parse_sse_event(self, sse_event: SSEEvent) -> Optional[Dict[str, Any]]:
         """
-        Parse an SSE event string from Cortex Agent API.
+        Convert a decoded SSE event from Cortex Agent API into a stream event.
         
         Event types from Cortex Agent:
         - response.output_text.delta - ACTUAL OUTPUT TEXT (display to user)
@@ -183,27 +183,17 @@ class CortexAgentClient:
         - response.tool_result.status - Tool execution status
         """
         try:
-            lines = event_str.strip().split("\n")
-            event_type = None
-            data = None
-            
-            for line in lines:
-                if line.startswith("event:"):
-                    event_type = line[6:].strip()
-                elif line.startswith("data:"):
-                    data_str = line[5:].strip()
-                    if data_str == "[DONE]":
-                        return {"type": "done"}
-                    try:
-                        data = json.loads(data_str)
-                    except json.JSONDecodeError:
-                        data = {"raw": data_str}
-            
-            if data is None:
-                return None
+            event_type = sse_event.event
+            data_str = sse_event.data
+            if data_str == "[DONE]":
+                return {"type": "done"}
+            try:
+                data = json.loads(data_str)
+            except json.JSONDecodeError:
+                data = {"raw": data_str}
             
-            # Log raw event for debugging - INFO level to capture all events
-            logger.info(f"SSE: type={event_type}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"SSE: type={event_type}")
             
             if not isinstance(data, dict):
                 return {"type": "text", "content": str(data)}
@@ -323,7 +313,7 @@ class CortexAgentClient:
                 return None
             
             # Log unknown event types for debugging
-            logger.info(f"SSE UNKNOWN: type={event_type}, keys={list(data.keys())}")
+            logger.debug(f"SSE UNKNOWN: type={event_type}, keys={list(data.keys())}")
             return None
             
         except Exception as e:
@@ -0,0 +1,195 @@
+"""
+Cortex COMPLETE streaming client for TERRA
+
+Calls the Snowflake Cortex REST complete endpoint with streaming enabled
+and yields text deltas as they are generated, in the same event shape as
+the Cortex Agent client, so callers can forward them straight to an SSE
+response. Perceived latency drops from full-generation time to
+time-to-first-token compared with SNOWFLAKE.CORTEX.COMPLETE over SQL.
+
+Completed responses go into the shared completion cache, and a cache hit
+is replayed as a single text event.
+
+Served by /api/complete/stream. The chat path doesn't call COMPLETE:
+/api/chat/stream streams from the Cortex Agent client, and the orchestrator
+composes its answers from query results. Any orchestrator step that starts
+generating text should stream through complete_stream, not
+SnowflakeServiceSPCS.cortex_complete.
+"""
+
+import json
+import logging
+import os
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+import httpx
+
+try:
+    from .sse_decoder import SSEDecoder, SSEEvent
+    from .spcs_token import get_spcs_token_provider
+    from .completion_cache import completion_key, get_completion_cache
+except ImportError:
+    from services.sse_decoder import SSEDecoder, SSEEvent
+    from services.spcs_token import get_spcs_token_provider
+    from services.completion_cache import completion_key, get_completion_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "mistral-large2"
+
+
+class CortexCompleteClient:
+    """
+    Client for the Snowflake Cortex complete REST API.
+
+    Endpoint: POST /api/v2/cortex/inference:complete
+
+    Authentication: OAuth token from SPCS (/snowflake/session/token)
+    """
+
+    def __init__(self):
+        self.host = os.environ.get("SNOWFLAKE_HOST", "")
+        self.timeout = float(os.environ.get("CORTEX_COMPLETE_TIMEOUT_SECONDS", "120"))
+        self._token_provider = get_spcs_token_provider()
+        self._cache = get_completion_cache()
+
+    def _get_token(self) -> str:
+        """Get OAuth token from SPCS session file (cached until rotated)."""
+        token = self._token_provider.get_token()
+        if token:
+            return token
+        raise RuntimeError("No SPCS token available - not running in SPCS?")
+
+    def _get_complete_url(self) -> str:
+        if not self.host:
+            raise RuntimeError("SNOWFLAKE_HOST environment variable not set")
+        return f"https://{self.host}/api/v2/cortex/inference:complete"
+
+    async def complete_stream(
+        self,
+        prompt: str,
+        model: str = DEFAULT_MODEL,
+        data_version: Optional[str] = None,
+        messages: Optional[List[Dict[str, str]]] = None,
+        use_cache: bool = True
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream a completion token by token.
+
+        Args:
+            prompt: User prompt (appended to messages as the last user turn)
+            model: Cortex model name
+            data_version: Fingerprint of the data the prompt was built from
+            messages: Optional prior messages with 'role' and 'content'
+            use_cache: Serve/store the completion in the completion cache
+
+        Yields:
+            {"type": "text", "content": ...} per delta, then {"type": "done"},
+            or {"type": "error", "content": ...}
+        """
+        cache_key = completion_key(prompt, model, data_version)
+        # Prior turns change the answer; only single-turn prompts are cached
+        cacheable = use_cache and not messages
+        if cacheable:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                yield {"type": "text", "content": cached}
+                yield {"type": "done", "cached": True}
+                return
+
+        body = {
+            "model": model,
+            "messages": list(messages or []) + [{"role": "user", "content": prompt}],
+            "stream": True,
+        }
+        parts: List[str] = []
+        usage: Dict[str, Any] = {}
+
+        try:
+            headers = {
+                "Authorization": f"Bearer {self._get_token()}",
+                "Content-Type": "application/json",
+                "Accept": "text/event-stream",
+                "X-Snowflake-Authorization-Token-Type": "OAUTH",
+            }
+            url = self._get_complete_url()
+            logger.info(f"Calling Cortex complete: model={model}")
+
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                async with client.stream("POST", url, headers=headers, json=body) as response:
+                    if response.status_code != 200:
+                        error_text = await response.aread()
+                        logger.error(f"Complete API error: {response.status_code} - {error_text[:500]}")
+                        yield {
+                            "type": "error",
+                            "content": f"Complete API error: {response.status_code}",
+                            "details": error_text.decode(errors="replace") if error_text else ""
+                        }
+                        return
+
+                    decoder = SSEDecoder()
+                    async for chunk in response.aiter_bytes():
+                        for sse_event in decoder.feed(chunk):
+                            text = self._parse_delta(sse_event, usage)
+                            if text:
+                                parts.append(text)
+                                yield {"type": "text", "content": text}
+                    for sse_event in decoder.flush():
+                        text = self._parse_delta(sse_event, usage)
+                        if text:
+                            parts.append(text)
+                            yield {"type": "text", "content": text}
+        except Exception as e:
+            logger.error(f"Cortex complete stream error: {e}")
+            yield {"type": "error", "content": str(e)}
+            return
+
+        if cacheable and parts:
+            self._cache.put(cache_key, "".join(parts))
+        yield {"type": "done", "usage": usage} if usage else {"type": "done"}
+
+    def _parse_delta(self, sse_event: SSEEvent, usage: Dict[str, Any]) -> Optional[str]:
+        """Extract the text delta from one streamed chunk, recording token usage."""
+        if not sse_event.data or sse_event.data == "[DONE]":
+            return None
+        try:
+            data = json.loads(sse_event.data)
+        except json.JSONDecodeError:
+            logger.debug(f"Complete stream: non-JSON data {sse_event.data[:100]}")
+            return None
+        if not isinstance(data, dict):
+            return None
+
+        if isinstance(data.get("usage"), dict):
+            usage.update(data["usage"])
+
+        texts = []
+        for choice in data.get("choices") or []:
+            delta = choice.get("delta") or {}
+            # Deltas carry the text as "content" (or "text" in older responses)
+            text = delta.get("content") or delta.get("text")
+            if isinstance(text, str):
+                texts.append(text)
+        return "".join(texts) or None
+
+    async def complete(self, prompt: str, model: str = DEFAULT_MODEL, data_version: Optional[str] = None) -> str:
+        """Collect a streamed completion into one string (empty on error)."""
+        parts = []
+        async for event in self.complete_stream(prompt, model, data_version):
+            if event["type"] == "text":
+                parts.append(event["content"])
+            elif event["type"] == "error":
+                return ""
+        return "".join(parts)
+
+
+# Singleton instance
+_complete_client: Optional[CortexCompleteClient] = None
+
+
+def get_cortex_complete_client() -> CortexCompleteClient:
+    """Get or create Cortex complete client singleton."""
+    global _complete_client
+    if _complete_client is None:
+        _complete_client = CortexCompleteClient()
+    return _complete_client
@@ -0,0 +1,210 @@
+"""
+Cycle time prediction for TERRA
+
+Serves the CYCLE_TIME_OPTIMIZER model (notebook 02, scaler + Gradient
+Boosting) in the backend. The model is loaded once and every request is a
+batch: feature rows are built column-wise from the raw cycle fields and
+scored in a single predict call, so a dispatcher can score the next cycle
+of every truck on a site each minute.
+
+Rows carry the fields the notebook trained on - LOAD_VOLUME_YD3,
+HAUL_DISTANCE_MILES, FUEL_CONSUMED_GAL and either CYCLE_START or
+HOUR_OF_DAY / DAY_OF_WEEK (keys are case-insensitive). Fields not known
+before a cycle starts are filled with the fleet's typical values, and the
+derived features (IS_MORNING, IS_PEAK_HOUR, VOLUME_PER_MILE,
+FUEL_EFFICIENCY) are computed exactly as in the notebook.
+
+The model is served by the model registry. Without an artifact, or without
+scikit-learn to unpickle it, predictions fall back to the site average with
+the peak-hour uplift.
+"""
+
+import time
+from typing import Any, Dict, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .model_registry import ModelRegistry, get_model_registry
+except ImportError:
+    from services.model_registry import ModelRegistry, get_model_registry
+
+MODEL_NAME = "CYCLE_TIME_OPTIMIZER"
+
+# Feature order the model was trained with (notebook 02)
+FEATURE_COLS = [
+    "LOAD_VOLUME_YD3",
+    "HAUL_DISTANCE_MILES",
+    "FUEL_CONSUMED_GAL",
+    "HOUR_OF_DAY",
+    "DAY_OF_WEEK",
+    "IS_MORNING",
+    "IS_PEAK_HOUR",
+    "VOLUME_PER_MILE",
+    "FUEL_EFFICIENCY",
+]
+
+# Typical haul truck cycle, for fields a row leaves out
+DEFAULTS = {
+    "LOAD_VOLUME_YD3": 210.0,
+    "HAUL_DISTANCE_MILES": 1.25,
+    "FUEL_CONSUMED_GAL": 11.0,
+}
+
+PEAK_HOURS = ((7, 9), (13, 14))
+
+# Fallback: site average cycle, slower in peak hours
+BASE_CYCLE_MINUTES = 22.0
+PEAK_HOUR_FACTOR = 1.15
+
+# Training kept cycles in this range
+MIN_CYCLE_MINUTES = 5.0
+MAX_CYCLE_MINUTES = 60.0
+
+
+def _wall_clock(value: Any) -> pd.Timestamp:
+    """Local wall-clock time of one timestamp, in its own UTC offset; NaT if unparseable."""
+    parsed = pd.to_datetime(value, errors="coerce")
+    if parsed is None or pd.isna(parsed):
+        return pd.NaT
+    return parsed.tz_localize(None) if parsed.tzinfo is not None else parsed
+
+
+def feature_frame(rows: Union[pd.DataFrame, Sequence[Dict[str, Any]]],
+                  hour: Optional[int] = None) -> pd.DataFrame:
+    """
+    Model features for raw cycle rows.
+
+    Args:
+        rows: Cycle rows (dicts or a DataFrame)
+        hour: Hour of day for rows without CYCLE_START or HOUR_OF_DAY (default now)
+
+    Returns:
+        DataFrame with FEATURE_COLS, one row per input row
+    """
+    if isinstance(rows, pd.DataFrame):
+        raw = rows.copy()
+        raw.columns = [str(c).upper() for c in raw.columns]
+        if raw.columns.duplicated().any():
+            # Same field in two cases: the first non-null value per row
+            raw = pd.DataFrame({
+                name: raw.loc[:, raw.columns == name].bfill(axis=1).iloc[:, 0]
+                for name in dict.fromkeys(raw.columns)
+            })
+    else:
+        # Keys normalized per row, so rows may mix cases
+        raw = pd.DataFrame([{str(k).upper(): v for k, v in row.items()} for row in rows])
+    n = len(raw)
+
+    def column(name: str, default: float) -> np.ndarray:
+        values = pd.to_numeric(raw[name], errors="coerce") if name in raw else pd.Series(np.nan, index=raw.index)
+        return values.fillna(default).to_numpy(dtype=np.float64)
+
+    features = pd.DataFrame(index=raw.index)
+    for name, default in DEFAULTS.items():
+        features[name] = column(name, default)
+
+    now = pd.Timestamp.now()
+    if "CYCLE_START" in raw:
+        # Parsed per row: rows may carry different UTC offsets, and the
+        # model wants each cycle's local hour
+        start = pd.Series([_wall_clock(v) for v in raw["CYCLE_START"]], index=raw.index, dtype="datetime64[ns]")
+        start_hour = start.dt.hour.to_numpy(dtype=np.float64)
+        # Snowflake DAYOFWEEK: Sunday = 0
+        start_day = ((start.dt.dayofweek + 1) % 7).to_numpy(dtype=np.float64)
+    else:
+        start_hour = start_day = np.full(n, np.nan)
+    hour_of_day = column("HOUR_OF_DAY", np.nan)
+    hour_of_day = np.where(np.isnan(hour_of_day), start_hour, hour_of_day)
+    hour_of_day = np.where(np.isnan(hour_of_day), now.hour if hour is None else hour, hour_of_day)
+    day_of_week = column("DAY_OF_WEEK", np.nan)
+    day_of_week = np.where(np.isnan(day_of_week), start_day, day_of_week)
+    day_of_week = np.where(np.isnan(day_of_week), (now.dayofweek + 1) % 7, day_of_week)
+
+    features["HOUR_OF_DAY"] = hour_of_day
+    features["DAY_OF_WEEK"] = day_of_week
+    features["IS_MORNING"] = (hour_of_day < 12).astype(np.float64)
+    peak = np.zeros(n, dtype=bool)
+    for lo, hi in PEAK_HOURS:
+        peak |= (hour_of_day >= lo) & (hour_of_day <= hi)
+    features["IS_PEAK_HOUR"] = peak.astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        features["VOLUME_PER_MILE"] = features["LOAD_VOLUME_YD3"] / features["HAUL_DISTANCE_MILES"]
+        features["FUEL_EFFICIENCY"] = features["LOAD_VOLUME_YD3"] / features["FUEL_CONSUMED_GAL"]
+    # Zero distance or fuel: not in training (dropna), use the typical ratios
+    for name, (num, den) in {"VOLUME_PER_MILE": ("LOAD_VOLUME_YD3", "HAUL_DISTANCE_MILES"),
+                             "FUEL_EFFICIENCY": ("LOAD_VOLUME_YD3", "FUEL_CONSUMED_GAL")}.items():
+        bad = ~np.isfinite(features[name])
+        if bad.any():
+            features.loc[bad, name] = DEFAULTS[num] / DEFAULTS[den]
+    return features[FEATURE_COLS]
+
+
+def fallback_minutes(features: pd.DataFrame, base_minutes: float = BASE_CYCLE_MINUTES) -> np.ndarray:
+    """Cycle time without the model: the base cycle, 15% longer in peak hours."""
+    return np.where(features["IS_PEAK_HOUR"].to_numpy() > 0, base_minutes * PEAK_HOUR_FACTOR, base_minutes)
+
+
+class CycleTimePredictor:
+    """Batched cycle time predictions from the exported model"""
+
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        self.registry = registry or get_model_registry()
+        self.batches = 0
+        self.rows_scored = 0
+        self.predict_seconds = 0.0
+
+    @property
+    def source(self) -> str:
+        return MODEL_NAME if self.registry.get(MODEL_NAME) is not None else "BASELINE"
+
+    def predict(self, rows: Union[pd.DataFrame, Sequence[Dict[str, Any]]], hour: Optional[int] = None,
+                base_minutes: float = BASE_CYCLE_MINUTES) -> np.ndarray:
+        """
+        Predicted cycle minutes for a batch of cycle rows, in one model call.
+
+        base_minutes is the fallback cycle time (e.g. the site average) when
+        the model is unavailable.
+        """
+        start = time.perf_counter()
+        return self.predict_features(feature_frame(rows, hour), base_minutes, start)
+
+    def predict_features(self, features: pd.DataFrame, base_minutes: float = BASE_CYCLE_MINUTES,
+                         start: Optional[float] = None) -> np.ndarray:
+        """Predicted cycle minutes for rows already built by feature_frame."""
+        start = time.perf_counter() if start is None else start
+        if features.empty:
+            return np.zeros(0)
+        loaded = self.registry.get(MODEL_NAME)
+        if loaded is not None:
+            minutes = np.asarray(loaded.model.predict(features), dtype=np.float64).reshape(len(features), -1)[:, 0]
+        else:
+            minutes = fallback_minutes(features, base_minutes)
+        minutes = np.clip(minutes, MIN_CYCLE_MINUTES, MAX_CYCLE_MINUTES)
+        self.batches += 1
+        self.rows_scored += len(features)
+        self.predict_seconds += time.perf_counter() - start
+        return minutes
+
+    def metrics(self) -> Dict[str, Any]:
+        loaded = self.registry.get(MODEL_NAME, load=False)
+        return {
+            "model": MODEL_NAME if loaded is not None else "BASELINE",
+            "model_version": loaded.version if loaded is not None else None,
+            "batches": self.batches,
+            "rows_scored": self.rows_scored,
+            "avg_batch_ms": round(self.predict_seconds / self.batches * 1000, 3) if self.batches else None,
+        }
+
+
+# Singleton instance
+_predictor: Optional[CycleTimePredictor] = None
+
+
+def get_cycle_time_predictor() -> CycleTimePredictor:
+    """Get or create the cycle time predictor singleton"""
+    global _predictor
+    if _predictor is None:
+        _predictor = CycleTimePredictor()
+    return _predictor
@@ -0,0 +1,196 @@
+"""
+Geodesic utilities for TERRA
+
+One vectorized implementation of the distance and projection maths shared
+by cycle segmentation, trail simplification, map matching, geofences, the
+position index and live speed validation:
+
+- haversine_m: great-circle distance, broadcasting over arrays
+- path_length_m: cumulative distance along breadcrumbs, reset per truck
+- implied_speed_mph: speed between consecutive breadcrumbs, to validate the
+  speed the GPS unit reports
+- LocalProjection: east/north metres in the tangent plane of a site origin
+  (the horizontal part of ENU), cached per site by site_projection
+
+Sites span a few kilometres, where a tangent plane scaled by the WGS84
+radii of curvature at the origin is accurate to a fraction of a metre and,
+unlike UTM, needs no zone bookkeeping. Haversine uses the mean earth
+radius, so its distances differ from projected ones by a few tenths of a
+percent, well inside GPS noise for haul distances.
+"""
+
+import math
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Mean earth radius (IUGG), for great-circle distances
+EARTH_RADIUS_M = 6_371_008.8
+
+# WGS84 ellipsoid, for the local projection scale
+WGS84_A = 6_378_137.0
+WGS84_E2 = 6.694379990141e-3
+
+METERS_PER_MILE = 1609.344
+SECONDS_PER_HOUR = 3600.0
+
+# Reported and breadcrumb-implied speeds may differ by this much (GPS noise,
+# speed sampled at a different instant than the position)
+SPEED_TOLERANCE_MPH = 8.0
+
+# Faster than any haul truck; implied speeds above this are position jumps
+MAX_PLAUSIBLE_SPEED_MPH = 70.0
+
+
+def haversine_m(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Great-circle distance in metres between points (arrays broadcast)."""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def degree_offsets(latitude: float, distance_m: float) -> Tuple[float, float]:
+    """(latitude, longitude) degrees spanned by distance_m at a latitude, for bounding boxes."""
+    d_lat = math.degrees(distance_m / EARTH_RADIUS_M)
+    return d_lat, d_lat / max(math.cos(math.radians(latitude)), 1e-6)
+
+
+def group_starts(groups: Optional[Sequence[Any]], n: int) -> np.ndarray:
+    """True where a new group (e.g. truck) starts in data sorted by group."""
+    starts = np.zeros(n, dtype=bool)
+    if n:
+        starts[0] = True
+        if groups is not None:
+            groups = np.asarray(groups)
+            starts[1:] = groups[1:] != groups[:-1]
+    return starts
+
+
+def step_distances_m(lat: Sequence[float], lng: Sequence[float],
+                     groups: Optional[Sequence[Any]] = None) -> np.ndarray:
+    """
+    Distance from the previous breadcrumb of the same group.
+
+    Breadcrumbs must be sorted by group and time. The first breadcrumb of
+    each group, and any step from or to a missing position, is 0.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    step = np.zeros(len(lat))
+    if len(lat) > 1:
+        step[1:] = haversine_m(lat[:-1], lng[:-1], lat[1:], lng[1:])
+    step[group_starts(groups, len(lat))] = 0.0
+    return np.nan_to_num(step)
+
+
+def path_length_m(lat: Sequence[float], lng: Sequence[float],
+                  groups: Optional[Sequence[Any]] = None) -> np.ndarray:
+    """
+    Cumulative distance travelled at each breadcrumb, restarting at 0 for
+    each group; the distance between breadcrumbs i and j of one group is
+    path[j] - path[i].
+    """
+    step = step_distances_m(lat, lng, groups)
+    path = np.cumsum(step)
+    if groups is not None and len(path):
+        # Subtract the running total at each group's first breadcrumb
+        starts = np.flatnonzero(group_starts(groups, len(path)))
+        path -= np.repeat(path[starts], np.diff(np.append(starts, len(path))))
+    return path
+
+
+def implied_speed_mph(timestamps: Sequence[Any], lat: Sequence[float], lng: Sequence[float],
+                      groups: Optional[Sequence[Any]] = None) -> np.ndarray:
+    """
+    Speed implied by the distance and time from the previous breadcrumb of
+    the same group (sorted by group and time); NaN where undefined.
+    Unparseable timestamps count as missing.
+    """
+    ts = np.asarray(timestamps)
+    if np.issubdtype(ts.dtype, np.datetime64):
+        ts = ts.astype("datetime64[ns]")
+    else:
+        # ISO strings from ingest, possibly mixing offsets; compared in UTC
+        parsed = pd.to_datetime(pd.Series(ts, dtype=object), errors="coerce", utc=True, format="mixed")
+        ts = parsed.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    speed = np.full(len(ts), np.nan)
+    if len(ts) < 2:
+        return speed
+    seconds = np.diff(ts).astype("timedelta64[ns]").astype(np.float64) / 1e9
+    # NaT differences come out as huge negative numbers
+    seconds[np.isnat(ts[1:]) | np.isnat(ts[:-1])] = np.nan
+    distance = haversine_m(lat[:-1], lng[:-1], lat[1:], lng[1:])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed[1:] = np.where(seconds > 0, distance / seconds * SECONDS_PER_HOUR / METERS_PER_MILE, np.nan)
+    speed[group_starts(groups, len(ts))] = np.nan
+    return speed
+
+
+def speed_mismatch(reported_mph: Sequence[float], implied_mph: Sequence[float],
+                   tolerance_mph: float = SPEED_TOLERANCE_MPH,
+                   max_speed_mph: float = MAX_PLAUSIBLE_SPEED_MPH) -> np.ndarray:
+    """
+    Readings whose reported speed disagrees with the breadcrumbs, or whose
+    position jumped implausibly far; False where either speed is unknown.
+    """
+    reported = np.asarray(reported_mph, dtype=np.float64)
+    implied = np.asarray(implied_mph, dtype=np.float64)
+    known = np.isfinite(reported) & np.isfinite(implied)
+    return known & ((np.abs(reported - implied) > tolerance_mph) | (implied > max_speed_mph))
+
+
+class LocalProjection:
+    """East/north metres in the tangent plane at an origin"""
+
+    def __init__(self, origin_lat: float, origin_lng: float):
+        self.origin_lat = float(origin_lat)
+        self.origin_lng = float(origin_lng)
+        sin_lat = math.sin(math.radians(self.origin_lat))
+        w = 1.0 - WGS84_E2 * sin_lat * sin_lat
+        # Metres per radian north (meridional radius) and east (parallel radius)
+        self.north_m = WGS84_A * (1.0 - WGS84_E2) / w ** 1.5
+        self.east_m = WGS84_A / math.sqrt(w) * math.cos(math.radians(self.origin_lat))
+
+    @classmethod
+    def around(cls, lat: Sequence[float], lng: Sequence[float]) -> "LocalProjection":
+        """Projection centred on the mean of some points (ignoring missing ones)."""
+        return cls(float(np.nanmean(np.asarray(lat, dtype=np.float64))),
+                   float(np.nanmean(np.asarray(lng, dtype=np.float64))))
+
+    def forward(self, lat: Sequence[float], lng: Sequence[float]) -> np.ndarray:
+        """(n, 2) east/north metres of each point."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        x = np.radians(lng - self.origin_lng) * self.east_m
+        y = np.radians(lat - self.origin_lat) * self.north_m
+        return np.column_stack([x, y])
+
+    def inverse(self, x: Sequence[float], y: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """(lat, lng) of east/north metres."""
+        lat = self.origin_lat + np.degrees(np.asarray(y, dtype=np.float64) / self.north_m)
+        lng = self.origin_lng + np.degrees(np.asarray(x, dtype=np.float64) / self.east_m)
+        return lat, lng
+
+
+_projections: Dict[str, LocalProjection] = {}
+_projections_lock = threading.Lock()
+
+
+def site_projection(site_id: str, origin_lat: Optional[float] = None,
+                    origin_lng: Optional[float] = None) -> Optional[LocalProjection]:
+    """
+    The cached projection of a site.
+
+    The first call with an origin (e.g. the site centre) fixes it, so every
+    caller works in the same metres; returns None for an unknown site when
+    no origin is given.
+    """
+    with _projections_lock:
+        projection = _projections.get(site_id)
+        if projection is None and origin_lat is not None and origin_lng is not None:
+            projection = _projections[site_id] = LocalProjection(origin_lat, origin_lng)
+        return projection
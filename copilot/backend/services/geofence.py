@@ -0,0 +1,577 @@
+"""
+Geofence engine for TERRA
+
+Evaluates the polygons of a site's safety and earthworks plans (exclusion
+zones, pedestrian areas, cut/fill and load/dump zones) against breadcrumbs,
+in vectorized batches, and turns membership changes into entry/exit events
+for the watchdog and cycle segmentation.
+
+Geofences are GeoJSON FeatureCollections of Polygons/MultiPolygons, one file
+per site at TERRA_GEOFENCES_DIR/{site_id}.geojson (default config/geofences),
+with the properties fence_id, name and kind (one of FENCE_KINDS).
+
+Point-in-polygon is the even-odd crossing rule, prepared once per site: the
+rings are projected to local metres, split into edges and bucketed into a
+square grid, and every cell centre is classified against every fence by ray
+casting. A breadcrumb then starts from its cell centre's status and only
+flips it for the edges of its own cell that lie between it and the centre,
+so breadcrumbs away from fence boundaries cost a table lookup and the rest
+test a handful of edges instead of every edge of every fence. Holes and
+multi-part fences need no special handling under the even-odd rule.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .cycle_segmentation import DUMP, LOAD, Zone
+    from .geodesy import LocalProjection, site_projection
+except ImportError:
+    from services.cycle_segmentation import DUMP, LOAD, Zone
+    from services.geodesy import LocalProjection, site_projection
+
+logger = logging.getLogger(__name__)
+
+GEOFENCES_DIR = os.environ.get(
+    "TERRA_GEOFENCES_DIR", str(Path(__file__).resolve().parent.parent / "config" / "geofences")
+)
+
+FENCE_KINDS = ("EXCLUSION", "PEDESTRIAN", "CUT", "FILL", "LOAD", "DUMP", "GENERAL")
+
+# Entering these raises a watchdog alert
+RESTRICTED_KINDS = ("EXCLUSION", "PEDESTRIAN")
+
+# Fences that count as load/dump zones for cycle segmentation
+CYCLE_KINDS = {"CUT": LOAD, "LOAD": LOAD, "FILL": DUMP, "DUMP": DUMP}
+
+ENTER = "ENTER"
+EXIT = "EXIT"
+
+EVENT_COLUMNS = ["equipment_id", "fence_id", "fence_name", "kind", "event", "timestamp", "latitude", "longitude"]
+
+# Edge index cell size (grown for large sites, see MAX_GRID_CELLS)
+GRID_CELL_M = 25.0
+
+# Upper bound on cells x fences in the cell centre status table
+MAX_GRID_CELLS = 4_000_000
+
+# Breadcrumbs evaluated per vectorized pass (bounds the candidate pair arrays)
+CHUNK_POINTS = 250_000
+
+# Live entry/exit events kept per site
+EVENT_HISTORY = 1000
+
+
+def _bucket(items: np.ndarray, first: np.ndarray, span: np.ndarray, n_buckets: int):
+    """CSR index of items over buckets first .. first + span - 1."""
+    item = np.repeat(items, span)
+    bucket = np.repeat(first, span) + (np.arange(span.sum()) - np.repeat(np.cumsum(span) - span, span))
+    order = np.argsort(bucket, kind="stable")
+    counts = np.bincount(bucket, minlength=n_buckets)
+    return item[order], np.cumsum(counts) - counts, counts
+
+
+def _candidates(points: np.ndarray, bucket: np.ndarray, items: np.ndarray,
+                starts: np.ndarray, counts: np.ndarray):
+    """(point, item) pairs for every item in each point's bucket."""
+    counts = counts[bucket]
+    point = np.repeat(points, counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return point, items[np.repeat(starts[bucket], counts) + k]
+
+
+def _orient(ax, ay, bx, by, px, py):
+    """Twice the signed area of triangle a, b, p (> 0 when p is left of a -> b)."""
+    return (bx - ax) * (py - ay) - (by - ay) * (px - ax)
+
+
+class GeofenceSet:
+    """Polygons of one site, prepared for batch point-in-polygon tests"""
+
+    def __init__(self, fences: List[Dict[str, Any]], cell_m: float = GRID_CELL_M,
+                 projection: Optional[LocalProjection] = None):
+        """
+        Args:
+            fences: Dicts with fence_id, name, kind and polygons
+                ([[exterior, hole, ...], ...] of [[lng, lat], ...] rings)
+            projection: Local projection to work in (default: around the
+                fences' own coordinates)
+        """
+        if not fences:
+            raise ValueError("A geofence set needs at least one fence")
+        self.cell_m = cell_m
+        self.fence_ids = np.array([str(f["fence_id"]) for f in fences])
+        if len(set(self.fence_ids.tolist())) != len(fences):
+            raise ValueError("Duplicate fence_id")
+        self.names = np.array([f.get("name") or str(f["fence_id"]) for f in fences])
+        self.kinds = np.array([str(f.get("kind") or "GENERAL").upper() for f in fences])
+        unknown = sorted(set(self.kinds.tolist()) - set(FENCE_KINDS))
+        if unknown:
+            raise ValueError(f"Unknown fence kind(s) {unknown}; expected one of {FENCE_KINDS}")
+
+        rings = [
+            (i, np.asarray(ring, dtype=np.float64)[:, :2])
+            for i, f in enumerate(fences) for polygon in f["polygons"] for ring in polygon
+        ]
+        for i, ring in rings:
+            if len(ring) < 3:
+                raise ValueError(f"Fence {self.fence_ids[i]} has a ring with fewer than three coordinates")
+        every = np.concatenate([ring for _, ring in rings])
+        self.projection = projection or LocalProjection.around(every[:, 1], every[:, 0])
+
+        ax, ay, bx, by, fence = [], [], [], [], []
+        self.area_m2 = np.zeros(len(fences))
+        south, west = np.full(len(fences), np.inf), np.full(len(fences), np.inf)
+        north, east = np.full(len(fences), -np.inf), np.full(len(fences), -np.inf)
+        for i, ring in rings:
+            xy = self.project(ring[:, 1], ring[:, 0])
+            # Close the ring if the file didn't
+            if not np.array_equal(xy[0], xy[-1]):
+                xy = np.vstack([xy, xy[:1]])
+            ax.append(xy[:-1, 0]); ay.append(xy[:-1, 1])
+            bx.append(xy[1:, 0]); by.append(xy[1:, 1])
+            fence.append(np.full(len(xy) - 1, i))
+            south[i], north[i] = min(south[i], ring[:, 1].min()), max(north[i], ring[:, 1].max())
+            west[i], east[i] = min(west[i], ring[:, 0].min()), max(east[i], ring[:, 0].max())
+
+        self.ax, self.ay = np.concatenate(ax), np.concatenate(ay)
+        self.bx, self.by = np.concatenate(bx), np.concatenate(by)
+        self.edge_fence = np.concatenate(fence)
+        self.bounds = np.column_stack([south, west, north, east])
+
+        # Shoelace area and centroid per ring. Ring orientation varies between
+        # files, so holes are told apart by nesting rather than winding
+        cross = self.ax * self.by - self.bx * self.ay
+        moment = np.zeros((len(fences), 2))
+        offset = 0
+        for (i, _), n in zip(rings, (len(a) for a in ax)):
+            ring = slice(offset, offset + n)
+            signed = cross[ring].sum() / 2.0
+            if signed != 0:
+                centroid = np.array([
+                    ((self.ax + self.bx) * cross)[ring].sum(), ((self.ay + self.by) * cross)[ring].sum()
+                ]) / (6.0 * signed)
+                area = -abs(signed) if self._ring_is_hole(i, offset, n) else abs(signed)
+                self.area_m2[i] += area
+                moment[i] += centroid * area
+            offset += n
+        self.centroids = moment / np.where(self.area_m2 > 0, self.area_m2, 1.0)[:, None]
+        self._build_bands()
+        self._build_grid()
+
+    # -- construction ------------------------------------------------------
+
+    def _ring_is_hole(self, fence: int, offset: int, n: int) -> bool:
+        """A ring is a hole when one of its vertices is inside the fence's other rings."""
+        mine = (self.edge_fence == fence)
+        mine[offset:offset + n] = False
+        if not mine.any():
+            return False
+        px, py = self.ax[offset], self.ay[offset]
+        ax, ay, bx, by = self.ax[mine], self.ay[mine], self.bx[mine], self.by[mine]
+        straddles = (ay > py) != (by > py)
+        x_cross = ax + (py - ay) * (bx - ax) / np.where(by != ay, by - ay, 1.0)
+        return bool(np.count_nonzero(straddles & (px < x_cross)) % 2)
+
+    @classmethod
+    def from_geojson(cls, geojson: Dict[str, Any], **kwargs) -> "GeofenceSet":
+        fences = []
+        for n, feature in enumerate(geojson.get("features", [])):
+            geometry = feature.get("geometry") or {}
+            props = feature.get("properties") or {}
+            polygons = (
+                [geometry.get("coordinates")] if geometry.get("type") == "Polygon"
+                else geometry.get("coordinates", []) if geometry.get("type") == "MultiPolygon"
+                else []
+            )
+            if not polygons:
+                continue
+            fences.append({
+                "fence_id": props.get("fence_id", feature.get("id", n)),
+                "name": props.get("name"),
+                "kind": props.get("kind"),
+                "polygons": polygons,
+            })
+        return cls(fences, **kwargs)
+
+    def project(self, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        """Local metres of points."""
+        return self.projection.forward(lat, lng)
+
+    def _build_bands(self):
+        """Bucket every non-horizontal edge into the bands its y-extent covers."""
+        y0 = np.minimum(self.ay, self.by)
+        y1 = np.maximum(self.ay, self.by)
+        # Fixed here: the grid may grow cell_m afterwards
+        self._band_m = self.cell_m
+        self._band_base = int(np.floor(y0.min() / self._band_m))
+        first = np.floor(y0 / self._band_m).astype(np.int64) - self._band_base
+        last = np.floor(y1 / self._band_m).astype(np.int64) - self._band_base
+        self._n_bands = int(last.max()) + 1
+
+        # Horizontal edges never straddle a point's y
+        edges = np.flatnonzero(self.ay != self.by)
+        self._band_edges, self._band_starts, self._band_counts = _bucket(
+            edges, first[edges], last[edges] - first[edges] + 1, self._n_bands
+        )
+
+    def _ray_parity(self, xy: np.ndarray) -> np.ndarray:
+        """Even-odd crossing test of a ray to +x against the edges in each point's band."""
+        n_fences = len(self.fence_ids)
+        inside = np.zeros((len(xy), n_fences), dtype=bool)
+        band = np.floor(xy[:, 1] / self._band_m).astype(np.int64) - self._band_base
+        points = np.flatnonzero((band >= 0) & (band < self._n_bands))
+        point, edge = _candidates(points, band[points], self._band_edges, self._band_starts, self._band_counts)
+
+        px, py = xy[point, 0], xy[point, 1]
+        ax, ay, bx, by = self.ax[edge], self.ay[edge], self.bx[edge], self.by[edge]
+        straddles = (ay > py) != (by > py)
+        # Only evaluated where the edge straddles py, so by != ay
+        x_cross = ax + (py - ay) * (bx - ax) / np.where(straddles, by - ay, 1.0)
+        hit = straddles & (px < x_cross)
+        crossings = np.bincount(point[hit] * n_fences + self.edge_fence[edge[hit]], minlength=len(xy) * n_fences)
+        inside |= (crossings.reshape(len(xy), n_fences) % 2).astype(bool)
+        return inside
+
+    def _build_grid(self):
+        """
+        Bucket edges into square cells and record which fences each cell
+        centre is in (by ray casting, once), so a breadcrumb only needs the
+        edges between it and its cell centre.
+        """
+        x_min = min(self.ax.min(), self.bx.min())
+        y_min = min(self.ay.min(), self.by.min())
+        width = max(self.ax.max(), self.bx.max()) - x_min
+        height = max(self.ay.max(), self.by.max()) - y_min
+        # Keep the centre status table (cells x fences) bounded for site-wide fences
+        max_cells = max(MAX_GRID_CELLS // len(self.fence_ids), 1)
+        self.cell_m = max(self.cell_m, math.sqrt(width * height / max_cells))
+        self._grid_x0, self._grid_y0 = x_min, y_min
+        self._nx = int(width // self.cell_m) + 1
+        self._ny = int(height // self.cell_m) + 1
+
+        ix0 = self._cell_x(np.minimum(self.ax, self.bx))
+        ix1 = self._cell_x(np.maximum(self.ax, self.bx))
+        iy0 = self._cell_y(np.minimum(self.ay, self.by))
+        iy1 = self._cell_y(np.maximum(self.ay, self.by))
+        nx, ny = ix1 - ix0 + 1, iy1 - iy0 + 1
+        per_edge = nx * ny
+        edge = np.repeat(np.arange(len(self.ax)), per_edge)
+        k = np.arange(per_edge.sum()) - np.repeat(np.cumsum(per_edge) - per_edge, per_edge)
+        cell = (np.repeat(iy0, per_edge) + k % np.repeat(ny, per_edge)) * self._nx + (
+            np.repeat(ix0, per_edge) + k // np.repeat(ny, per_edge)
+        )
+        self._cell_edges, self._cell_starts, self._cell_counts = _bucket(
+            edge, cell, np.ones(len(cell), dtype=np.int64), self._nx * self._ny
+        )
+
+        iy, ix = np.divmod(np.arange(self._nx * self._ny), self._nx)
+        self._centres = np.column_stack([
+            self._grid_x0 + (ix + 0.5) * self.cell_m, self._grid_y0 + (iy + 0.5) * self.cell_m
+        ])
+        self._centre_inside = self._ray_parity(self._centres)
+
+    def _cell_x(self, x: np.ndarray) -> np.ndarray:
+        return np.clip(np.floor((x - self._grid_x0) / self.cell_m), 0, self._nx - 1).astype(np.int64)
+
+    def _cell_y(self, y: np.ndarray) -> np.ndarray:
+        return np.clip(np.floor((y - self._grid_y0) / self.cell_m), 0, self._ny - 1).astype(np.int64)
+
+    # -- evaluation --------------------------------------------------------
+
+    def contains(self, lat: Sequence[float], lng: Sequence[float]) -> np.ndarray:
+        """
+        Point-in-polygon for every breadcrumb and fence.
+
+        Returns:
+            (n, fences) bool array
+        """
+        xy = self.project(lat, lng)
+        inside = np.zeros((len(xy), len(self.fence_ids)), dtype=bool)
+        for lo in range(0, len(xy), CHUNK_POINTS):
+            self._contains_chunk(xy[lo:lo + CHUNK_POINTS], inside[lo:lo + CHUNK_POINTS])
+        return inside
+
+    def _contains_chunk(self, xy: np.ndarray, inside: np.ndarray):
+        fx = (xy[:, 0] - self._grid_x0) / self.cell_m
+        fy = (xy[:, 1] - self._grid_y0) / self.cell_m
+        # NaN positions and points off the grid are outside every fence
+        points = np.flatnonzero((fx >= 0) & (fx < self._nx) & (fy >= 0) & (fy < self._ny))
+        if len(points) == 0:
+            return
+        cell = fy[points].astype(np.int64) * self._nx + fx[points].astype(np.int64)
+        inside[points] = self._centre_inside[cell]
+
+        # Flip a fence for every one of its edges between the point and its cell centre
+        cell_of = np.empty(len(xy), dtype=np.int64)
+        cell_of[points] = cell
+        point, edge = _candidates(points, cell, self._cell_edges, self._cell_starts, self._cell_counts)
+        if len(edge) == 0:
+            return
+        cx, cy = self._centres[cell_of[point], 0], self._centres[cell_of[point], 1]
+        px, py = xy[point, 0], xy[point, 1]
+        ax, ay, bx, by = self.ax[edge], self.ay[edge], self.bx[edge], self.by[edge]
+        hit = (
+            ((_orient(ax, ay, bx, by, cx, cy) > 0) != (_orient(ax, ay, bx, by, px, py) > 0))
+            & ((_orient(cx, cy, px, py, ax, ay) > 0) != (_orient(cx, cy, px, py, bx, by) > 0))
+        )
+        n_fences = len(self.fence_ids)
+        crossings = np.bincount(point[hit] * n_fences + self.edge_fence[edge[hit]], minlength=len(xy) * n_fences)
+        inside ^= (crossings.reshape(len(xy), n_fences) % 2).astype(bool)
+
+    def locate(self, lat: Sequence[float], lng: Sequence[float], fences: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        The fence each breadcrumb is in (the smallest on overlap), -1 for none.
+
+        Args:
+            fences: Optional fence indices to consider
+        """
+        inside = self.contains(lat, lng)
+        candidates = np.arange(len(self.fence_ids)) if fences is None else np.asarray(fences, dtype=np.int64)
+        if len(candidates) == 0:
+            return np.full(len(inside), -1, dtype=np.int64)
+        area = np.where(inside[:, candidates], self.area_m2[candidates], np.inf)
+        best = np.argmin(area, axis=1)
+        return np.where(np.isfinite(area[np.arange(len(area)), best]), candidates[best], -1)
+
+    def cycle_zones(self) -> Tuple[List[Zone], np.ndarray]:
+        """
+        Load/dump fences as cycle segmentation zones.
+
+        Returns:
+            (zones, fence index of each zone); circle centres and radii are
+            the fence centroids and equal-area radii, for display only
+        """
+        fences = np.flatnonzero(np.isin(self.kinds, list(CYCLE_KINDS)))
+        lat, lng = self.projection.inverse(self.centroids[fences, 0], self.centroids[fences, 1])
+        zones = [
+            Zone(str(self.names[i]), CYCLE_KINDS[self.kinds[i]], float(la), float(ln),
+                 float(math.sqrt(max(self.area_m2[i], 0.0) / math.pi)))
+            for i, la, ln in zip(fences, lat, lng)
+        ]
+        return zones, fences
+
+    def cycle_zone_index(self, lat: Sequence[float], lng: Sequence[float]) -> np.ndarray:
+        """Zone of each breadcrumb for segment_cycles(zones=cycle_zones()[0], zone_index=...)."""
+        _, fences = self.cycle_zones()
+        fence = self.locate(lat, lng, fences)
+        zone_of_fence = np.full(len(self.fence_ids) + 1, -1, dtype=np.int64)
+        zone_of_fence[fences] = np.arange(len(fences))
+        return zone_of_fence[fence]
+
+    def transitions(
+        self,
+        equipment_ids: Sequence[Any],
+        timestamps: Sequence[Any],
+        lat: Sequence[float],
+        lng: Sequence[float],
+        initial: Optional[Dict[Any, np.ndarray]] = None,
+    ) -> Tuple[pd.DataFrame, Dict[Any, np.ndarray]]:
+        """
+        Entry/exit events from breadcrumbs.
+
+        Args:
+            equipment_ids, timestamps, lat, lng: Breadcrumbs, in any order
+            initial: Fence membership of each equipment before these
+                breadcrumbs (from a previous call); equipment without one
+                starts in whatever fences its first breadcrumb is in
+
+        Returns:
+            (events with EVENT_COLUMNS in time order, membership of each
+            equipment after its last breadcrumb)
+        """
+        equipment_ids = np.asarray(equipment_ids)
+        ts = pd.to_datetime(np.asarray(timestamps)).to_numpy(dtype="datetime64[ns]")
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        state = dict(initial or {})
+        if len(lat) == 0:
+            return pd.DataFrame(columns=EVENT_COLUMNS), state
+
+        order = np.lexsort((ts, equipment_ids))
+        equipment_ids, ts, lat, lng = equipment_ids[order], ts[order], lat[order], lng[order]
+        inside = self.contains(lat, lng)
+
+        previous = np.empty_like(inside)
+        previous[1:] = inside[:-1]
+        firsts = np.flatnonzero(np.r_[True, equipment_ids[1:] != equipment_ids[:-1]])
+        lasts = np.append(firsts[1:], len(ts)) - 1
+        for first, equipment_id in zip(firsts, equipment_ids[firsts].tolist()):
+            known = state.get(equipment_id)
+            previous[first] = known if known is not None and len(known) == inside.shape[1] else inside[first]
+        for last, equipment_id in zip(lasts, equipment_ids[lasts].tolist()):
+            state[equipment_id] = inside[last].copy()
+
+        row, fence = np.nonzero(inside != previous)
+        events = pd.DataFrame({
+            "equipment_id": equipment_ids[row],
+            "fence_id": self.fence_ids[fence],
+            "fence_name": self.names[fence],
+            "kind": self.kinds[fence],
+            "event": np.where(inside[row, fence], ENTER, EXIT),
+            "timestamp": ts[row],
+            "latitude": lat[row],
+            "longitude": lng[row],
+        }, columns=EVENT_COLUMNS)
+        return events.sort_values("timestamp", kind="stable", ignore_index=True), state
+
+    def summary(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "fence_id": str(self.fence_ids[i]),
+                "name": str(self.names[i]),
+                "kind": str(self.kinds[i]),
+                "area_m2": round(float(self.area_m2[i]), 1),
+                "bounds": [round(float(b), 6) for b in self.bounds[i]],
+            }
+            for i in range(len(self.fence_ids))
+        ]
+
+
+class GeofenceRegistry:
+    """Geofence sets and live fence occupancy, loaded per site on first use"""
+
+    def __init__(self, directory: str = GEOFENCES_DIR):
+        self.directory = Path(directory)
+        self._fences: Dict[str, Optional[GeofenceSet]] = {}
+        # site_id -> equipment_id -> membership row
+        self._state: Dict[str, Dict[str, np.ndarray]] = {}
+        # site_id -> (equipment_id, fence index) -> entered at
+        self._entered: Dict[str, Dict[Tuple[str, int], Any]] = {}
+        self._events: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def get(self, site_id: str) -> Optional[GeofenceSet]:
+        with self._lock:
+            if site_id not in self._fences:
+                self._fences[site_id] = self._load(site_id)
+            return self._fences[site_id]
+
+    def _load(self, site_id: str) -> Optional[GeofenceSet]:
+        path = self.directory / f"{site_id}.geojson"
+        if not path.is_file():
+            return None
+        try:
+            with open(path) as f:
+                fences = GeofenceSet.from_geojson(json.load(f), projection=site_projection(site_id))
+            site_projection(site_id, fences.projection.origin_lat, fences.projection.origin_lng)
+            logger.info(f"Loaded geofences for {site_id}: {len(fences.fence_ids)} fences")
+            return fences
+        except Exception as e:
+            logger.error(f"Failed to load geofences from {path}: {e}")
+            return None
+
+    def save(self, site_id: str, geojson: Dict[str, Any]) -> GeofenceSet:
+        """Validate and store a site's geofences, replacing the current set (raises ValueError)."""
+        try:
+            fences = GeofenceSet.from_geojson(geojson, projection=site_projection(site_id))
+        except (KeyError, TypeError, IndexError) as e:
+            raise ValueError(f"Invalid geofence GeoJSON: {e}") from e
+        site_projection(site_id, fences.projection.origin_lat, fences.projection.origin_lng)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{site_id}.geojson"
+        tmp = path.with_suffix(".geojson.tmp")
+        with open(tmp, "w") as f:
+            json.dump(geojson, f)
+        os.replace(tmp, path)
+        with self._lock:
+            self._fences[site_id] = fences
+            # Fence indices changed; occupancy is rebuilt from the next readings
+            self._state.pop(site_id, None)
+            self._entered.pop(site_id, None)
+        return fences
+
+    def ingest(self, events: List[Dict[str, Any]]) -> int:
+        """Evaluate live events against their site's fences; returns the number of entry/exit events."""
+        by_site: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events:
+            if (event.get("site_id") and event.get("equipment_id")
+                    and event.get("latitude") is not None and event.get("longitude") is not None):
+                by_site.setdefault(event["site_id"], []).append(event)
+        produced = 0
+        for site_id, site_events in by_site.items():
+            fences = self.get(site_id)
+            if fences is None:
+                continue
+            with self._lock:
+                initial = self._state.get(site_id, {})
+            fence_events, state = fences.transitions(
+                [e["equipment_id"] for e in site_events],
+                [e.get("timestamp") for e in site_events],
+                [e["latitude"] for e in site_events],
+                [e["longitude"] for e in site_events],
+                initial,
+            )
+            with self._lock:
+                if self._fences.get(site_id) is not fences:
+                    continue
+                self._state[site_id] = state
+                entered = self._entered.setdefault(site_id, {})
+                # Equipment seen for the first time starts inside its current fences
+                for equipment_id, row in state.items():
+                    if equipment_id not in initial:
+                        for i in np.flatnonzero(row):
+                            entered.setdefault((equipment_id, int(i)), None)
+                history = self._events.setdefault(site_id, deque(maxlen=EVENT_HISTORY))
+                index = {f: i for i, f in enumerate(fences.fence_ids.tolist())}
+                for record in fence_events.to_dict("records"):
+                    record["timestamp"] = pd.Timestamp(record["timestamp"]).isoformat()
+                    key = (record["equipment_id"], index[record["fence_id"]])
+                    if record["event"] == ENTER:
+                        entered[key] = record["timestamp"]
+                    else:
+                        entered.pop(key, None)
+                    history.append(record)
+            produced += len(fence_events)
+        return produced
+
+    def events(self, site_id: str, limit: int = 100, kinds: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Most recent live entry/exit events of a site, newest first."""
+        with self._lock:
+            history = list(self._events.get(site_id, ()))
+        if kinds:
+            wanted = {k.upper() for k in kinds}
+            history = [e for e in history if e["kind"] in wanted]
+        return history[::-1][:limit]
+
+    def occupancy(self, site_id: str, kinds: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Equipment currently inside each fence of a site."""
+        fences = self.get(site_id)
+        if fences is None:
+            return []
+        with self._lock:
+            entered = dict(self._entered.get(site_id, {}))
+        wanted = {k.upper() for k in kinds} if kinds else None
+        rows = []
+        for i, fence_id in enumerate(fences.fence_ids.tolist()):
+            if wanted is not None and fences.kinds[i] not in wanted:
+                continue
+            inside = sorted((e, t) for (e, f), t in entered.items() if f == i)
+            rows.append({
+                "fence_id": fence_id,
+                "name": str(fences.names[i]),
+                "kind": str(fences.kinds[i]),
+                "equipment": [{"equipment_id": e, "entered_at": t} for e, t in inside],
+            })
+        return rows
+
+
+# Singleton instance
+_geofence_registry: Optional[GeofenceRegistry] = None
+
+
+def get_geofences() -> GeofenceRegistry:
+    """Get or create the geofence registry singleton"""
+    global _geofence_registry
+    if _geofence_registry is None:
+        _geofence_registry = GeofenceRegistry()
+    return _geofence_registry
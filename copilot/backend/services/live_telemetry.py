@@ -0,0 +1,233 @@
+"""
+Live telemetry store for TERRA
+
+Holds the latest GPS + telematics reading per piece of equipment, fed by
+POST /api/ingest/telemetry (the replay simulator, or an edge gateway).
+When a site has fresh readings, /ws/realtime/{site_id} serves them from
+memory instead of polling Snowflake, so the realtime path and alerting can
+be load-tested with hundreds of trucks without a warehouse.
+
+Events are validated before anything is stored (clean_events): one with a
+missing id, a non-numeric field, a position off the globe or an unreadable
+timestamp is rejected on its own, without failing the rest of the batch.
+
+Each reading's reported speed is checked against the speed implied by the
+truck's movement since its previous reading, so GPS speed glitches don't
+raise ghost cycle alerts.
+"""
+
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .geodesy import implied_speed_mph, speed_mismatch
+except ImportError:
+    from services.geodesy import implied_speed_mph, speed_mismatch
+
+# Same rule as the Watchdog's fallback ghost cycle detection
+GHOST_SPEED_MIN_MPH = 2.0
+GHOST_LOAD_MAX_PCT = 30.0
+
+# Readings older than this no longer count as live
+LIVE_MAX_AGE_SECONDS = 120.0
+
+# Event fields that must be finite numbers when present
+NUMERIC_FIELDS = (
+    "latitude", "longitude", "speed_mph", "engine_load_percent", "engine_load_pct",
+    "fuel_rate_gph", "payload_tons", "heading_degrees",
+)
+
+
+def _number(value: Any) -> Optional[float]:
+    """A finite float, or None when missing; raises ValueError/TypeError otherwise."""
+    if value is None or value == "":
+        return None
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{value!r} is not finite")
+    return number
+
+
+def clean_events(events: Iterable[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Validate and coerce a batch of ingest events once, for every consumer.
+
+    Returns copies of the valid events, with string ids and float numeric
+    fields, and the number rejected.
+    """
+    clean = []
+    rejected = 0
+    for event in events:
+        if not isinstance(event, dict) or not event.get("site_id") or not event.get("equipment_id"):
+            rejected += 1
+            continue
+        try:
+            numbers = {name: _number(event.get(name)) for name in NUMERIC_FIELDS if name in event}
+        except (TypeError, ValueError):
+            rejected += 1
+            continue
+        lat, lng = numbers.get("latitude"), numbers.get("longitude")
+        if (lat is not None and abs(lat) > 90) or (lng is not None and abs(lng) > 180):
+            rejected += 1
+            continue
+        clean.append({**event, **numbers, "site_id": str(event["site_id"]), "equipment_id": str(event["equipment_id"])})
+
+    # Timestamps parsed together; present but unreadable ones reject the event
+    valid = np.ones(len(clean), dtype=bool)
+    for key in ("timestamp", "source_timestamp"):
+        raw = pd.Series([e.get(key) for e in clean], dtype=object)
+        present = raw.notna().to_numpy() & (raw != "").to_numpy()
+        if present.any():
+            parsed = pd.to_datetime(raw[present], errors="coerce", utc=True, format="mixed")
+            valid[np.flatnonzero(present)[parsed.isna().to_numpy()]] = False
+    if not valid.all():
+        rejected += int((~valid).sum())
+        clean = [e for e, ok in zip(clean, valid) if ok]
+    return clean, rejected
+
+
+class LiveTelemetryStore:
+    """Latest reading per equipment, grouped by site"""
+
+    def __init__(self, max_age: float = LIVE_MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # site_id -> equipment_id -> reading
+        self._sites: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._site_updated: Dict[str, float] = {}
+        self.events_ingested = 0
+        self.batches_ingested = 0
+        self.rejected = 0
+
+    def ingest(self, events: Iterable[Dict[str, Any]], rejected: Optional[int] = None) -> int:
+        """
+        Apply a batch of readings; returns how many were accepted.
+
+        Invalid events are rejected one by one. Events already returned by
+        clean_events are passed with the number it rejected, so they are
+        not validated twice.
+        """
+        if rejected is None:
+            events, rejected = clean_events(events)
+        accepted = 0
+        now = time.monotonic()
+        with self._lock:
+            self.rejected += rejected
+            readings = []
+            previous: Dict[str, Dict[str, Any]] = {}
+            for event in events:
+                site_id = event["site_id"]
+                equipment_id = event["equipment_id"]
+                site = self._sites.setdefault(site_id, {})
+                if equipment_id in site and equipment_id not in previous:
+                    previous[equipment_id] = site[equipment_id]
+                reading = site[equipment_id] = {
+                    "equipment_id": equipment_id,
+                    "equipment_type": event.get("equipment_type", "HAUL_TRUCK"),
+                    "speed_mph": event.get("speed_mph") or 0.0,
+                    "engine_load_pct": event.get("engine_load_percent", event.get("engine_load_pct")) or 0.0,
+                    "fuel_rate_gph": event.get("fuel_rate_gph") or 0.0,
+                    "payload_tons": event.get("payload_tons"),
+                    "latitude": event.get("latitude"),
+                    "longitude": event.get("longitude"),
+                    "heading_degrees": event.get("heading_degrees"),
+                    "last_updated": event.get("timestamp"),
+                    # Replayed events carry the recorded time; movement is timed by it
+                    "recorded_at": event.get("source_timestamp") or event.get("timestamp"),
+                    "implied_speed_mph": None,
+                    "speed_valid": None,
+                    "received_at": now,
+                }
+                readings.append(reading)
+                self._site_updated[site_id] = now
+                accepted += 1
+            self._validate_speeds(readings, previous)
+            self.events_ingested += accepted
+            self.batches_ingested += 1
+        return accepted
+
+    def _validate_speeds(self, readings: List[Dict[str, Any]], previous: Dict[str, Dict[str, Any]]):
+        """Set implied_speed_mph and speed_valid from each truck's previous reading."""
+        if not readings:
+            return
+        rows = list(previous.values()) + readings
+        equipment = np.array([r["equipment_id"] for r in rows], dtype=object)
+        timestamps = [r["recorded_at"] for r in rows]
+        # Stable, so each truck's previous reading stays ahead of same-time batch readings
+        order = np.argsort(equipment.astype(str), kind="stable")
+        equipment, timestamps = equipment[order], [timestamps[i] for i in order]
+        sorted_rows = [rows[i] for i in order]
+        implied = implied_speed_mph(
+            timestamps,
+            [r["latitude"] if r["latitude"] is not None else np.nan for r in sorted_rows],
+            [r["longitude"] if r["longitude"] is not None else np.nan for r in sorted_rows],
+            equipment,
+        )
+        mismatch = speed_mismatch([r["speed_mph"] for r in sorted_rows], implied)
+        # Each truck's first row (its previous reading, or a new truck) has no speed
+        for r, speed, bad in zip(sorted_rows, implied, mismatch):
+            if np.isfinite(speed):
+                r["implied_speed_mph"] = round(float(speed), 1)
+                r["speed_valid"] = not bad
+
+    def has_live_data(self, site_id: str) -> bool:
+        updated = self._site_updated.get(site_id)
+        return updated is not None and time.monotonic() - updated <= self.max_age
+
+    def site_equipment(self, site_id: str) -> List[Dict[str, Any]]:
+        """Fresh readings for a site, in the shape of get_equipment_telemetry."""
+        cutoff = time.monotonic() - self.max_age
+        with self._lock:
+            readings = list(self._sites.get(site_id, {}).values())
+        return [
+            {k: v for k, v in r.items() if k not in ("received_at", "recorded_at")}
+            for r in readings if r["received_at"] >= cutoff
+        ]
+
+    def ghost_cycle_alerts(self, equipment: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Rule-based ghost cycle alerts: moving, but with a low engine load."""
+        alerts = [
+            {
+                "type": "GHOST_CYCLE",
+                "severity": "WARNING",
+                "equipment_id": e["equipment_id"],
+                "speed_mph": e["speed_mph"],
+                "engine_load_pct": e["engine_load_pct"],
+                "latitude": e["latitude"],
+                "longitude": e["longitude"],
+                "model": "RULE_BASED_LIVE",
+            }
+            for e in equipment
+            if e["speed_mph"] > GHOST_SPEED_MIN_MPH and e["engine_load_pct"] < GHOST_LOAD_MAX_PCT
+            # Reported speed contradicted by the truck's movement: a GPS glitch
+            and e.get("speed_valid") is not False
+        ]
+        alerts.sort(key=lambda a: a["engine_load_pct"])
+        return alerts
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sites": len(self._sites),
+                "equipment": sum(len(e) for e in self._sites.values()),
+                "events_ingested": self.events_ingested,
+                "batches_ingested": self.batches_ingested,
+                "rejected": self.rejected,
+            }
+
+
+# Singleton instance
+_live_store: Optional[LiveTelemetryStore] = None
+
+
+def get_live_telemetry() -> LiveTelemetryStore:
+    """Get or create the live telemetry store singleton"""
+    global _live_store
+    if _live_store is None:
+        _live_store = LiveTelemetryStore()
+    return _live_store
@@ -0,0 +1,415 @@
+"""
+Haul-road map matching for TERRA
+
+Snaps GPS breadcrumbs to the haul-road segments of a site so segment speeds
+and congestion can be computed in the backend instead of being read from the
+precomputed HAUL_ROAD_EFFICIENCY table.
+
+Road networks are GeoJSON FeatureCollections of LineStrings, one file per
+site at TERRA_HAUL_ROADS_DIR/{site_id}.geojson (default config/haul_roads),
+with the properties road_segment_id, road_name and optionally oneway (true
+when the segment is only driven in its digitized direction). Networks are
+uploaded with PUT /api/haul-roads/{site_id}; a site without a file is looked
+up again every MISSING_RETRY_SECONDS, so files copied in later are picked up
+without a restart.
+
+Matching is nearest segment with a heading constraint: a moving truck only
+matches edges within MAX_HEADING_DIFF_DEG of its heading, and the heading
+difference is added to the distance as a small penalty, so trucks on
+parallel or crossing roads snap to the road they are driving along. Edges
+are bucketed in a metric grid (expanded by the search radius), so each
+breadcrumb only looks at the edges in its own cell, and whole shifts are
+matched in one vectorized pass.
+
+SegmentTraffic accumulates matched speeds in per-minute buckets so live
+segment speeds and congestion update incrementally as telemetry arrives,
+keyed by each reading's own UTC minute.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from .geodesy import LocalProjection, site_projection
+    from .telemetry_buffer import epoch_seconds
+except ImportError:
+    from services.geodesy import LocalProjection, site_projection
+    from services.telemetry_buffer import epoch_seconds
+
+logger = logging.getLogger(__name__)
+
+HAUL_ROADS_DIR = os.environ.get(
+    "TERRA_HAUL_ROADS_DIR", str(Path(__file__).resolve().parent.parent / "config" / "haul_roads")
+)
+
+# Breadcrumbs further than this from every road are left unmatched
+MAX_MATCH_DISTANCE_M = 30.0
+
+# Heading is only trusted above this speed
+HEADING_MIN_SPEED_MPH = 3.0
+MAX_HEADING_DIFF_DEG = 45.0
+HEADING_PENALTY_M_PER_DEG = 0.2
+
+# Edge grid bucket size
+GRID_CELL_M = 50.0
+
+# Matched readings below this speed count toward congestion
+CONGESTION_SPEED_MPH = 5.0
+
+TRAFFIC_WINDOW_MINUTES = 15
+
+# A site without a road network file is looked up again after this long
+MISSING_RETRY_SECONDS = 60.0
+
+
+class RoadNetwork:
+    """Haul-road polylines of one site, split into straight edges and grid-indexed"""
+
+    def __init__(self, segments: List[Dict[str, Any]], cell_m: float = GRID_CELL_M,
+                 max_distance_m: float = MAX_MATCH_DISTANCE_M,
+                 projection: Optional[LocalProjection] = None):
+        """
+        Args:
+            segments: Dicts with road_segment_id, road_name, coordinates
+                ([[lng, lat], ...]) and optional oneway
+            projection: Local projection to work in (default: around the
+                network's own coordinates)
+        """
+        if not segments:
+            raise ValueError("A road network needs at least one segment")
+        self.cell_m = cell_m
+        self.max_distance_m = max_distance_m
+        self.segment_ids = np.array([str(s["road_segment_id"]) for s in segments])
+        self.road_names = np.array([s.get("road_name") or str(s["road_segment_id"]) for s in segments])
+        self.oneway = np.array([bool(s.get("oneway", False)) for s in segments])
+
+        coords = [np.asarray(s["coordinates"], dtype=np.float64) for s in segments]
+        every = np.concatenate(coords)
+        self.projection = projection or LocalProjection.around(every[:, 1], every[:, 0])
+
+        ax, ay, bx, by, seg, offset = [], [], [], [], [], []
+        self.segment_length_m = np.zeros(len(segments))
+        for i, c in enumerate(coords):
+            if len(c) < 2:
+                raise ValueError(f"Segment {self.segment_ids[i]} needs at least two coordinates")
+            xy = self.project(c[:, 1], c[:, 0])
+            lengths = np.hypot(*np.diff(xy, axis=0).T)
+            ax.append(xy[:-1, 0]); ay.append(xy[:-1, 1])
+            bx.append(xy[1:, 0]); by.append(xy[1:, 1])
+            seg.append(np.full(len(xy) - 1, i))
+            offset.append(np.concatenate([[0.0], np.cumsum(lengths)[:-1]]))
+            self.segment_length_m[i] = lengths.sum()
+
+        self.ax, self.ay = np.concatenate(ax), np.concatenate(ay)
+        self.bx, self.by = np.concatenate(bx), np.concatenate(by)
+        self.edge_segment = np.concatenate(seg)
+        self.edge_offset = np.concatenate(offset)
+        self.edge_heading = np.degrees(np.arctan2(self.bx - self.ax, self.by - self.ay)) % 360.0
+        self._build_grid()
+
+    @classmethod
+    def from_geojson(cls, geojson: Dict[str, Any], **kwargs) -> "RoadNetwork":
+        segments = []
+        for feature in geojson.get("features", []):
+            geometry = feature.get("geometry") or {}
+            props = feature.get("properties") or {}
+            lines = (
+                [geometry.get("coordinates")] if geometry.get("type") == "LineString"
+                else geometry.get("coordinates", []) if geometry.get("type") == "MultiLineString"
+                else []
+            )
+            for part, line in enumerate(lines):
+                segment_id = props.get("road_segment_id", feature.get("id"))
+                segments.append({
+                    "road_segment_id": segment_id if len(lines) == 1 else f"{segment_id}-{part}",
+                    "road_name": props.get("road_name"),
+                    "oneway": props.get("oneway", False),
+                    "coordinates": [pt[:2] for pt in line],
+                })
+        return cls(segments, **kwargs)
+
+    def project(self, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+        """Local metres of points."""
+        return self.projection.forward(lat, lng)
+
+    def _cell_keys(self, ix: np.ndarray, iy: np.ndarray) -> np.ndarray:
+        return ix.astype(np.int64) * 1_000_003 + iy.astype(np.int64)
+
+    def _build_grid(self):
+        """Bucket every edge into the cells its bounding box (plus search radius) covers."""
+        pad = self.max_distance_m
+        x0 = np.floor((np.minimum(self.ax, self.bx) - pad) / self.cell_m).astype(np.int64)
+        x1 = np.floor((np.maximum(self.ax, self.bx) + pad) / self.cell_m).astype(np.int64)
+        y0 = np.floor((np.minimum(self.ay, self.by) - pad) / self.cell_m).astype(np.int64)
+        y1 = np.floor((np.maximum(self.ay, self.by) + pad) / self.cell_m).astype(np.int64)
+        nx, ny = x1 - x0 + 1, y1 - y0 + 1
+        per_edge = nx * ny
+        edge = np.repeat(np.arange(len(self.ax)), per_edge)
+        k = np.arange(per_edge.sum()) - np.repeat(np.cumsum(per_edge) - per_edge, per_edge)
+        ix = np.repeat(x0, per_edge) + k // np.repeat(ny, per_edge)
+        iy = np.repeat(y0, per_edge) + k % np.repeat(ny, per_edge)
+        keys = self._cell_keys(ix, iy)
+
+        order = np.argsort(keys, kind="stable")
+        keys, self._grid_edges = keys[order], edge[order]
+        self._grid_keys, self._grid_starts, counts = np.unique(keys, return_index=True, return_counts=True)
+        self._grid_counts = counts
+
+    def match(self, lat: Sequence[float], lng: Sequence[float],
+              heading: Optional[Sequence[float]] = None,
+              speed: Optional[Sequence[float]] = None) -> Dict[str, np.ndarray]:
+        """
+        Match breadcrumbs to road segments.
+
+        Returns:
+            Arrays aligned with the input: segment (index, -1 when
+            unmatched), distance_m (to the road) and position_m (distance
+            along the segment from its first coordinate)
+        """
+        xy = self.project(lat, lng)
+        n = len(xy)
+        segment = np.full(n, -1, dtype=np.int64)
+        distance = np.full(n, np.nan)
+        position = np.full(n, np.nan)
+        if n == 0:
+            return {"segment": segment, "distance_m": distance, "position_m": position}
+
+        # Candidate (point, edge) pairs from each point's grid cell
+        keys = self._cell_keys(np.floor(xy[:, 0] / self.cell_m), np.floor(xy[:, 1] / self.cell_m))
+        slot = np.clip(np.searchsorted(self._grid_keys, keys), 0, len(self._grid_keys) - 1)
+        found = self._grid_keys[slot] == keys
+        counts = np.where(found, self._grid_counts[slot], 0)
+        point = np.repeat(np.arange(n), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        edge = self._grid_edges[np.repeat(self._grid_starts[slot], counts) + k]
+        if len(edge) == 0:
+            return {"segment": segment, "distance_m": distance, "position_m": position}
+
+        # Distance from each point to its candidate edges
+        px, py = xy[point, 0], xy[point, 1]
+        ex, ey = self.bx[edge] - self.ax[edge], self.by[edge] - self.ay[edge]
+        length_sq = ex * ex + ey * ey
+        t = np.clip(
+            np.divide((px - self.ax[edge]) * ex + (py - self.ay[edge]) * ey, length_sq,
+                      out=np.zeros_like(length_sq), where=length_sq > 0),
+            0.0, 1.0,
+        )
+        d = np.hypot(px - (self.ax[edge] + t * ex), py - (self.ay[edge] + t * ey))
+        score = d.copy()
+        ok = d <= self.max_distance_m
+
+        if heading is not None:
+            h = np.asarray(heading, dtype=np.float64)[point]
+            moving = np.isfinite(h)
+            if speed is not None:
+                moving &= np.nan_to_num(np.asarray(speed, dtype=np.float64)[point]) >= HEADING_MIN_SPEED_MPH
+            diff = np.abs((h - self.edge_heading[edge] + 180.0) % 360.0 - 180.0)
+            # Two-way roads can be driven in either direction
+            diff = np.where(self.oneway[self.edge_segment[edge]], diff, np.minimum(diff, 180.0 - diff))
+            ok &= ~moving | (diff <= MAX_HEADING_DIFF_DEG)
+            score = np.where(moving, d + HEADING_PENALTY_M_PER_DEG * np.nan_to_num(diff), d)
+
+        point, edge, d, t, score = point[ok], edge[ok], d[ok], t[ok], score[ok]
+        if len(point) == 0:
+            return {"segment": segment, "distance_m": distance, "position_m": position}
+        order = np.lexsort((score, point))
+        best = order[np.unique(point[order], return_index=True)[1]]
+
+        p, e = point[best], edge[best]
+        segment[p] = self.edge_segment[e]
+        distance[p] = d[best]
+        position[p] = self.edge_offset[e] + t[best] * np.sqrt(length_sq[ok][best])
+        return {"segment": segment, "distance_m": distance, "position_m": position}
+
+    def segment_traffic(self, segment: np.ndarray, speed: Sequence[float],
+                        equipment_ids: Optional[Sequence[Any]] = None) -> List[Dict[str, Any]]:
+        """Per-segment speed and congestion of matched breadcrumbs."""
+        speed = np.asarray(speed, dtype=np.float64)
+        matched = (segment >= 0) & np.isfinite(speed)
+        seg, spd = segment[matched], speed[matched]
+        n_seg = len(self.segment_ids)
+        count = np.bincount(seg, minlength=n_seg)
+        speed_sum = np.bincount(seg, weights=spd, minlength=n_seg)
+        slow = np.bincount(seg, weights=spd < CONGESTION_SPEED_MPH, minlength=n_seg)
+        equipment = None
+        if equipment_ids is not None:
+            _, code = np.unique(np.asarray(equipment_ids)[matched], return_inverse=True)
+            pairs = np.unique(seg * (code.max(initial=0) + 1) + code)
+            equipment = np.bincount(pairs // (code.max(initial=0) + 1), minlength=n_seg)
+        return self._traffic_rows(count, speed_sum, slow, equipment)
+
+    def _traffic_rows(self, count, speed_sum, slow, equipment=None) -> List[Dict[str, Any]]:
+        rows = []
+        for i in np.flatnonzero(count):
+            row = {
+                "ROAD_SEGMENT_ID": str(self.segment_ids[i]),
+                "ROAD_NAME": str(self.road_names[i]),
+                "AVG_SPEED": round(float(speed_sum[i] / count[i]), 1),
+                "READING_COUNT": int(count[i]),
+                "CONGESTION_LEVEL": round(float(slow[i] / count[i]), 3),
+                "LENGTH_M": round(float(self.segment_length_m[i]), 1),
+            }
+            if equipment is not None:
+                row["EQUIPMENT_COUNT"] = int(equipment[i])
+            rows.append(row)
+        rows.sort(key=lambda r: r["CONGESTION_LEVEL"], reverse=True)
+        return rows
+
+
+class SegmentTraffic:
+    """Rolling per-minute segment speed aggregates for one road network"""
+
+    def __init__(self, network: RoadNetwork, window_minutes: int = TRAFFIC_WINDOW_MINUTES):
+        self.network = network
+        self.window_minutes = window_minutes
+        shape = (window_minutes, len(network.segment_ids))
+        self._count = np.zeros(shape)
+        self._speed_sum = np.zeros(shape)
+        self._slow = np.zeros(shape)
+        # Minute (epoch // 60) each ring row currently holds
+        self._minute = np.full(window_minutes, -1, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def add(self, segment: np.ndarray, speed: Sequence[float], minute: Optional[Sequence[int]] = None):
+        """Accumulate matched readings (minute = epoch minutes, default now)."""
+        speed = np.asarray(speed, dtype=np.float64)
+        if minute is None:
+            minute = np.full(len(speed), int(time.time() // 60))
+        minute = np.asarray(minute, dtype=np.int64)
+        keep = (segment >= 0) & np.isfinite(speed)
+        segment, speed, minute = segment[keep], speed[keep], minute[keep]
+        if len(segment) == 0:
+            return
+        with self._lock:
+            latest = max(int(minute.max()), int(self._minute.max()))
+            fresh = minute > latest - self.window_minutes
+            segment, speed, minute = segment[fresh], speed[fresh], minute[fresh]
+            row = minute % self.window_minutes
+            # Recycle ring rows that still hold an older minute
+            for r, m in zip(*np.unique(np.column_stack([row, minute]), axis=0).T):
+                if self._minute[r] != m:
+                    if self._minute[r] > m:
+                        continue
+                    self._count[r] = self._speed_sum[r] = self._slow[r] = 0.0
+                    self._minute[r] = m
+            valid = self._minute[row] == minute
+            np.add.at(self._count, (row[valid], segment[valid]), 1.0)
+            np.add.at(self._speed_sum, (row[valid], segment[valid]), speed[valid])
+            np.add.at(self._slow, (row[valid], segment[valid]), speed[valid] < CONGESTION_SPEED_MPH)
+
+    def snapshot(self, now_minute: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Segment speeds over the last window_minutes."""
+        now_minute = int(time.time() // 60) if now_minute is None else now_minute
+        with self._lock:
+            live = self._minute > now_minute - self.window_minutes
+            return self.network._traffic_rows(
+                self._count[live].sum(axis=0), self._speed_sum[live].sum(axis=0), self._slow[live].sum(axis=0)
+            )
+
+
+class RoadNetworkRegistry:
+    """Road networks and their live traffic aggregates, loaded per site on first use"""
+
+    def __init__(self, directory: str = HAUL_ROADS_DIR):
+        self.directory = Path(directory)
+        self._networks: Dict[str, Optional[RoadNetwork]] = {}
+        self._traffic: Dict[str, SegmentTraffic] = {}
+        # site_id -> when a missing network was last looked up (monotonic)
+        self._missing: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, site_id: str) -> Optional[RoadNetwork]:
+        with self._lock:
+            checked = self._missing.get(site_id)
+            if site_id not in self._networks or (
+                checked is not None and time.monotonic() - checked >= MISSING_RETRY_SECONDS
+            ):
+                network = self._networks[site_id] = self._load(site_id)
+                if network is not None:
+                    self._traffic[site_id] = SegmentTraffic(network)
+                    self._missing.pop(site_id, None)
+                else:
+                    self._missing[site_id] = time.monotonic()
+            return self._networks[site_id]
+
+    def traffic(self, site_id: str) -> Optional[SegmentTraffic]:
+        return self._traffic.get(site_id) if self.get(site_id) is not None else None
+
+    def _load(self, site_id: str) -> Optional[RoadNetwork]:
+        path = self.directory / f"{site_id}.geojson"
+        if not path.is_file():
+            return None
+        try:
+            with open(path) as f:
+                network = RoadNetwork.from_geojson(json.load(f), projection=site_projection(site_id))
+            # Share the network's projection with the site's other layers
+            site_projection(site_id, network.projection.origin_lat, network.projection.origin_lng)
+            logger.info(f"Loaded haul roads for {site_id}: {len(network.segment_ids)} segments")
+            return network
+        except Exception as e:
+            logger.error(f"Failed to load haul roads from {path}: {e}")
+            return None
+
+    def save(self, site_id: str, geojson: Dict[str, Any]) -> RoadNetwork:
+        """Validate and store a site's road network, replacing the current one (raises ValueError)."""
+        try:
+            network = RoadNetwork.from_geojson(geojson, projection=site_projection(site_id))
+        except (KeyError, TypeError, IndexError, ValueError) as e:
+            raise ValueError(f"Invalid haul road GeoJSON: {e}") from e
+        site_projection(site_id, network.projection.origin_lat, network.projection.origin_lng)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{site_id}.geojson"
+        tmp = path.with_suffix(".geojson.tmp")
+        with open(tmp, "w") as f:
+            json.dump(geojson, f)
+        os.replace(tmp, path)
+        with self._lock:
+            self._networks[site_id] = network
+            self._missing.pop(site_id, None)
+            # Segment indices changed; traffic restarts from the next readings
+            self._traffic[site_id] = SegmentTraffic(network)
+        return network
+
+    def ingest(self, events: List[Dict[str, Any]]) -> int:
+        """Match live events into their site's traffic aggregates; returns matched count."""
+        by_site: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events:
+            if event.get("site_id") and event.get("latitude") is not None and event.get("longitude") is not None:
+                by_site.setdefault(event["site_id"], []).append(event)
+        matched = 0
+        for site_id, site_events in by_site.items():
+            network = self.get(site_id)
+            if network is None:
+                continue
+            speed = [e.get("speed_mph") for e in site_events]
+            result = network.match(
+                [e["latitude"] for e in site_events],
+                [e["longitude"] for e in site_events],
+                [e.get("heading_degrees") for e in site_events],
+                speed,
+            )
+            # Each reading's own UTC minute; unparseable ones count as now
+            seconds = epoch_seconds(e.get("source_timestamp") or e.get("timestamp") for e in site_events)
+            minute = np.where(np.isnan(seconds), time.time(), seconds) // 60
+            self._traffic[site_id].add(result["segment"], np.asarray(speed, dtype=np.float64), minute)
+            matched += int((result["segment"] >= 0).sum())
+        return matched
+
+
+# Singleton instance
+_road_registry: Optional[RoadNetworkRegistry] = None
+
+
+def get_road_networks() -> RoadNetworkRegistry:
+    """Get or create the road network registry singleton"""
+    global _road_registry
+    if _road_registry is None:
+        _road_registry = RoadNetworkRegistry()
+    return _road_registry
@@ -0,0 +1,301 @@
+"""
+Model artifact registry for TERRA
+
+Loads the pipelines the notebooks train (GHOST_CYCLE_DETECTOR,
+CYCLE_TIME_OPTIMIZER, CHOKE_POINT_PREDICTOR) from a local directory that
+stands in for the Snowflake model registry, and keeps them warm in memory.
+
+The directory mirrors the ML.MODEL_ARTIFACTS stage the notebooks export to,
+so deploying a model is copying the stage down:
+
+    TERRA_MODELS_DIR/{version}/{MODEL_NAME}.pkl     e.g. v1.0/CHOKE_POINT_PREDICTOR.pkl
+    TERRA_MODELS_DIR/{MODEL_NAME}.pkl               unversioned, used when no version exists
+
+The newest version (natural order, so v1.10 > v1.9) is served. Loaded
+models are cached keyed by (name, version); a version whose file changes is
+reloaded. A background watcher checks for new versions every
+MODEL_POLL_SECONDS and hot-swaps: the new version is unpickled beside the
+one being served and then replaces it in one assignment, so requests in
+flight finish on the model they started with and none wait on a load. A
+version that fails to load is skipped and the previous one keeps serving.
+
+Each load records its time and the approximate size of the loaded model
+(its objects and array buffers, walked from the model), reported by
+metrics().
+"""
+
+import asyncio
+import gc
+import logging
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+import types
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAMES = ("GHOST_CYCLE_DETECTOR", "CYCLE_TIME_OPTIMIZER", "CHOKE_POINT_PREDICTOR")
+
+MODELS_DIR = os.environ.get(
+    "TERRA_MODELS_DIR", str(Path(__file__).resolve().parent.parent / "config" / "models")
+)
+
+MODEL_POLL_SECONDS = float(os.environ.get("TERRA_MODEL_POLL_SECONDS", "60"))
+
+# Version name of an artifact at the top of the models directory
+UNVERSIONED = "unversioned"
+
+# Versions kept loaded per model (the served one and the one it replaced)
+KEEP_VERSIONS = 2
+
+
+def _version_key(version: str) -> Tuple:
+    """Natural sort key: v1.10 after v1.9; unversioned before everything."""
+    if version == UNVERSIONED:
+        return ()
+    return tuple((0, int(part)) if part.isdigit() else (1, part) for part in re.findall(r"\d+|[^\d.]+", version))
+
+
+@dataclass
+class LoadedModel:
+    """A deserialized pipeline and how it was loaded"""
+
+    name: str
+    version: str
+    model: Any
+    path: str
+    mtime: float
+    file_bytes: int
+    approx_memory_bytes: int
+    load_seconds: float
+    loaded_at: float
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "path": self.path,
+            "file_bytes": self.file_bytes,
+            "approx_memory_bytes": self.approx_memory_bytes,
+            "load_seconds": round(self.load_seconds, 4),
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.loaded_at)),
+        }
+
+
+class ModelRegistry:
+    """Versioned model artifacts, loaded once and served from memory"""
+
+    def __init__(self, directory: str = MODELS_DIR):
+        self.directory = Path(directory)
+        # (name, version) -> loaded model
+        self._cache: Dict[Tuple[str, str], LoadedModel] = {}
+        # name -> version being served
+        self._current: Dict[str, str] = {}
+        # (name, version) -> mtime of an artifact that failed to load
+        self._failed: Dict[Tuple[str, str], float] = {}
+        self._errors: Dict[str, str] = {}
+        # Models whose versions have been looked up at least once
+        self._checked: set = set()
+        # One loader at a time; readers never take it
+        self._load_lock = threading.Lock()
+        self.loads = 0
+        self.swaps = 0
+
+    def _artifact(self, name: str, version: str) -> Path:
+        if version == UNVERSIONED:
+            return self.directory / f"{name}.pkl"
+        return self.directory / version / f"{name}.pkl"
+
+    def versions(self, name: str) -> List[str]:
+        """Available versions of a model, oldest first."""
+        versions = []
+        if self.directory.is_dir():
+            versions = [p.parent.name for p in self.directory.glob(f"*/{name}.pkl") if p.is_file()]
+            if (self.directory / f"{name}.pkl").is_file():
+                versions.append(UNVERSIONED)
+        return sorted(versions, key=_version_key)
+
+    def _load(self, name: str, version: str) -> Optional[LoadedModel]:
+        """Unpickle one artifact, measuring time and memory; None if it fails."""
+        path = self._artifact(name, version)
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if self._failed.get((name, version)) == stat.st_mtime:
+            return None
+        start = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+        except Exception as e:
+            self._failed[(name, version)] = stat.st_mtime
+            self._errors[name] = f"{version}: {e}"
+            logger.error(f"Failed to load {name} {version} from {path}: {e}")
+            return None
+        finally:
+            load_seconds = time.perf_counter() - start
+        memory = _approx_size(model)
+        self.loads += 1
+        self._errors.pop(name, None)
+        logger.info(f"Loaded {name} {version} from {path} in {load_seconds:.3f}s (~{memory / 1e6:.1f} MB)")
+        return LoadedModel(
+            name=name, version=version, model=model, path=str(path), mtime=stat.st_mtime,
+            file_bytes=stat.st_size, approx_memory_bytes=memory, load_seconds=load_seconds,
+            loaded_at=time.time(),
+        )
+
+    def _ensure(self, name: str, version: str) -> Optional[LoadedModel]:
+        """The cached model of a version, loading it (or its changed file) if needed."""
+        key = (name, version)
+        cached = self._cache.get(key)
+        try:
+            mtime = self._artifact(name, version).stat().st_mtime
+        except OSError:
+            return cached
+        if cached is not None and cached.mtime == mtime:
+            return cached
+        with self._load_lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached.mtime == mtime:
+                return cached
+            loaded = self._load(name, version)
+            if loaded is None:
+                return cached
+            self._cache[key] = loaded
+            return loaded
+
+    def refresh(self, name: str) -> Optional[LoadedModel]:
+        """Serve the newest loadable version of a model; returns what is served."""
+        self._checked.add(name)
+        for version in reversed(self.versions(name)):
+            loaded = self._ensure(name, version)
+            if loaded is None:
+                continue
+            previous = self._current.get(name)
+            if previous != version:
+                # Readers pick up the new version on their next get()
+                self._current[name] = version
+                if previous is not None:
+                    self.swaps += 1
+                    logger.info(f"Swapped {name} {previous} -> {version}")
+                self._evict(name)
+            return loaded
+        return self.get(name, load=False)
+
+    def _evict(self, name: str):
+        """Drop all but the newest KEEP_VERSIONS loaded versions, never the served one."""
+        with self._load_lock:
+            loaded = sorted((v for n, v in self._cache if n == name), key=_version_key, reverse=True)
+            keep = set(loaded[:KEEP_VERSIONS]) | {self._current.get(name)}
+            for version in loaded:
+                if version not in keep:
+                    del self._cache[(name, version)]
+
+    def refresh_all(self) -> Dict[str, Optional[str]]:
+        """Refresh every model; returns the version each now serves."""
+        served = {}
+        for name in MODEL_NAMES:
+            try:
+                loaded = self.refresh(name)
+            except Exception as e:
+                logger.error(f"Model refresh failed for {name}: {e}")
+                loaded = self.get(name, load=False)
+            served[name] = loaded.version if loaded is not None else None
+        return served
+
+    def get(self, name: str, version: Optional[str] = None, load: bool = True) -> Optional[LoadedModel]:
+        """
+        A loaded model: the served version, or a specific one.
+
+        The first request for a model loads it; after that the served
+        version is a dictionary lookup, and new versions arrive through
+        refresh().
+        """
+        if version is not None:
+            return self._ensure(name, version) if load else self._cache.get((name, version))
+        current = self._current.get(name)
+        if current is not None:
+            return self._cache.get((name, current))
+        return self.refresh(name) if load and name not in self._checked else None
+
+    def model(self, name: str, version: Optional[str] = None) -> Any:
+        """The deserialized pipeline, or None when no artifact loads."""
+        loaded = self.get(name, version)
+        return loaded.model if loaded is not None else None
+
+    def metrics(self) -> Dict[str, Any]:
+        cache = list(self._cache.values())
+        return {
+            "directory": str(self.directory),
+            "served": {name: self._current.get(name) for name in MODEL_NAMES},
+            "loaded": [m.summary() for m in sorted(cache, key=lambda m: (m.name, _version_key(m.version)))],
+            "approx_memory_bytes": sum(m.approx_memory_bytes for m in cache),
+            "loads": self.loads,
+            "swaps": self.swaps,
+            "errors": dict(self._errors),
+        }
+
+
+# Shared objects a model refers to but does not own
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType)
+
+
+def _approx_size(obj: Any) -> int:
+    """
+    Approximate bytes held by an object graph: sys.getsizeof of every object
+    reachable from it, each counted once, leaving out classes, modules and
+    functions. Arrays count the buffer they own, or the object they view;
+    objects with a Python-level __sizeof__ (pandas reports its whole frame)
+    only count themselves, as their contents are walked anyway.
+    """
+    seen = set()
+    pending = [obj]
+    total = 0
+    while pending:
+        current = pending.pop()
+        if id(current) in seen or isinstance(current, _SHARED_TYPES):
+            continue
+        seen.add(id(current))
+        if isinstance(getattr(type(current), "__sizeof__", None), types.FunctionType):
+            total += object.__sizeof__(current)
+        else:
+            total += sys.getsizeof(current)
+        if isinstance(current, np.ndarray):
+            # Arrays don't report their buffer to gc; unpickled ones often view a bytes object
+            if current.base is not None:
+                pending.append(current.base)
+            continue
+        pending.extend(gc.get_referents(current))
+    return total
+
+
+async def run_watcher(registry: "ModelRegistry", interval: float = MODEL_POLL_SECONDS):
+    """Load the models, then check for new versions every interval seconds, off the event loop."""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, registry.refresh_all)
+        except Exception as e:
+            logger.error(f"Model refresh run failed: {e}")
+        await asyncio.sleep(interval)
+
+
+# Singleton instance
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get or create the model registry singleton"""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
@@ -0,0 +1,244 @@
+"""
+Live position index for TERRA
+
+Answers "which trucks are within 200 m of this intersection right now"
+without scanning GPS_BREADCRUMBS. The latest position of every piece of
+equipment is kept in memory, bucketed by geohash cell (spatial_grid,
+INDEX_PRECISION ~150 m), and fed from ingested telemetry events and from
+the realtime telemetry polls; a reading older than the stored one for the
+same equipment is ignored, and positions past max_age are pruned by
+run_pruner. Radius, bounding-box and k-nearest queries
+only visit the cells that can contain a match, then filter the candidates
+with a vectorized great-circle distance.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+try:
+    from .geodesy import EARTH_RADIUS_M, degree_offsets, haversine_m
+    from .spatial_grid import cell_size_deg, cells_in_bbox, encode
+    from .telemetry_buffer import epoch_seconds
+except ImportError:
+    from services.geodesy import EARTH_RADIUS_M, degree_offsets, haversine_m
+    from services.spatial_grid import cell_size_deg, cells_in_bbox, encode
+    from services.telemetry_buffer import epoch_seconds
+
+INDEX_PRECISION = 7
+
+# Positions not updated within this window are left out of query results
+POSITION_MAX_AGE_SECONDS = float(os.environ.get("TERRA_POSITION_MAX_AGE_SECONDS", "600"))
+
+# How often run_pruner drops positions past max_age
+PRUNE_INTERVAL_SECONDS = 60.0
+
+# Bounding boxes covering more cells than this are answered by a full scan
+MAX_SCAN_CELLS = 4096
+
+# Nearest-neighbour searches stop widening at this radius and scan everything
+MAX_SEARCH_RADIUS_M = 20_000.0
+
+
+class PositionIndex:
+    """Latest position per equipment, bucketed by grid cell"""
+
+    def __init__(self, precision: int = INDEX_PRECISION, max_age: float = POSITION_MAX_AGE_SECONDS):
+        self.precision = precision
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # equipment_id -> position record
+        self._positions: Dict[str, Dict[str, Any]] = {}
+        # cell -> equipment_ids
+        self._cells: Dict[int, Set[str]] = {}
+        self.updates = 0
+        self.queries = 0
+
+    # -- updates ---------------------------------------------------------
+
+    def update(self, records: Iterable[Dict[str, Any]], site_id: Optional[str] = None) -> int:
+        """
+        Upsert positions from telemetry records.
+
+        Accepts both ingest events and get_equipment_telemetry rows
+        (equipment_id, latitude, longitude, speed_mph, ...); site_id is used
+        for records that don't carry one. Records without a position, and
+        records timestamped before the stored position of the same
+        equipment, are skipped. Returns how many were applied.
+        """
+        rows = []
+        for r in records:
+            equipment_id = r.get("equipment_id") or r.get("EQUIPMENT_ID")
+            lat = r.get("latitude", r.get("LATITUDE"))
+            lng = r.get("longitude", r.get("LONGITUDE"))
+            if equipment_id is None or lat is None or lng is None:
+                continue
+            rows.append((equipment_id, float(lat), float(lng), r))
+        if not rows:
+            return 0
+
+        cells = encode([row[1] for row in rows], [row[2] for row in rows], self.precision)
+        # Reading time (NaN when unknown) orders late or replayed records
+        observed = epoch_seconds(
+            row[3].get("source_timestamp") or row[3].get("timestamp")
+            or row[3].get("last_updated") or row[3].get("LAST_UPDATED")
+            for row in rows
+        )
+        now = time.monotonic()
+        applied = 0
+        with self._lock:
+            for (equipment_id, lat, lng, r), cell, observed_at in zip(rows, cells.tolist(), observed.tolist()):
+                previous = self._positions.get(equipment_id)
+                if previous is not None and observed_at < previous["observed_at"]:
+                    continue
+                if previous is not None and previous["cell"] != cell:
+                    bucket = self._cells.get(previous["cell"])
+                    if bucket is not None:
+                        bucket.discard(equipment_id)
+                        if not bucket:
+                            del self._cells[previous["cell"]]
+                self._cells.setdefault(cell, set()).add(equipment_id)
+                self._positions[equipment_id] = {
+                    "equipment_id": equipment_id,
+                    "site_id": r.get("site_id") or r.get("SITE_ID") or site_id or (previous or {}).get("site_id"),
+                    "equipment_type": r.get("equipment_type") or r.get("EQUIPMENT_TYPE"),
+                    "latitude": lat,
+                    "longitude": lng,
+                    "speed_mph": r.get("speed_mph", r.get("SPEED_MPH")),
+                    "heading_degrees": r.get("heading_degrees", r.get("HEADING_DEGREES")),
+                    "last_updated": r.get("timestamp") or r.get("last_updated"),
+                    "cell": cell,
+                    "observed_at": observed_at,
+                    "updated_at": now,
+                }
+                applied += 1
+            self.updates += applied
+        return applied
+
+    def remove(self, equipment_id: str):
+        with self._lock:
+            previous = self._positions.pop(equipment_id, None)
+            if previous is not None:
+                bucket = self._cells.get(previous["cell"], set())
+                bucket.discard(equipment_id)
+                if not bucket:
+                    self._cells.pop(previous["cell"], None)
+
+    def prune(self) -> int:
+        """Drop positions older than max_age; returns how many were removed."""
+        cutoff = time.monotonic() - self.max_age
+        with self._lock:
+            stale = [e for e, p in self._positions.items() if p["updated_at"] < cutoff]
+        for equipment_id in stale:
+            self.remove(equipment_id)
+        return len(stale)
+
+    # -- queries ---------------------------------------------------------
+
+    def _candidates(self, cells: Optional[np.ndarray], site_id: Optional[str]) -> List[Dict[str, Any]]:
+        cutoff = time.monotonic() - self.max_age
+        with self._lock:
+            self.queries += 1
+            if cells is None:
+                records = list(self._positions.values())
+            else:
+                records = [
+                    self._positions[e]
+                    for cell in cells.tolist()
+                    for e in self._cells.get(cell, ())
+                ]
+        return [
+            r for r in records
+            if r["updated_at"] >= cutoff and (site_id is None or r["site_id"] == site_id)
+        ]
+
+    @staticmethod
+    def _public(record: Dict[str, Any], distance: Optional[float] = None) -> Dict[str, Any]:
+        result = {k: v for k, v in record.items() if k not in ("cell", "observed_at", "updated_at")}
+        if distance is not None:
+            result["distance_m"] = round(float(distance), 1)
+        return result
+
+    def _bbox_cells(self, south: float, west: float, north: float, east: float) -> Optional[np.ndarray]:
+        """Cells covering a bounding box, or None when a full scan is cheaper."""
+        height, width = cell_size_deg(self.precision)
+        if ((north - south) / height + 2) * ((east - west) / width + 2) > MAX_SCAN_CELLS:
+            return None
+        return cells_in_bbox(south, west, north, east, self.precision)
+
+    def _radius_cells(self, lat: float, lng: float, radius_m: float) -> Optional[np.ndarray]:
+        d_lat, d_lng = degree_offsets(lat, radius_m)
+        return self._bbox_cells(lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng)
+
+    def _by_distance(self, records: List[Dict[str, Any]], lat: float, lng: float,
+                     radius_m: float = math.inf) -> List[Dict[str, Any]]:
+        """Records within radius_m of a point, nearest first, with distance_m."""
+        if not records:
+            return []
+        distances = haversine_m(
+            lat, lng,
+            np.fromiter((r["latitude"] for r in records), np.float64, len(records)),
+            np.fromiter((r["longitude"] for r in records), np.float64, len(records)),
+        )
+        order = np.argsort(distances, kind="stable")
+        return [self._public(records[i], distances[i]) for i in order if distances[i] <= radius_m]
+
+    def within_radius(self, lat: float, lng: float, radius_m: float, site_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Equipment within radius_m of a point, nearest first."""
+        return self._by_distance(self._candidates(self._radius_cells(lat, lng, radius_m), site_id), lat, lng, radius_m)
+
+    def within_bbox(self, south: float, west: float, north: float, east: float, site_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Equipment inside a bounding box."""
+        return [
+            self._public(r) for r in self._candidates(self._bbox_cells(south, west, north, east), site_id)
+            if south <= r["latitude"] <= north and west <= r["longitude"] <= east
+        ]
+
+    def nearest(self, lat: float, lng: float, k: int = 5, site_id: Optional[str] = None,
+                max_distance_m: Optional[float] = None) -> List[Dict[str, Any]]:
+        """The k nearest equipment to a point, searching outward ring by ring."""
+        height, _ = cell_size_deg(self.precision)
+        radius = height * math.pi / 180.0 * EARTH_RADIUS_M
+        limit = min(max_distance_m or MAX_SEARCH_RADIUS_M, MAX_SEARCH_RADIUS_M)
+        while radius < limit:
+            found = self.within_radius(lat, lng, radius, site_id)
+            # Everything within `radius` has been seen, so k hits there are the k nearest
+            if len(found) >= k:
+                return found[:k]
+            radius *= 2
+        if max_distance_m is not None:
+            return self.within_radius(lat, lng, max_distance_m, site_id)[:k]
+        return self._by_distance(self._candidates(None, site_id), lat, lng)[:k]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "equipment": len(self._positions),
+                "cells": len(self._cells),
+                "updates": self.updates,
+                "queries": self.queries,
+            }
+
+
+async def run_pruner(index: "PositionIndex", interval: float = PRUNE_INTERVAL_SECONDS):
+    """Drop positions past max_age every interval seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        index.prune()
+
+
+# Singleton instance
+_position_index: Optional[PositionIndex] = None
+
+
+def get_position_index() -> PositionIndex:
+    """Get or create the live position index singleton"""
+    global _position_index
+    if _position_index is None:
+        _position_index = PositionIndex()
+    return _position_index
@@ -0,0 +1,252 @@
+"""
+Query resilience primitives for TERRA
+
+- Snowflake error classification (retry, reconnect, or give up)
+- Retry policy with full-jitter exponential backoff
+- Circuit breaker that fails fast while the warehouse is unhealthy
+- Query deadlines that bound every attempt a caller's queries may make
+
+Used by SnowflakeServiceSPCS.execute_query so transient warehouse errors
+are retried and persistent ones surface as errors instead of empty results.
+"""
+
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+class QueryError(Exception):
+    """A query failed and no usable result could be served"""
+
+    def __init__(self, message: str, error_code: Optional[str] = None, kind: str = "permanent"):
+        super().__init__(message)
+        self.error_code = error_code
+        self.kind = kind
+
+
+class QueryTimeoutError(QueryError):
+    """A query exceeded its per-query timeout"""
+
+    def __init__(self, message: str):
+        super().__init__(message, error_code="000630", kind="transient")
+
+
+class CircuitOpenError(QueryError):
+    """The warehouse circuit is open; the query was not attempted"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Warehouse circuit open - retry in {retry_in:.0f}s", kind="circuit_open")
+        self.retry_in = retry_in
+
+
+# =============================================================================
+# Error classification
+# =============================================================================
+
+# Session/token problems - reconnect, then retry
+RECONNECT_CODES = {
+    "390114",  # Authentication token has expired
+    "390111",  # Session no longer exists
+    "390112",  # Session token expired
+}
+
+# Transient warehouse/network problems - retry with backoff
+TRANSIENT_CODES = {
+    "000604",  # SQL execution canceled
+    "000625",  # Statement aborted, lock waiters exceeded
+    "000630",  # Statement reached its statement or warehouse timeout
+    "250001",  # Could not connect to Snowflake backend
+    "250003",  # Failed to get the response
+    "251006",  # Login/connection request timed out
+}
+
+_TRANSIENT_HINTS = (
+    "timeout", "timed out", "temporarily unavailable", "connection reset",
+    "connection aborted", "service unavailable", "too many requests", "throttl",
+    "warehouse is suspended", "resuming warehouse",
+)
+
+_CODE_PATTERN = re.compile(r"\b(\d{6})\b")
+
+
+def extract_error_code(error: BaseException) -> Optional[str]:
+    """Pull a Snowflake error code from a connector, Snowpark or CLI error."""
+    if isinstance(error, QueryError) and error.error_code:
+        return error.error_code
+    for attr in ("sql_error_code", "errno"):
+        value = getattr(error, attr, None)
+        if value not in (None, "", -1):
+            return str(value).zfill(6)
+    match = _CODE_PATTERN.search(str(error))
+    return match.group(1) if match else None
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classify a query error.
+
+    Returns:
+        "reconnect" - session/token problem, rebuild connection then retry
+        "transient" - warehouse/network hiccup, retry with backoff
+        "permanent" - SQL/permission problem, retrying will not help
+    """
+    if isinstance(error, QueryError) and error.kind in ("transient", "reconnect"):
+        return error.kind
+    code = extract_error_code(error)
+    if code in RECONNECT_CODES:
+        return "reconnect"
+    if code in TRANSIENT_CODES:
+        return "transient"
+    message = str(error).lower()
+    if "token" in message and "expired" in message:
+        return "reconnect"
+    if any(hint in message for hint in _TRANSIENT_HINTS):
+        return "transient"
+    return "permanent"
+
+
+# =============================================================================
+# Retry policy
+# =============================================================================
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+    max_attempts: int = 3
+    base_delay: float = 0.25
+    max_delay: float = 4.0
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (1-based)."""
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+
+# =============================================================================
+# Query deadlines
+# =============================================================================
+
+_deadline: ContextVar[Optional[float]] = ContextVar("query_deadline", default=None)
+
+
+@contextmanager
+def query_deadline(seconds: float):
+    """
+    Bound the queries run in this context, attempts and backoff included,
+    to finish within `seconds`. Nested deadlines keep the earlier one.
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def deadline_remaining() -> Optional[float]:
+    """Seconds left before the current query deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+# =============================================================================
+# Circuit breaker
+# =============================================================================
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    States:
+        closed    - queries run normally
+        open      - queries fail fast until recovery_timeout has passed
+        half_open - one trial query is let through; success closes, failure reopens
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.total_failures = 0
+        self.total_successes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        """Return True if a query may be attempted now."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def retry_in(self) -> float:
+        with self._lock:
+            return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.total_successes += 1
+            self._consecutive_failures = 0
+            self._state = self.CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.total_failures += 1
+            self._consecutive_failures += 1
+            state = self._current_state()
+            # A late failure from a query started before the breaker opened
+            # must not extend the cool-down
+            if state == self.OPEN:
+                return
+            if state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "recovery_timeout_s": self.recovery_timeout,
+                "retry_in_s": round(max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at)), 1)
+                if state == self.OPEN else 0.0,
+                "total_failures": self.total_failures,
+                "total_successes": self.total_successes,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
@@ -6,13 +6,53 @@ Includes auto-reconnection on token expiration.
 """
 
 import json
+import math
 import os
 import subprocess
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import Any, Dict, List, Optional
 import logging
 
+try:
+    from .spcs_token import get_spcs_token_provider
+    from .completion_cache import completion_key, get_completion_cache
+    from .resilience import (
+        CircuitBreaker, CircuitOpenError, QueryError, QueryTimeoutError,
+        RetryPolicy, classify_error, deadline_remaining, extract_error_code,
+    )
+except ImportError:
+    from services.spcs_token import get_spcs_token_provider
+    from services.completion_cache import completion_key, get_completion_cache
+    from services.resilience import (
+        CircuitBreaker, CircuitOpenError, QueryError, QueryTimeoutError,
+        RetryPolicy, classify_error, deadline_remaining, extract_error_code,
+    )
+
 logger = logging.getLogger(__name__)
 
+# Rebuild connector connections well before the SPCS OAuth token they were
+# opened with expires, even if no rotation has been observed.
+CONNECTION_MAX_AGE_SECONDS = float(os.environ.get("SPCS_CONNECTION_MAX_AGE_SECONDS", "3000"))
+
+# Per-query timeout applied as STATEMENT_TIMEOUT_IN_SECONDS / CLI timeout
+QUERY_TIMEOUT_SECONDS = float(os.environ.get("SNOWFLAKE_QUERY_TIMEOUT_SECONDS", "120"))
+
+# Last good result per SQL text, served when the warehouse is failing.
+# Bounded by entries and by total rows; results larger than the per-query
+# limit (trails, exports) are not kept at all.
+STALE_RESULT_MAX_ENTRIES = 256
+STALE_RESULT_MAX_ROWS = int(os.environ.get("SNOWFLAKE_STALE_RESULT_MAX_ROWS", "100000"))
+STALE_RESULT_MAX_ROWS_PER_QUERY = int(os.environ.get("SNOWFLAKE_STALE_RESULT_MAX_ROWS_PER_QUERY", "5000"))
+
+# How long a data-version fingerprint is reused before LAST_ALTERED is re-read
+DATA_VERSION_TTL_SECONDS = float(os.environ.get("SNOWFLAKE_DATA_VERSION_TTL_SECONDS", "60"))
+
+# Schemas whose tables the copilot's prompts are built from
+DATA_VERSION_SCHEMAS = ("RAW", "ATOMIC", "ML")
+
 
 def _detect_spcs() -> bool:
     """Detect if running inside SPCS container"""
@@ -42,6 +82,39 @@ class SnowflakeServiceSPCS:
         self.schema = os.environ.get("SNOWFLAKE_SCHEMA", "ATOMIC")
         self._session = None
         self._connection = None
+        self._token_provider = get_spcs_token_provider()
+        self._connection_token_version = None
+        self._connection_created_at = 0.0
+        # Bumped on every new connection, so threads that saw the same
+        # failure reconnect once between them
+        self._connection_generation = 0
+        # Guards replacing the session/connection
+        self._connection_lock = threading.RLock()
+        
+        # Query resilience: retries, circuit breaker and last-good results
+        self._retry_policy = RetryPolicy()
+        self._breaker = CircuitBreaker(
+            failure_threshold=int(os.environ.get("SNOWFLAKE_BREAKER_THRESHOLD", "5")),
+            recovery_timeout=float(os.environ.get("SNOWFLAKE_BREAKER_RECOVERY_SECONDS", "30")),
+        )
+        self._last_good_results: "OrderedDict[str, tuple]" = OrderedDict()
+        self._last_good_rows = 0
+        # Per-thread flag set by fresh_only()
+        self._local = threading.local()
+        self._query_counters = {
+            "queries": 0,
+            "retries": 0,
+            "reconnects": 0,
+            "permanent_errors": 0,
+            "failed": 0,
+            "fast_failed": 0,
+            "stale_served": 0,
+        }
+        # Guards the last-good LRU and the counters (queries run on executor threads)
+        self._state_lock = threading.Lock()
+        self._completion_cache = get_completion_cache()
+        self._data_version: Optional[str] = None
+        self._data_version_at = 0.0
         
         self.is_spcs = IS_SPCS
         
@@ -96,147 +169,289 @@ class SnowflakeServiceSPCS:
     
     def _init_connector_fallback(self):
         """Fallback to connector if Snowpark fails - also used for reconnection"""
-        try:
-            import snowflake.connector
+        with self._connection_lock:
+            try:
+                import snowflake.connector
             
-            if self._connection:
-                try:
-                    self._connection.close()
-                except:
-                    pass
-                self._connection = None
+                if self._connection:
+                    try:
+                        self._connection.close()
+                    except:
+                        pass
+                    self._connection = None
             
-            token_path = "/snowflake/session/token"
-            token = ""
-            if os.path.exists(token_path):
-                with open(token_path, "r") as f:
-                    token = f.read().strip()
+                token = self._token_provider.get_token() or ""
+                token_version = self._token_provider.version
             
-            warehouse = os.environ.get("SNOWFLAKE_WAREHOUSE", "TERRA_COMPUTE_WH")
+                warehouse = os.environ.get("SNOWFLAKE_WAREHOUSE", "TERRA_COMPUTE_WH")
             
-            self._connection = snowflake.connector.connect(
-                host=os.environ.get("SNOWFLAKE_HOST", ""),
-                account=os.environ.get("SNOWFLAKE_ACCOUNT", ""),
-                authenticator="oauth",
-                token=token,
-                database=self.database,
-                schema=self.schema,
-                warehouse=warehouse
-            )
-            print(f"[SPCS] Connector established with warehouse: {warehouse}", flush=True)
-            logger.info(f"Connector fallback connection established with warehouse: {warehouse}")
+                self._connection = snowflake.connector.connect(
+                    host=os.environ.get("SNOWFLAKE_HOST", ""),
+                    account=os.environ.get("SNOWFLAKE_ACCOUNT", ""),
+                    authenticator="oauth",
+                    token=token,
+                    database=self.database,
+                    schema=self.schema,
+                    warehouse=warehouse
+                )
+                self._connection_token_version = token_version
+                self._connection_created_at = time.monotonic()
+                self._connection_generation += 1
+                print(f"[SPCS] Connector established with warehouse: {warehouse}", flush=True)
+                logger.info(f"Connector fallback connection established with warehouse: {warehouse}")
+                return True
+            except Exception as e:
+                print(f"[SPCS] Connector fallback failed: {e}", flush=True)
+                logger.error(f"Connector fallback also failed: {e}")
+                return False
+    
+    def _refresh_connection_if_stale(self):
+        """Rebuild the connector connection when the token rotates or ages out"""
+        if not self._connection:
+            return
+        self._token_provider.get_token()
+        with self._connection_lock:
+            rotated = self._token_provider.version != self._connection_token_version
+            aged_out = time.monotonic() - self._connection_created_at > CONNECTION_MAX_AGE_SECONDS
+            if rotated or aged_out:
+                reason = "token rotated" if rotated else "connection aged out"
+                print(f"[SPCS] Proactively reconnecting ({reason})...", flush=True)
+                self._init_connector_fallback()
+    
+    def _reconnect(self, generation: Optional[int] = None) -> bool:
+        """
+        Rebuild the connection after a session/token error.
+
+        generation is the connection the failed query used; if another
+        thread has replaced it since, that connection is used as is.
+        """
+        with self._connection_lock:
+            if generation is not None and generation != self._connection_generation:
+                return True
+            self._count("reconnects")
+            if not self._init_connector_fallback():
+                return False
+            # A Snowpark session with an expired token can't recover on its own,
+            # so route further queries through the fresh connector connection.
+            if self._session:
+                try:
+                    self._session.close()
+                except Exception:
+                    pass
+                self._session = None
             return True
-        except Exception as e:
-            print(f"[SPCS] Connector fallback failed: {e}", flush=True)
-            logger.error(f"Connector fallback also failed: {e}")
-            return False
     
-    def _reconnect_if_needed(self, error_msg: str) -> bool:
-        """Check if error is token expiration and reconnect if so"""
-        error_str = str(error_msg).lower()
-        if "390114" in str(error_msg) or ("token" in error_str and "expired" in error_str):
-            print(f"[SPCS] Token expired, reconnecting...", flush=True)
-            return self._init_connector_fallback()
-        return False
+    def _count(self, counter: str):
+        with self._state_lock:
+            self._query_counters[counter] += 1
     
-    def execute_query(self, query: str) -> List[Dict[str, Any]]:
-        """Execute a SQL query and return results as list of dicts"""
-        if self.is_spcs:
-            return self._execute_query_snowpark(query)
-        else:
-            return self._execute_query_cli(query)
+    def execute_query(self, query: str, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Execute a SQL query and return results as list of dicts.
+        
+        Transient warehouse errors are retried with jittered exponential
+        backoff and session/token errors reconnect before retrying. While the
+        circuit breaker is open queries fail fast. If the query can't be
+        answered, the last good result for the same SQL is served; with no
+        prior result a QueryError is raised instead of returning [].
+        
+        Inside resilience.query_deadline() the attempts, their timeouts and
+        the backoff between them all end by the deadline.
+        """
+        timeout = timeout or QUERY_TIMEOUT_SECONDS
+        self._count("queries")
+        
+        if not self._breaker.allow():
+            self._count("fast_failed")
+            return self._serve_last_good(query, CircuitOpenError(self._breaker.retry_in()))
+        
+        last_error: Optional[Exception] = None
+        for attempt in range(1, self._retry_policy.max_attempts + 1):
+            remaining = deadline_remaining()
+            if remaining is not None and remaining <= 0:
+                last_error = last_error or QueryTimeoutError("Query deadline passed before it could run")
+                break
+            attempt_timeout = timeout if remaining is None else min(timeout, remaining)
+            generation = self._connection_generation
+            try:
+                if self.is_spcs:
+                    results = self._execute_query_snowpark(query, attempt_timeout)
+                else:
+                    results = self._execute_query_cli(query, attempt_timeout)
+            except Exception as e:
+                last_error = e
+                kind = classify_error(e)
+                print(f"[QUERY] Attempt {attempt} failed ({kind}): {e}", flush=True)
+                if kind == "permanent":
+                    # The warehouse answered - a bad query isn't an outage
+                    self._breaker.record_success()
+                    self._count("permanent_errors")
+                    if isinstance(e, QueryError):
+                        raise
+                    raise QueryError(str(e), extract_error_code(e)) from e
+                if kind == "reconnect":
+                    self._reconnect(generation)
+                if attempt < self._retry_policy.max_attempts:
+                    delay = self._retry_policy.backoff(attempt)
+                    remaining = deadline_remaining()
+                    if remaining is not None and remaining <= delay:
+                        break
+                    self._count("retries")
+                    time.sleep(delay)
+                continue
+            
+            self._breaker.record_success()
+            self._remember_result(query, results)
+            return results
+        
+        self._breaker.record_failure()
+        self._count("failed")
+        logger.error(f"Query failed after {attempt} attempt(s): {last_error}")
+        return self._serve_last_good(query, last_error)
+    
+    def _remember_result(self, query: str, results: List[Dict[str, Any]]):
+        """Keep the latest good result for a query (LRU bounded by entries and rows)"""
+        with self._state_lock:
+            previous = self._last_good_results.pop(query, None)
+            if previous is not None:
+                self._last_good_rows -= len(previous[1])
+            if len(results) > STALE_RESULT_MAX_ROWS_PER_QUERY:
+                return
+            self._last_good_results[query] = (time.time(), results)
+            self._last_good_rows += len(results)
+            while (len(self._last_good_results) > STALE_RESULT_MAX_ENTRIES
+                   or self._last_good_rows > STALE_RESULT_MAX_ROWS):
+                _, (_, evicted) = self._last_good_results.popitem(last=False)
+                self._last_good_rows -= len(evicted)
+    
+    @contextmanager
+    def fresh_only(self):
+        """
+        Within this block (on this thread) a failing query raises instead of
+        serving the last good result. For callers that keep their own stale
+        copy with its real age, such as the dashboard SWR cache.
+        """
+        previous = getattr(self._local, "fresh_only", False)
+        self._local.fresh_only = True
+        try:
+            yield
+        finally:
+            self._local.fresh_only = previous
     
-    def _execute_query_snowpark(self, query: str, retry: bool = True) -> List[Dict[str, Any]]:
-        """Execute query using Snowpark Session (SPCS) with auto-reconnect on token expiration"""
+    def _serve_last_good(self, query: str, error: Exception) -> List[Dict[str, Any]]:
+        """Serve the last good result for a failing query, or raise"""
+        entry = None
+        if not getattr(self._local, "fresh_only", False):
+            with self._state_lock:
+                entry = self._last_good_results.get(query)
+        if entry is not None:
+            stored_at, results = entry
+            self._count("stale_served")
+            logger.warning(f"Serving {time.time() - stored_at:.0f}s old result after query failure: {error}")
+            return results
+        if isinstance(error, QueryError):
+            raise error
+        raise QueryError(str(error), extract_error_code(error), classify_error(error)) from error
+    
+    def get_query_metrics(self) -> Dict[str, Any]:
+        """Circuit breaker state and query counters for monitoring"""
+        with self._state_lock:
+            counters = dict(self._query_counters)
+            cached = len(self._last_good_results)
+            cached_rows = self._last_good_rows
+        return {
+            "circuit_breaker": self._breaker.metrics(),
+            "counters": counters,
+            "last_good_results_cached": cached,
+            "last_good_rows_cached": cached_rows,
+            "query_timeout_s": QUERY_TIMEOUT_SECONDS,
+            "max_attempts": self._retry_policy.max_attempts,
+            "completion_cache": self._completion_cache.metrics(),
+        }
+    
+    def _execute_query_snowpark(self, query: str, timeout: float = QUERY_TIMEOUT_SECONDS) -> List[Dict[str, Any]]:
+        """Execute query using Snowpark Session (SPCS) or the connector fallback"""
         print(f"[QUERY] Executing: {query[:200]}...", flush=True)
         
-        try:
-            if self._session:
-                print(f"[QUERY] Using Snowpark Session", flush=True)
-                df = self._session.sql(query)
-                rows = df.collect()
-                if not rows:
-                    print(f"[QUERY] No rows returned", flush=True)
-                    return []
-                
-                results = []
-                for row in rows:
-                    row_dict = row.asDict()
-                    for key, value in row_dict.items():
-                        if hasattr(value, 'isoformat'):
-                            row_dict[key] = value.isoformat()
-                    results.append(row_dict)
-                
-                print(f"[QUERY] Returned {len(results)} rows", flush=True)
-                return results
-            elif self._connection:
-                print(f"[QUERY] Using Connector fallback", flush=True)
-                cursor = self._connection.cursor()
-                cursor.execute(query)
+        # Local references: another thread may swap them while this query runs
+        session, connection = self._session, self._connection
+        if session:
+            print(f"[QUERY] Using Snowpark Session", flush=True)
+            df = session.sql(query)
+            rows = df.collect(statement_params={"STATEMENT_TIMEOUT_IN_SECONDS": max(1, math.ceil(timeout))})
+            if not rows:
+                print(f"[QUERY] No rows returned", flush=True)
+                return []
+            
+            results = []
+            for row in rows:
+                row_dict = row.asDict()
+                for key, value in row_dict.items():
+                    if hasattr(value, 'isoformat'):
+                        row_dict[key] = value.isoformat()
+                results.append(row_dict)
+            
+            print(f"[QUERY] Returned {len(results)} rows", flush=True)
+            return results
+        elif connection:
+            print(f"[QUERY] Using Connector fallback", flush=True)
+            self._refresh_connection_if_stale()
+            connection = self._connection
+            if connection is None:
+                raise QueryError("No SPCS connection available", kind="reconnect")
+            cursor = connection.cursor()
+            try:
+                cursor.execute(query, timeout=max(1, math.ceil(timeout)))
                 columns = [desc[0] for desc in cursor.description] if cursor.description else []
                 rows = cursor.fetchall()
-                
-                print(f"[QUERY] Fetched {len(rows)} rows, columns: {columns[:5]}...", flush=True)
-                
-                results = []
-                for row in rows:
-                    row_dict = {}
-                    for i, col in enumerate(columns):
-                        value = row[i]
-                        if hasattr(value, 'isoformat'):
-                            value = value.isoformat()
-                        row_dict[col] = value
-                    results.append(row_dict)
-                
+            finally:
                 cursor.close()
-                print(f"[QUERY] Returning {len(results)} results", flush=True)
-                return results
-            else:
-                print(f"[QUERY] ERROR: No connection available!", flush=True)
-                logger.error("No SPCS connection available")
-                return []
-                
-        except Exception as e:
-            error_str = str(e)
-            print(f"[QUERY] EXCEPTION: {error_str}", flush=True)
-            logger.error(f"SPCS query failed: {e}")
             
-            # Check if token expired and retry once
-            if retry and self._reconnect_if_needed(error_str):
-                print(f"[QUERY] Retrying after reconnect...", flush=True)
-                return self._execute_query_snowpark(query, retry=False)
+            print(f"[QUERY] Fetched {len(rows)} rows, columns: {columns[:5]}...", flush=True)
             
-            return []
+            results = []
+            for row in rows:
+                row_dict = {}
+                for i, col in enumerate(columns):
+                    value = row[i]
+                    if hasattr(value, 'isoformat'):
+                        value = value.isoformat()
+                    row_dict[col] = value
+                results.append(row_dict)
+            
+            print(f"[QUERY] Returning {len(results)} results", flush=True)
+            return results
+        else:
+            print(f"[QUERY] ERROR: No connection available!", flush=True)
+            logger.error("No SPCS connection available")
+            raise QueryError("No SPCS connection available", kind="reconnect")
     
-    def _execute_query_cli(self, query: str) -> List[Dict[str, Any]]:
+    def _execute_query_cli(self, query: str, timeout: float = QUERY_TIMEOUT_SECONDS) -> List[Dict[str, Any]]:
         """Execute query using Snowflake CLI (local development)"""
+        cmd = [
+            self.snow_path, "sql", 
+            "-c", self.connection_name,
+            "--format", "JSON",
+            "-q", query
+        ]
+        
         try:
-            cmd = [
-                self.snow_path, "sql", 
-                "-c", self.connection_name,
-                "--format", "JSON",
-                "-q", query
-            ]
-            
             result = subprocess.run(
                 cmd, 
                 capture_output=True, 
                 text=True, 
-                timeout=120
+                timeout=timeout
             )
-            
-            if result.returncode != 0:
-                logger.error(f"Query failed: {result.stderr}")
-                return []
-            
-            return self._parse_json_output(result.stdout)
-            
         except subprocess.TimeoutExpired:
             logger.error("Query timeout")
-            return []
-        except Exception as e:
-            logger.error(f"CLI query failed: {e}")
-            return []
+            raise QueryTimeoutError(f"Query exceeded {timeout:.0f}s timeout")
+        
+        if result.returncode != 0:
+            logger.error(f"Query failed: {result.stderr}")
+            message = result.stderr.strip() or result.stdout.strip() or f"snow sql exited {result.returncode}"
+            raise QueryError(message[:1000], extract_error_code(Exception(message)))
+        
+        return self._parse_json_output(result.stdout)
     
     def _parse_json_output(self, output: str) -> List[Dict[str, Any]]:
         """Parse snow sql JSON output into list of dicts"""
@@ -343,22 +558,7 @@ class SnowflakeServiceSPCS:
         WHERE a.PROJECT_ID = '{site_id}'
         QUALIFY ROW_NUMBER() OVER (PARTITION BY a.ASSET_ID ORDER BY g.TIMESTAMP DESC) = 1
         """
-        try:
-            return self.execute_query(sql)
-        except Exception as e:
-            logger.warning(f"Telemetry query failed: {e}, returning mock data")
-            # Return mock data for local development
-            return [
-                {"equipment_id": "EQP-001", "equipment_name": "CAT 745 Truck", "equipment_type": "HAUL_TRUCK", 
-                 "speed_mph": 3.2, "engine_load_pct": 15, "fuel_rate_gph": 8.5, "latitude": 33.45, "longitude": -112.07,
-                 "current_activity": "IDLE"},
-                {"equipment_id": "EQP-002", "equipment_name": "CAT D10 Dozer", "equipment_type": "DOZER",
-                 "speed_mph": 2.1, "engine_load_pct": 12, "fuel_rate_gph": 12.0, "latitude": 33.46, "longitude": -112.08,
-                 "current_activity": "MOVING"},
-                {"equipment_id": "EQP-003", "equipment_name": "John Deere 870G", "equipment_type": "GRADER",
-                 "speed_mph": 4.5, "engine_load_pct": 18, "fuel_rate_gph": 6.0, "latitude": 33.44, "longitude": -112.06,
-                 "current_activity": "GRADING"},
-            ]
+        return self.execute_query(sql)
     
     def direct_sql_query(self, message: str) -> Dict[str, Any]:
         """
@@ -689,8 +889,67 @@ class SnowflakeServiceSPCS:
     # Cortex LLM
     # =========================================================================
     
-    def cortex_complete(self, prompt: str, model: str = "mistral-large2") -> str:
-        """Call Cortex Complete for LLM generation."""
+    def cortex_complete(
+        self,
+        prompt: str,
+        model: str = "mistral-large2",
+        data_version: Optional[str] = None,
+        use_cache: bool = True
+    ) -> str:
+        """
+        Call Cortex Complete for LLM generation.
+        
+        Responses are cached by normalized prompt, model and data_version.
+        data_version defaults to get_data_version(), so answers are not
+        reused across data loads; if it can't be read the cache is bypassed.
+        """
+        if use_cache and data_version is None:
+            data_version = self.get_data_version()
+            use_cache = data_version is not None
+        cache_key = completion_key(prompt, model, data_version)
+        if use_cache:
+            cached = self._completion_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"[LLM] Completion cache hit for model {model}")
+                return cached
+        
+        response = self._cortex_complete_uncached(prompt, model)
+        # Empty responses are failures; do not pin them in the cache
+        if use_cache and response:
+            self._completion_cache.put(cache_key, response)
+        return response
+    
+    def get_data_version(self) -> Optional[str]:
+        """
+        Fingerprint of the loaded data: the latest LAST_ALTERED across the
+        copilot's schemas. Re-read at most every DATA_VERSION_TTL_SECONDS;
+        None if it can't be read.
+        """
+        with self._state_lock:
+            if self._data_version is not None and time.monotonic() - self._data_version_at < DATA_VERSION_TTL_SECONDS:
+                return self._data_version
+        
+        schemas = ", ".join(f"'{schema}'" for schema in DATA_VERSION_SCHEMAS)
+        sql = f"""
+        SELECT TO_VARCHAR(MAX(LAST_ALTERED)) AS DATA_VERSION
+        FROM {self.database}.INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA IN ({schemas})
+        """
+        try:
+            results = self.execute_query(sql)
+        except Exception as e:
+            logger.warning(f"Could not read data version: {e}")
+            return None
+        version = results[0].get("DATA_VERSION") if results else None
+        if not version:
+            return None
+        
+        with self._state_lock:
+            self._data_version = str(version)
+            self._data_version_at = time.monotonic()
+        return self._data_version
+    
+    def _cortex_complete_uncached(self, prompt: str, model: str) -> str:
         escaped_prompt = prompt.replace("'", "''").replace("\\", "\\\\")
         
         sql = f"""
@@ -704,7 +963,9 @@ class SnowflakeServiceSPCS:
         
         try:
             if self.is_spcs and self._connection:
-                cursor = self._connection.cursor()
+                self._refresh_connection_if_stale()
+                connection = self._connection
+                cursor = connection.cursor()
                 cursor.execute(sql)
                 row = cursor.fetchone()
                 cursor.close()
@@ -728,21 +989,16 @@ class SnowflakeServiceSPCS:
     def _call_llm_cli(self, sql: str) -> str:
         """Call Cortex LLM using CLI"""
         try:
-            cmd = [self.snow_path, "sql", "-c", self.connection_name, "-q", sql]
+            cmd = [self.snow_path, "sql", "-c", self.connection_name, "--format", "JSON", "-q", sql]
             result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
             
             if result.returncode != 0:
                 return ""
             
-            output = result.stdout
-            lines = output.strip().split('\n')
-            
-            for i, line in enumerate(lines):
-                if 'RESPONSE' in line and i + 2 < len(lines):
-                    for j in range(i + 1, len(lines)):
-                        if lines[j].startswith('|') and not lines[j].startswith('|--'):
-                            response = lines[j].strip('| ')
-                            return response
+            # JSON output keeps multi-line completions intact (table output wraps them)
+            rows = self._parse_json_output(result.stdout)
+            if rows and rows[0].get("RESPONSE"):
+                return str(rows[0]["RESPONSE"])
             return ""
         except Exception as e:
             logger.error(f"LLM call failed: {e}")
@@ -760,7 +1016,6 @@ class SnowflakeServiceSPCS:
         """
         db = self.database
         
-        # Try to query from actual data first
         summary_sql = f"""
         WITH ghost_detection AS (
             SELECT 
@@ -791,137 +1046,118 @@ class SnowflakeServiceSPCS:
         FROM ghost_detection
         """
         
-        try:
-            results = self.execute_query(summary_sql)
-            
-            if results and results[0].get('TOTAL_GHOST_CYCLES', 0) > 0:
-                r = results[0]
-                fuel_wasted = r.get('TOTAL_FUEL_WASTED', 1240)
-                
-                # Get top offenders
-                top_sql = f"""
-                WITH ghost_detection AS (
-                    SELECT 
-                        g.EQUIPMENT_ID,
-                        e.EQUIPMENT_NAME,
-                        s.SITE_NAME,
-                        COUNT(*) as GHOST_COUNT,
-                        SUM(t.FUEL_RATE_GPH * 0.1) as FUEL_WASTED
-                    FROM {db}.RAW.GPS_BREADCRUMBS g
-                    JOIN {db}.RAW.EQUIPMENT e ON g.EQUIPMENT_ID = e.EQUIPMENT_ID
-                    JOIN {db}.RAW.SITES s ON e.SITE_ID = s.SITE_ID
-                    JOIN {db}.RAW.EQUIPMENT_TELEMATICS t 
-                        ON g.EQUIPMENT_ID = t.EQUIPMENT_ID
-                        AND ABS(DATEDIFF('second', g.TIMESTAMP, t.TIMESTAMP)) < 60
-                    WHERE g.SPEED_MPH > 2
-                      AND t.ENGINE_LOAD_PERCENT < 30
-                      AND g.TIMESTAMP >= DATEADD(day, -30, CURRENT_DATE())
-                    GROUP BY g.EQUIPMENT_ID, e.EQUIPMENT_NAME, s.SITE_NAME
-                )
-                SELECT * FROM ghost_detection ORDER BY GHOST_COUNT DESC LIMIT 5
-                """
-                top_offenders = self.execute_query(top_sql)
-                
-                # Get by site
-                site_sql = f"""
-                WITH ghost_detection AS (
-                    SELECT 
-                        s.SITE_NAME,
-                        COUNT(*) as GHOST_COUNT,
-                        SUM(t.FUEL_RATE_GPH * 0.1) as FUEL_WASTED
-                    FROM {db}.RAW.GPS_BREADCRUMBS g
-                    JOIN {db}.RAW.EQUIPMENT e ON g.EQUIPMENT_ID = e.EQUIPMENT_ID
-                    JOIN {db}.RAW.SITES s ON e.SITE_ID = s.SITE_ID
-                    JOIN {db}.RAW.EQUIPMENT_TELEMATICS t 
-                        ON g.EQUIPMENT_ID = t.EQUIPMENT_ID
-                        AND ABS(DATEDIFF('second', g.TIMESTAMP, t.TIMESTAMP)) < 60
-                    WHERE g.SPEED_MPH > 2
-                      AND t.ENGINE_LOAD_PERCENT < 30
-                      AND g.TIMESTAMP >= DATEADD(day, -30, CURRENT_DATE())
-                    GROUP BY s.SITE_NAME
-                )
-                SELECT * FROM ghost_detection ORDER BY GHOST_COUNT DESC
-                """
-                by_site = self.execute_query(site_sql)
-                
-                # Get by hour
-                hour_sql = f"""
-                WITH ghost_detection AS (
-                    SELECT 
-                        HOUR(g.TIMESTAMP) as HOUR_OF_DAY,
-                        COUNT(*) as GHOST_COUNT
-                    FROM {db}.RAW.GPS_BREADCRUMBS g
-                    JOIN {db}.RAW.EQUIPMENT_TELEMATICS t 
-                        ON g.EQUIPMENT_ID = t.EQUIPMENT_ID
-                        AND ABS(DATEDIFF('second', g.TIMESTAMP, t.TIMESTAMP)) < 60
-                    WHERE g.SPEED_MPH > 2
-                      AND t.ENGINE_LOAD_PERCENT < 30
-                      AND g.TIMESTAMP >= DATEADD(day, -30, CURRENT_DATE())
-                    GROUP BY HOUR(g.TIMESTAMP)
-                )
-                SELECT * FROM ghost_detection WHERE HOUR_OF_DAY BETWEEN 6 AND 15 ORDER BY HOUR_OF_DAY
-                """
-                by_hour = self.execute_query(hour_sql)
-                
-                return {
-                    "totalGhostCycles": r.get('TOTAL_GHOST_CYCLES', 156),
-                    "totalFuelWasted": int(fuel_wasted),
-                    "estimatedMonthlyCost": int(fuel_wasted * 3.8),  # ~$3.80/gallon
-                    "affectedEquipment": r.get('AFFECTED_EQUIPMENT', 23),
-                    "affectedSites": r.get('AFFECTED_SITES', 4),
-                    "topOffenders": [
-                        {
-                            "equipmentId": o.get("EQUIPMENT_ID", ""),
-                            "equipmentName": o.get("EQUIPMENT_NAME", ""),
-                            "ghostCount": o.get("GHOST_COUNT", 0),
-                            "fuelWasted": int(o.get("FUEL_WASTED", 0)),
-                            "siteName": o.get("SITE_NAME", "")
-                        }
-                        for o in top_offenders
-                    ] if top_offenders else [],
-                    "bySite": [
-                        {
-                            "siteName": s.get("SITE_NAME", ""),
-                            "ghostCount": s.get("GHOST_COUNT", 0),
-                            "fuelWasted": int(s.get("FUEL_WASTED", 0))
-                        }
-                        for s in by_site
-                    ] if by_site else [],
-                    "byHour": [
-                        {
-                            "hour": h.get("HOUR_OF_DAY", 0),
-                            "ghostCount": h.get("GHOST_COUNT", 0)
-                        }
-                        for h in by_hour
-                    ] if by_hour else []
-                }
-        except Exception as e:
-            logger.warning(f"Could not fetch ghost cycle data from DB: {e}")
+        results = self.execute_query(summary_sql)
+        r = results[0] if results else {}
+        if not r.get('TOTAL_GHOST_CYCLES'):
+            # No ghost cycles in the last 30 days
+            return {
+                "totalGhostCycles": 0,
+                "totalFuelWasted": 0,
+                "estimatedMonthlyCost": 0,
+                "affectedEquipment": 0,
+                "affectedSites": 0,
+                "topOffenders": [],
+                "bySite": [],
+                "byHour": [],
+            }
+        fuel_wasted = r.get('TOTAL_FUEL_WASTED') or 0
+        
+        # Get top offenders
+        top_sql = f"""
+        WITH ghost_detection AS (
+            SELECT 
+                g.EQUIPMENT_ID,
+                e.EQUIPMENT_NAME,
+                s.SITE_NAME,
+                COUNT(*) as GHOST_COUNT,
+                SUM(t.FUEL_RATE_GPH * 0.1) as FUEL_WASTED
+            FROM {db}.RAW.GPS_BREADCRUMBS g
+            JOIN {db}.RAW.EQUIPMENT e ON g.EQUIPMENT_ID = e.EQUIPMENT_ID
+            JOIN {db}.RAW.SITES s ON e.SITE_ID = s.SITE_ID
+            JOIN {db}.RAW.EQUIPMENT_TELEMATICS t 
+                ON g.EQUIPMENT_ID = t.EQUIPMENT_ID
+                AND ABS(DATEDIFF('second', g.TIMESTAMP, t.TIMESTAMP)) < 60
+            WHERE g.SPEED_MPH > 2
+              AND t.ENGINE_LOAD_PERCENT < 30
+              AND g.TIMESTAMP >= DATEADD(day, -30, CURRENT_DATE())
+            GROUP BY g.EQUIPMENT_ID, e.EQUIPMENT_NAME, s.SITE_NAME
+        )
+        SELECT * FROM ghost_detection ORDER BY GHOST_COUNT DESC LIMIT 5
+        """
+        top_offenders = self.execute_query(top_sql)
+        
+        # Get by site
+        site_sql = f"""
+        WITH ghost_detection AS (
+            SELECT 
+                s.SITE_NAME,
+                COUNT(*) as GHOST_COUNT,
+                SUM(t.FUEL_RATE_GPH * 0.1) as FUEL_WASTED
+            FROM {db}.RAW.GPS_BREADCRUMBS g
+            JOIN {db}.RAW.EQUIPMENT e ON g.EQUIPMENT_ID = e.EQUIPMENT_ID
+            JOIN {db}.RAW.SITES s ON e.SITE_ID = s.SITE_ID
+            JOIN {db}.RAW.EQUIPMENT_TELEMATICS t 
+                ON g.EQUIPMENT_ID = t.EQUIPMENT_ID
+                AND ABS(DATEDIFF('second', g.TIMESTAMP, t.TIMESTAMP)) < 60
+            WHERE g.SPEED_MPH > 2
+              AND t.ENGINE_LOAD_PERCENT < 30
+              AND g.TIMESTAMP >= DATEADD(day, -30, CURRENT_DATE())
+            GROUP BY s.SITE_NAME
+        )
+        SELECT * FROM ghost_detection ORDER BY GHOST_COUNT DESC
+        """
+        by_site = self.execute_query(site_sql)
+        
+        # Get by hour
+        hour_sql = f"""
+        WITH ghost_detection AS (
+            SELECT 
+                HOUR(g.TIMESTAMP) as HOUR_OF_DAY,
+                COUNT(*) as GHOST_COUNT
+            FROM {db}.RAW.GPS_BREADCRUMBS g
+            JOIN {db}.RAW.EQUIPMENT_TELEMATICS t 
+                ON g.EQUIPMENT_ID = t.EQUIPMENT_ID
+                AND ABS(DATEDIFF('second', g.TIMESTAMP, t.TIMESTAMP)) < 60
+            WHERE g.SPEED_MPH > 2
+              AND t.ENGINE_LOAD_PERCENT < 30
+              AND g.TIMESTAMP >= DATEADD(day, -30, CURRENT_DATE())
+            GROUP BY HOUR(g.TIMESTAMP)
+        )
+        SELECT * FROM ghost_detection WHERE HOUR_OF_DAY BETWEEN 6 AND 15 ORDER BY HOUR_OF_DAY
+        """
+        by_hour = self.execute_query(hour_sql)
         
-        # Return fallback demo data
         return {
-            "totalGhostCycles": 156,
-            "totalFuelWasted": 1240,
-            "estimatedMonthlyCost": 47120,
-            "affectedEquipment": 23,
-            "affectedSites": 4,
+            "totalGhostCycles": r.get('TOTAL_GHOST_CYCLES', 0),
+            "totalFuelWasted": int(fuel_wasted),
+            "estimatedMonthlyCost": int(fuel_wasted * 3.8),  # ~$3.80/gallon
+            "affectedEquipment": r.get('AFFECTED_EQUIPMENT', 0),
+            "affectedSites": r.get('AFFECTED_SITES', 0),
             "topOffenders": [
-                {"equipmentId": "H-07", "equipmentName": "CAT 793 #7", "ghostCount": 28, "fuelWasted": 224, "siteName": "Project Alpha"},
-                {"equipmentId": "H-12", "equipmentName": "CAT 793 #12", "ghostCount": 24, "fuelWasted": 192, "siteName": "Project Beta"},
-                {"equipmentId": "H-03", "equipmentName": "CAT 793 #3", "ghostCount": 21, "fuelWasted": 168, "siteName": "Project Alpha"},
-                {"equipmentId": "H-19", "equipmentName": "CAT 793 #19", "ghostCount": 18, "fuelWasted": 144, "siteName": "Project Gamma"},
-                {"equipmentId": "H-08", "equipmentName": "CAT 793 #8", "ghostCount": 15, "fuelWasted": 120, "siteName": "Project Delta"},
-            ],
+                {
+                    "equipmentId": o.get("EQUIPMENT_ID", ""),
+                    "equipmentName": o.get("EQUIPMENT_NAME", ""),
+                    "ghostCount": o.get("GHOST_COUNT", 0),
+                    "fuelWasted": int(o.get("FUEL_WASTED", 0)),
+                    "siteName": o.get("SITE_NAME", "")
+                }
+                for o in top_offenders
+            ] if top_offenders else [],
             "bySite": [
-                {"siteName": "Project Alpha", "ghostCount": 58, "fuelWasted": 464},
-                {"siteName": "Project Beta", "ghostCount": 42, "fuelWasted": 336},
-                {"siteName": "Project Gamma", "ghostCount": 31, "fuelWasted": 248},
-                {"siteName": "Project Delta", "ghostCount": 25, "fuelWasted": 192},
-            ],
+                {
+                    "siteName": s.get("SITE_NAME", ""),
+                    "ghostCount": s.get("GHOST_COUNT", 0),
+                    "fuelWasted": int(s.get("FUEL_WASTED", 0))
+                }
+                for s in by_site
+            ] if by_site else [],
             "byHour": [
-                {"hour": h, "ghostCount": [12, 8, 15, 22, 18, 25, 28, 14, 8, 6][h - 6]}
-                for h in range(6, 16)
-            ]
+                {
+                    "hour": h.get("HOUR_OF_DAY", 0),
+                    "ghostCount": h.get("GHOST_COUNT", 0)
+                }
+                for h in by_hour
+            ] if by_hour else []
         }
     
     # =========================================================================
@@ -944,24 +1180,7 @@ class SnowflakeServiceSPCS:
         ORDER BY IMPORTANCE_RANK ASC
         LIMIT 20
         """
-        try:
-            results = self.execute_query(sql)
-            if results:
-                return results
-        except Exception as e:
-            logger.warning(f"Could not fetch feature importance: {e}")
-        
-        # Fallback demo data for GHOST_CYCLE_DETECTOR
-        return [
-            {"FEATURE_NAME": "SPEED_TO_LOAD_RATIO", "SHAP_IMPORTANCE": 0.342, "IMPORTANCE_RANK": 1, "FEATURE_DIRECTION": "positive"},
-            {"FEATURE_NAME": "ENGINE_LOAD_PCT", "SHAP_IMPORTANCE": 0.287, "IMPORTANCE_RANK": 2, "FEATURE_DIRECTION": "negative"},
-            {"FEATURE_NAME": "GPS_SPEED_MPH", "SHAP_IMPORTANCE": 0.198, "IMPORTANCE_RANK": 3, "FEATURE_DIRECTION": "positive"},
-            {"FEATURE_NAME": "FUEL_RATE_GPH", "SHAP_IMPORTANCE": 0.156, "IMPORTANCE_RANK": 4, "FEATURE_DIRECTION": "positive"},
-            {"FEATURE_NAME": "TIME_SINCE_LAST_HAUL", "SHAP_IMPORTANCE": 0.089, "IMPORTANCE_RANK": 5, "FEATURE_DIRECTION": "positive"},
-            {"FEATURE_NAME": "HOUR_OF_DAY", "SHAP_IMPORTANCE": 0.067, "IMPORTANCE_RANK": 6, "FEATURE_DIRECTION": "neutral"},
-            {"FEATURE_NAME": "ELEVATION_CHANGE", "SHAP_IMPORTANCE": 0.045, "IMPORTANCE_RANK": 7, "FEATURE_DIRECTION": "negative"},
-            {"FEATURE_NAME": "AMBIENT_TEMP", "SHAP_IMPORTANCE": 0.023, "IMPORTANCE_RANK": 8, "FEATURE_DIRECTION": "neutral"},
-        ]
+        return self.execute_query(sql)
     
     def get_ml_pdp_curves(self, model_name: str = "GHOST_CYCLE_DETECTOR", feature_name: str = None) -> List[Dict[str, Any]]:
         """
@@ -982,20 +1201,7 @@ class SnowflakeServiceSPCS:
         {where_feature}
         ORDER BY FEATURE_NAME, FEATURE_VALUE
         """
-        try:
-            results = self.execute_query(sql)
-            if results:
-                return results
-        except Exception as e:
-            logger.warning(f"Could not fetch PDP curves: {e}")
-        
-        # Fallback demo data
-        feature = feature_name or "ENGINE_LOAD_PCT"
-        return [
-            {"FEATURE_NAME": feature, "FEATURE_VALUE": v * 10, "PREDICTED_VALUE": 0.8 - (v * 0.07), 
-             "LOWER_BOUND": 0.75 - (v * 0.06), "UPPER_BOUND": 0.85 - (v * 0.08)}
-            for v in range(11)
-        ]
+        return self.execute_query(sql)
     
     def get_ml_calibration_curves(self, model_name: str = "GHOST_CYCLE_DETECTOR") -> List[Dict[str, Any]]:
         """
@@ -1012,26 +1218,7 @@ class SnowflakeServiceSPCS:
         WHERE MODEL_NAME = '{model_name}'
         ORDER BY PREDICTED_PROB_BIN ASC
         """
-        try:
-            results = self.execute_query(sql)
-            if results:
-                return results
-        except Exception as e:
-            logger.warning(f"Could not fetch calibration curves: {e}")
-        
-        # Fallback demo data - well-calibrated model
-        return [
-            {"PREDICTED_PROB_BIN": 0.05, "ACTUAL_FREQUENCY": 0.048, "BIN_COUNT": 1250, "CALIBRATION_ERROR": 0.002},
-            {"PREDICTED_PROB_BIN": 0.15, "ACTUAL_FREQUENCY": 0.142, "BIN_COUNT": 980, "CALIBRATION_ERROR": 0.008},
-            {"PREDICTED_PROB_BIN": 0.25, "ACTUAL_FREQUENCY": 0.238, "BIN_COUNT": 720, "CALIBRATION_ERROR": 0.012},
-            {"PREDICTED_PROB_BIN": 0.35, "ACTUAL_FREQUENCY": 0.362, "BIN_COUNT": 540, "CALIBRATION_ERROR": 0.012},
-            {"PREDICTED_PROB_BIN": 0.45, "ACTUAL_FREQUENCY": 0.441, "BIN_COUNT": 410, "CALIBRATION_ERROR": 0.009},
-            {"PREDICTED_PROB_BIN": 0.55, "ACTUAL_FREQUENCY": 0.568, "BIN_COUNT": 380, "CALIBRATION_ERROR": 0.018},
-            {"PREDICTED_PROB_BIN": 0.65, "ACTUAL_FREQUENCY": 0.632, "BIN_COUNT": 290, "CALIBRATION_ERROR": 0.018},
-            {"PREDICTED_PROB_BIN": 0.75, "ACTUAL_FREQUENCY": 0.758, "BIN_COUNT": 220, "CALIBRATION_ERROR": 0.008},
-            {"PREDICTED_PROB_BIN": 0.85, "ACTUAL_FREQUENCY": 0.871, "BIN_COUNT": 180, "CALIBRATION_ERROR": 0.021},
-            {"PREDICTED_PROB_BIN": 0.95, "ACTUAL_FREQUENCY": 0.942, "BIN_COUNT": 150, "CALIBRATION_ERROR": 0.008},
-        ]
+        return self.execute_query(sql)
     
     def get_ml_model_metrics(self, model_name: str = "GHOST_CYCLE_DETECTOR") -> List[Dict[str, Any]]:
         """Get performance metrics for a model."""
@@ -1045,21 +1232,7 @@ class SnowflakeServiceSPCS:
         WHERE MODEL_NAME = '{model_name}'
         ORDER BY METRIC_CONTEXT, METRIC_NAME
         """
-        try:
-            results = self.execute_query(sql)
-            if results:
-                return results
-        except Exception as e:
-            logger.warning(f"Could not fetch model metrics: {e}")
-        
-        # Fallback demo data
-        return [
-            {"METRIC_NAME": "accuracy", "METRIC_VALUE": 0.923, "METRIC_CONTEXT": "test", "SAMPLE_COUNT": 2500},
-            {"METRIC_NAME": "precision", "METRIC_VALUE": 0.891, "METRIC_CONTEXT": "test", "SAMPLE_COUNT": 2500},
-            {"METRIC_NAME": "recall", "METRIC_VALUE": 0.876, "METRIC_CONTEXT": "test", "SAMPLE_COUNT": 2500},
-            {"METRIC_NAME": "f1", "METRIC_VALUE": 0.883, "METRIC_CONTEXT": "test", "SAMPLE_COUNT": 2500},
-            {"METRIC_NAME": "auc_roc", "METRIC_VALUE": 0.956, "METRIC_CONTEXT": "test", "SAMPLE_COUNT": 2500},
-        ]
+        return self.execute_query(sql)
     
     # =========================================================================
     # COST MATRIX & PROFIT CURVES - Business Value from ML Predictions
@@ -1088,31 +1261,7 @@ class SnowflakeServiceSPCS:
         {where_clause}
         ORDER BY MODEL_NAME, COST_TYPE
         """
-        try:
-            results = self.execute_query(sql)
-            if results:
-                return results
-        except Exception as e:
-            logger.warning(f"Could not fetch cost assumptions: {e}")
-        
-        # Fallback demo data
-        return [
-            {"MODEL_NAME": "GHOST_CYCLE_DETECTOR", "COST_TYPE": "TRUE_POSITIVE", "COST_CATEGORY": "FUEL",
-             "UNIT_COST_USD": 3.80, "UNIT_DESCRIPTION": "per gallon", "ESTIMATED_UNITS_PER_EVENT": 6.5,
-             "COST_PER_EVENT_USD": 24.70, "SIGN_CONVENTION": "BENEFIT", 
-             "ASSUMPTION_SOURCE": "Operations Team Q1 2024",
-             "NOTES": "Avg ghost cycle burns 6.5 gal before correction. $3.80/gal diesel."},
-            {"MODEL_NAME": "GHOST_CYCLE_DETECTOR", "COST_TYPE": "FALSE_POSITIVE", "COST_CATEGORY": "LABOR",
-             "UNIT_COST_USD": 45.00, "UNIT_DESCRIPTION": "per hour", "ESTIMATED_UNITS_PER_EVENT": 0.25,
-             "COST_PER_EVENT_USD": 11.25, "SIGN_CONVENTION": "COST",
-             "ASSUMPTION_SOURCE": "HR Fully-Loaded Rate",
-             "NOTES": "Supervisor investigates for ~15 min. $45/hr fully loaded."},
-            {"MODEL_NAME": "GHOST_CYCLE_DETECTOR", "COST_TYPE": "FALSE_NEGATIVE", "COST_CATEGORY": "FUEL",
-             "UNIT_COST_USD": 3.80, "UNIT_DESCRIPTION": "per gallon", "ESTIMATED_UNITS_PER_EVENT": 19.5,
-             "COST_PER_EVENT_USD": 74.10, "SIGN_CONVENTION": "COST",
-             "ASSUMPTION_SOURCE": "Telematics Analysis",
-             "NOTES": "Undetected ghost cycles avg 3 hours before natural end. 6.5 gal/hr."},
-        ]
+        return self.execute_query(sql)
     
     def get_cost_matrix(self, model_name: str = "GHOST_CYCLE_DETECTOR", site_id: str = None, 
                         period_type: str = "MONTHLY") -> List[Dict[str, Any]]:
@@ -1147,36 +1296,7 @@ class SnowflakeServiceSPCS:
         ORDER BY PERIOD_END DESC
         LIMIT 12
         """
-        try:
-            results = self.execute_query(sql)
-            if results:
-                return results
-        except Exception as e:
-            logger.warning(f"Could not fetch cost matrix: {e}")
-        
-        # Fallback demo data
-        from datetime import datetime, timedelta
-        today = datetime.now()
-        return [
-            {
-                "MODEL_NAME": model_name,
-                "SITE_ID": site_id,
-                "PERIOD_START": (today - timedelta(days=30)).isoformat(),
-                "PERIOD_END": today.isoformat(),
-                "PERIOD_TYPE": "MONTHLY",
-                "TRUE_POSITIVE_COUNT": 142,
-                "FALSE_POSITIVE_COUNT": 18,
-                "FALSE_NEGATIVE_COUNT": 23,
-                "TRUE_NEGATIVE_COUNT": 8450,
-                "TRUE_POSITIVE_VALUE_USD": 3507.40,  # 142 * $24.70
-                "FALSE_POSITIVE_COST_USD": 202.50,   # 18 * $11.25
-                "FALSE_NEGATIVE_COST_USD": 1704.30, # 23 * $74.10
-                "NET_VALUE_USD": 1600.60,
-                "DECISION_THRESHOLD": 0.50,
-                "PRECISION_AT_THRESHOLD": 0.887,
-                "RECALL_AT_THRESHOLD": 0.861
-            }
-        ]
+        return self.execute_query(sql)
     
     def get_profit_curves(self, model_name: str = "GHOST_CYCLE_DETECTOR", site_id: str = None) -> List[Dict[str, Any]]:
         """
@@ -1203,52 +1323,7 @@ class SnowflakeServiceSPCS:
           {site_clause}
         ORDER BY PROBABILITY_THRESHOLD ASC
         """
-        try:
-            results = self.execute_query(sql)
-            if results:
-                return results
-        except Exception as e:
-            logger.warning(f"Could not fetch profit curves: {e}")
-        
-        # Fallback demo data - profit curve for ghost cycle detector
-        return [
-            {"MODEL_NAME": model_name, "SITE_ID": site_id, "PROBABILITY_THRESHOLD": 0.1,
-             "EXPECTED_TP_RATE": 0.98, "EXPECTED_FP_RATE": 0.42, "EXPECTED_PRECISION": 0.45,
-             "EXPECTED_DAILY_SAVINGS_USD": 485.0, "EXPECTED_DAILY_COSTS_USD": 472.5, "EXPECTED_DAILY_MISSED_USD": 14.8,
-             "EXPECTED_NET_DAILY_VALUE_USD": -2.3, "IS_OPTIMAL_THRESHOLD": False},
-            {"MODEL_NAME": model_name, "SITE_ID": site_id, "PROBABILITY_THRESHOLD": 0.2,
-             "EXPECTED_TP_RATE": 0.95, "EXPECTED_FP_RATE": 0.28, "EXPECTED_PRECISION": 0.58,
-             "EXPECTED_DAILY_SAVINGS_USD": 469.0, "EXPECTED_DAILY_COSTS_USD": 315.0, "EXPECTED_DAILY_MISSED_USD": 37.1,
-             "EXPECTED_NET_DAILY_VALUE_USD": 116.9, "IS_OPTIMAL_THRESHOLD": False},
-            {"MODEL_NAME": model_name, "SITE_ID": site_id, "PROBABILITY_THRESHOLD": 0.3,
-             "EXPECTED_TP_RATE": 0.92, "EXPECTED_FP_RATE": 0.18, "EXPECTED_PRECISION": 0.68,
-             "EXPECTED_DAILY_SAVINGS_USD": 454.0, "EXPECTED_DAILY_COSTS_USD": 202.5, "EXPECTED_DAILY_MISSED_USD": 59.3,
-             "EXPECTED_NET_DAILY_VALUE_USD": 192.2, "IS_OPTIMAL_THRESHOLD": False},
-            {"MODEL_NAME": model_name, "SITE_ID": site_id, "PROBABILITY_THRESHOLD": 0.4,
-             "EXPECTED_TP_RATE": 0.89, "EXPECTED_FP_RATE": 0.12, "EXPECTED_PRECISION": 0.76,
-             "EXPECTED_DAILY_SAVINGS_USD": 439.0, "EXPECTED_DAILY_COSTS_USD": 135.0, "EXPECTED_DAILY_MISSED_USD": 81.5,
-             "EXPECTED_NET_DAILY_VALUE_USD": 222.5, "IS_OPTIMAL_THRESHOLD": False},
-            {"MODEL_NAME": model_name, "SITE_ID": site_id, "PROBABILITY_THRESHOLD": 0.5,
-             "EXPECTED_TP_RATE": 0.86, "EXPECTED_FP_RATE": 0.08, "EXPECTED_PRECISION": 0.82,
-             "EXPECTED_DAILY_SAVINGS_USD": 424.0, "EXPECTED_DAILY_COSTS_USD": 90.0, "EXPECTED_DAILY_MISSED_USD": 103.7,
-             "EXPECTED_NET_DAILY_VALUE_USD": 230.3, "IS_OPTIMAL_THRESHOLD": True},  # OPTIMAL
-            {"MODEL_NAME": model_name, "SITE_ID": site_id, "PROBABILITY_THRESHOLD": 0.6,
-             "EXPECTED_TP_RATE": 0.82, "EXPECTED_FP_RATE": 0.05, "EXPECTED_PRECISION": 0.87,
-             "EXPECTED_DAILY_SAVINGS_USD": 405.0, "EXPECTED_DAILY_COSTS_USD": 56.3, "EXPECTED_DAILY_MISSED_USD": 133.4,
-             "EXPECTED_NET_DAILY_VALUE_USD": 215.3, "IS_OPTIMAL_THRESHOLD": False},
-            {"MODEL_NAME": model_name, "SITE_ID": site_id, "PROBABILITY_THRESHOLD": 0.7,
-             "EXPECTED_TP_RATE": 0.76, "EXPECTED_FP_RATE": 0.03, "EXPECTED_PRECISION": 0.91,
-             "EXPECTED_DAILY_SAVINGS_USD": 375.0, "EXPECTED_DAILY_COSTS_USD": 33.8, "EXPECTED_DAILY_MISSED_USD": 177.8,
-             "EXPECTED_NET_DAILY_VALUE_USD": 163.4, "IS_OPTIMAL_THRESHOLD": False},
-            {"MODEL_NAME": model_name, "SITE_ID": site_id, "PROBABILITY_THRESHOLD": 0.8,
-             "EXPECTED_TP_RATE": 0.68, "EXPECTED_FP_RATE": 0.01, "EXPECTED_PRECISION": 0.95,
-             "EXPECTED_DAILY_SAVINGS_USD": 336.0, "EXPECTED_DAILY_COSTS_USD": 11.3, "EXPECTED_DAILY_MISSED_USD": 237.0,
-             "EXPECTED_NET_DAILY_VALUE_USD": 87.7, "IS_OPTIMAL_THRESHOLD": False},
-            {"MODEL_NAME": model_name, "SITE_ID": site_id, "PROBABILITY_THRESHOLD": 0.9,
-             "EXPECTED_TP_RATE": 0.55, "EXPECTED_FP_RATE": 0.005, "EXPECTED_PRECISION": 0.98,
-             "EXPECTED_DAILY_SAVINGS_USD": 272.0, "EXPECTED_DAILY_COSTS_USD": 5.6, "EXPECTED_DAILY_MISSED_USD": 333.5,
-             "EXPECTED_NET_DAILY_VALUE_USD": -67.1, "IS_OPTIMAL_THRESHOLD": False},
-        ]
+        return self.execute_query(sql)
     
     def get_site_cost_summary(self, model_name: str = None) -> List[Dict[str, Any]]:
         """Get cost rollup by site."""
@@ -1273,13 +1348,7 @@ class SnowflakeServiceSPCS:
         {where_clause}
         ORDER BY NET_VALUE_USD DESC
         """
-        try:
-            results = self.execute_query(sql)
-            if results:
-                return results
-        except Exception as e:
-            logger.warning(f"Could not fetch site cost summary: {e}")
-        return []
+        return self.execute_query(sql)
     
     def get_portfolio_cost_summary(self, model_name: str = None) -> Dict[str, Any]:
         """Get portfolio-level cost rollup."""
@@ -1300,26 +1369,8 @@ class SnowflakeServiceSPCS:
         FROM {self.database}.ML.V_PORTFOLIO_COST_SUMMARY
         {where_clause}
         """
-        try:
-            results = self.execute_query(sql)
-            if results:
-                return results[0]
-        except Exception as e:
-            logger.warning(f"Could not fetch portfolio summary: {e}")
-        
-        # Fallback
-        return {
-            "MODEL_NAME": model_name or "GHOST_CYCLE_DETECTOR",
-            "PORTFOLIO_SAVINGS_USD": 42084.80,
-            "PORTFOLIO_FP_COSTS_USD": 2430.00,
-            "PORTFOLIO_FN_COSTS_USD": 20449.60,
-            "PORTFOLIO_NET_VALUE_USD": 19205.20,
-            "PROJECTED_ANNUAL_VALUE_USD": 230462.40,
-            "PORTFOLIO_DETECTION_RATE": 0.861,
-            "TOTAL_TRUE_POSITIVES": 1704,
-            "TOTAL_FALSE_POSITIVES": 216,
-            "TOTAL_FALSE_NEGATIVES": 276
-        }
+        results = self.execute_query(sql)
+        return results[0] if results else {}
     
     def get_optimal_thresholds(self, model_name: str = None) -> List[Dict[str, Any]]:
         """Get optimal decision thresholds by site/model."""
@@ -1338,13 +1389,7 @@ class SnowflakeServiceSPCS:
         FROM {self.database}.ML.V_OPTIMAL_THRESHOLDS
         {where_clause}
         """
-        try:
-            results = self.execute_query(sql)
-            if results:
-                return results
-        except Exception as e:
-            logger.warning(f"Could not fetch optimal thresholds: {e}")
-        return []
+        return self.execute_query(sql)
     
     def close(self):
         """Close the connection"""
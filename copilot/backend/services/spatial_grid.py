@@ -0,0 +1,241 @@
+"""
+Hierarchical spatial grid for TERRA
+
+Breadcrumbs are bucketed into geohash cells held as integers rather than
+strings: a cell at precision p is the 5p-bit interleaving of the quantized
+longitude and latitude, so the parent of a cell is a right shift and zone
+aggregation at any resolution is an integer group-by. GPS_BREADCRUMBS
+stores the cell at STORED_PRECISION (GRID_CELL); zones default to
+ZONE_PRECISION, roughly the ~100 m grid the ROUND(lat, 3) zones gave.
+
+Approximate cell sizes (width x height at the equator):
+
+    precision 6   1.2 km x 610 m
+    precision 7   153 m  x 153 m
+    precision 8    38 m  x  19 m
+    precision 10  1.2 m  x 0.6 m
+
+Everything is vectorized with NumPy so whole shifts of breadcrumbs are
+encoded, decoded and aggregated per call.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAX_PRECISION = 12
+
+# Precision of the GRID_CELL column stored alongside breadcrumbs
+STORED_PRECISION = 10
+
+# Default zone size for traffic and choke point aggregation
+ZONE_PRECISION = 7
+
+_BASE32 = np.array(list("0123456789bcdefghjkmnpqrstuvwxyz"))
+_BASE32_INDEX = {c: i for i, c in enumerate(_BASE32)}
+
+_U64 = np.uint64
+
+
+def _bits(precision: int) -> Tuple[int, int]:
+    """(longitude bits, latitude bits) of a precision; longitude gets the odd bit."""
+    if not 1 <= precision <= MAX_PRECISION:
+        raise ValueError(f"precision must be between 1 and {MAX_PRECISION}")
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+
+def _spread(v: np.ndarray) -> np.ndarray:
+    """Insert a zero bit between each of the low 32 bits."""
+    v = v & _U64(0xFFFFFFFF)
+    v = (v | (v << _U64(16))) & _U64(0x0000FFFF0000FFFF)
+    v = (v | (v << _U64(8))) & _U64(0x00FF00FF00FF00FF)
+    v = (v | (v << _U64(4))) & _U64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << _U64(2))) & _U64(0x3333333333333333)
+    v = (v | (v << _U64(1))) & _U64(0x5555555555555555)
+    return v
+
+
+def _compact(v: np.ndarray) -> np.ndarray:
+    """Inverse of _spread: gather every other bit."""
+    v = v & _U64(0x5555555555555555)
+    v = (v | (v >> _U64(1))) & _U64(0x3333333333333333)
+    v = (v | (v >> _U64(2))) & _U64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v >> _U64(4))) & _U64(0x00FF00FF00FF00FF)
+    v = (v | (v >> _U64(8))) & _U64(0x0000FFFF0000FFFF)
+    v = (v | (v >> _U64(16))) & _U64(0x00000000FFFFFFFF)
+    return v
+
+
+def _interleave(lng_idx: np.ndarray, lat_idx: np.ndarray, precision: int) -> np.ndarray:
+    # Geohash bits alternate lng, lat, lng, ... from the most significant bit,
+    # so the least significant bit is longitude when the bit count is odd
+    if (5 * precision) % 2:
+        code = _spread(lng_idx) | (_spread(lat_idx) << _U64(1))
+    else:
+        code = (_spread(lng_idx) << _U64(1)) | _spread(lat_idx)
+    return code.astype(np.int64)
+
+
+def _deinterleave(cells: np.ndarray, precision: int) -> Tuple[np.ndarray, np.ndarray]:
+    code = np.asarray(cells, dtype=np.int64).astype(np.uint64)
+    if (5 * precision) % 2:
+        return _compact(code), _compact(code >> _U64(1))
+    return _compact(code >> _U64(1)), _compact(code)
+
+
+def _grid_index(lat: np.ndarray, lng: np.ndarray, precision: int) -> Tuple[np.ndarray, np.ndarray]:
+    lng_bits, lat_bits = _bits(precision)
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    lng_idx = np.floor((lng + 180.0) / 360.0 * 2.0 ** lng_bits)
+    lat_idx = np.floor((lat + 90.0) / 180.0 * 2.0 ** lat_bits)
+    lng_idx = np.clip(lng_idx, 0, 2 ** lng_bits - 1).astype(np.uint64)
+    lat_idx = np.clip(lat_idx, 0, 2 ** lat_bits - 1).astype(np.uint64)
+    return lng_idx, lat_idx
+
+
+def encode(lat: Sequence[float], lng: Sequence[float], precision: int = STORED_PRECISION) -> np.ndarray:
+    """Integer geohash cell of each point."""
+    lng_idx, lat_idx = _grid_index(lat, lng, precision)
+    return _interleave(lng_idx, lat_idx, precision)
+
+
+def parent(cells: Sequence[int], precision: int, to_precision: int) -> np.ndarray:
+    """Cells at a coarser precision (a right shift of 5 bits per level)."""
+    if to_precision > precision:
+        raise ValueError("to_precision must not be finer than precision")
+    _bits(to_precision)
+    return np.asarray(cells, dtype=np.int64) >> (5 * (precision - to_precision))
+
+
+def cell_size_deg(precision: int) -> Tuple[float, float]:
+    """(height, width) of a cell in degrees."""
+    lng_bits, lat_bits = _bits(precision)
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def decode(cells: Sequence[int], precision: int = STORED_PRECISION) -> Tuple[np.ndarray, np.ndarray]:
+    """Centre (lat, lng) of each cell."""
+    lng_idx, lat_idx = _deinterleave(cells, precision)
+    height, width = cell_size_deg(precision)
+    lat = (lat_idx.astype(np.float64) + 0.5) * height - 90.0
+    lng = (lng_idx.astype(np.float64) + 0.5) * width - 180.0
+    return lat, lng
+
+
+def to_geohash(cells: Sequence[int], precision: int = STORED_PRECISION) -> np.ndarray:
+    """Geohash strings of integer cells."""
+    cells = np.asarray(cells, dtype=np.int64)
+    _bits(precision)
+    shifts = np.arange(5 * (precision - 1), -1, -5, dtype=np.int64)
+    digits = (cells[:, None] >> shifts) & 31
+    return np.ascontiguousarray(_BASE32[digits]).view(f"<U{precision}").ravel()
+
+
+def from_geohash(geohash: str) -> Tuple[int, int]:
+    """(integer cell, precision) of a geohash string."""
+    geohash = geohash.strip().lower()
+    _bits(len(geohash))
+    cell = 0
+    for char in geohash:
+        if char not in _BASE32_INDEX:
+            raise ValueError(f"Invalid geohash character '{char}'")
+        cell = (cell << 5) | _BASE32_INDEX[char]
+    return cell, len(geohash)
+
+
+def cells_in_bbox(south: float, west: float, north: float, east: float, precision: int) -> np.ndarray:
+    """All cells intersecting a bounding box (not wrapping the antimeridian)."""
+    lng_idx, lat_idx = _grid_index([south, north], [west, east], precision)
+    lat_range = np.arange(lat_idx[0], lat_idx[1] + _U64(1), dtype=np.uint64)
+    lng_range = np.arange(lng_idx[0], lng_idx[1] + _U64(1), dtype=np.uint64)
+    lat_grid, lng_grid = np.meshgrid(lat_range, lng_range, indexing="ij")
+    return _interleave(lng_grid.ravel(), lat_grid.ravel(), precision)
+
+
+def k_ring(cells: Sequence[int], precision: int, k: int = 1) -> np.ndarray:
+    """
+    Cells within k steps of each cell (a (2k+1)² square, including the cell).
+
+    Returns:
+        (n, (2k+1)²) array; neighbours past a pole are -1
+    """
+    lng_bits, lat_bits = _bits(precision)
+    lng_idx, lat_idx = _deinterleave(cells, precision)
+    offsets = np.arange(-k, k + 1, dtype=np.int64)
+    d_lat, d_lng = (a.ravel() for a in np.meshgrid(offsets, offsets, indexing="ij"))
+
+    lat_n = lat_idx.astype(np.int64)[:, None] + d_lat
+    # Longitude wraps around the antimeridian, latitude stops at the poles
+    lng_n = (lng_idx.astype(np.int64)[:, None] + d_lng) % (2 ** lng_bits)
+    valid = (lat_n >= 0) & (lat_n < 2 ** lat_bits)
+    ring = _interleave(
+        lng_n.astype(np.uint64), np.clip(lat_n, 0, 2 ** lat_bits - 1).astype(np.uint64), precision
+    )
+    return np.where(valid, ring, -1)
+
+
+def zone_traffic(
+    cells: Sequence[int],
+    equipment_ids: Sequence[Any],
+    speed: Sequence[float],
+    precision: int = STORED_PRECISION,
+    zone_precision: int = ZONE_PRECISION,
+    min_equipment: int = 1,
+) -> List[Dict[str, Any]]:
+    """
+    Aggregate breadcrumbs by zone cell, in the shape of the zone traffic endpoint.
+
+    Args:
+        cells: Breadcrumb cells at `precision`
+        equipment_ids: Equipment of each breadcrumb
+        speed: Speed of each breadcrumb in mph
+        zone_precision: Precision to aggregate at
+        min_equipment: Only return zones with at least this many distinct equipment
+
+    Returns:
+        Zones sorted by equipment count, busiest first
+    """
+    zones = parent(cells, precision, zone_precision)
+    if len(zones) == 0:
+        return []
+    speed = np.asarray(speed, dtype=np.float64)
+    zone_ids, zone_of = np.unique(zones, return_inverse=True)
+    _, equipment_code = np.unique(np.asarray(equipment_ids), return_inverse=True)
+
+    readings = np.bincount(zone_of, minlength=len(zone_ids))
+    speed_sum = np.bincount(zone_of, weights=np.nan_to_num(speed), minlength=len(zone_ids))
+    speed_n = np.bincount(zone_of, weights=np.isfinite(speed), minlength=len(zone_ids))
+    pairs = np.unique(zone_of.astype(np.int64) * (equipment_code.max() + 1) + equipment_code)
+    equipment = np.bincount(pairs // (equipment_code.max() + 1), minlength=len(zone_ids))
+
+    lat, lng = decode(zone_ids, zone_precision)
+    names = to_geohash(zone_ids, zone_precision)
+    keep = np.flatnonzero(equipment >= min_equipment)
+    keep = keep[np.argsort(-equipment[keep], kind="stable")]
+    avg_speed = np.divide(speed_sum, speed_n, out=np.full(len(zone_ids), np.nan), where=speed_n > 0)
+    return [
+        {
+            "ZONE_ID": str(names[i]),
+            "ZONE_CELL": int(zone_ids[i]),
+            "ZONE_LAT": round(float(lat[i]), 6),
+            "ZONE_LNG": round(float(lng[i]), 6),
+            "EQUIPMENT_COUNT": int(equipment[i]),
+            "AVG_SPEED": None if np.isnan(avg_speed[i]) else round(float(avg_speed[i]), 1),
+            "READING_COUNT": int(readings[i]),
+        }
+        for i in keep
+    ]
+
+
+def zone_centers(zone_cells: Sequence[Optional[int]], precision: int = ZONE_PRECISION) -> List[Dict[str, Any]]:
+    """ZONE_ID / ZONE_LAT / ZONE_LNG for zone cells returned by the warehouse."""
+    cells = np.array([c if c is not None else -1 for c in zone_cells], dtype=np.int64)
+    lat, lng = decode(np.maximum(cells, 0), precision)
+    names = to_geohash(np.maximum(cells, 0), precision)
+    return [
+        {"ZONE_ID": str(n), "ZONE_LAT": round(float(la), 6), "ZONE_LNG": round(float(ln), 6)}
+        if c >= 0 else {"ZONE_ID": None, "ZONE_LAT": None, "ZONE_LNG": None}
+        for c, n, la, ln in zip(cells, names, lat, lng)
+    ]
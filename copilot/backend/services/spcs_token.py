@@ -0,0 +1,103 @@
+"""
+SPCS OAuth token provider for TERRA
+
+SPCS mounts a short-lived OAuth token at /snowflake/session/token and
+rotates it in place. The token is cached in memory and the file is only
+re-read when its inode, mtime or size changes, so callers can ask for the
+token on every request without touching the filesystem each time.
+A version counter is bumped on every rotation so connection holders can
+tell when to rebuild.
+"""
+
+import os
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SPCS_TOKEN_PATH = "/snowflake/session/token"
+
+
+class SPCSTokenProvider:
+    """Cached reader for the SPCS session token with rotation detection"""
+
+    def __init__(self, path: str = SPCS_TOKEN_PATH, check_interval: float = 1.0):
+        self.path = path
+        # Minimum seconds between stat() calls on the token file
+        self.check_interval = check_interval
+        self.version = 0
+        self._lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._file_key = None
+        self._checked_at = 0.0
+        self._loaded_at = 0.0
+
+    def available(self) -> bool:
+        """True if a token file exists or a token has already been loaded."""
+        return self.get_token() is not None
+
+    def get_token(self) -> Optional[str]:
+        """Return the current token, re-reading the file only after rotation."""
+        now = time.monotonic()
+        with self._lock:
+            if self._token is None or now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                self._reload_if_changed(now)
+            return self._token
+
+    @property
+    def token_age(self) -> float:
+        """Seconds since the cached token was read from disk."""
+        if self._token is None:
+            return 0.0
+        return time.monotonic() - self._loaded_at
+
+    def metrics(self) -> Dict[str, Any]:
+        """Token presence, rotations seen and age, for /api/metrics (never the token)."""
+        available = self.available()
+        return {
+            "available": available,
+            "version": self.version,
+            "token_age_seconds": round(self.token_age, 1) if available else None,
+        }
+
+    def _reload_if_changed(self, now: float):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+
+        # Rotation via atomic rename or symlink swap changes the inode;
+        # in-place rewrites change mtime and usually size.
+        file_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_key == self._file_key and self._token is not None:
+            return
+
+        try:
+            with open(self.path, "r") as f:
+                token = f.read().strip()
+        except OSError as e:
+            logger.warning(f"Could not read SPCS token: {e}")
+            return
+
+        self._file_key = file_key
+        if token and token != self._token:
+            if self._token is not None:
+                logger.info("SPCS token rotated")
+            self._token = token
+            self._loaded_at = now
+            self.version += 1
+
+
+# Singleton instance
+_token_provider: Optional[SPCSTokenProvider] = None
+
+
+def get_spcs_token_provider() -> SPCSTokenProvider:
+    """Get or create the SPCS token provider singleton"""
+    global _token_provider
+    if _token_provider is None:
+        _token_provider = SPCSTokenProvider()
+    return _token_provider
@@ -0,0 +1,135 @@
+"""
+Incremental Server-Sent Events decoder for TERRA
+
+Decodes a text/event-stream byte stream as it arrives from the network.
+Follows the WHATWG event-stream rules:
+- Lines end with CRLF, LF or CR (a CRLF split across chunks is handled)
+- Multiple "data:" lines are joined with newlines
+- "event:", "id:" and "retry:" fields are tracked, ":" lines are comments
+- A blank line dispatches the pending event
+
+Each byte is scanned once, so the cost of decoding a response is linear
+in its size no matter how the transport chunks it.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class SSEEvent:
+    """A single dispatched SSE event"""
+    event: str
+    data: str
+    id: Optional[str] = None
+    retry: Optional[int] = None
+
+
+class SSEDecoder:
+    """
+    Byte-level incremental SSE decoder.
+
+    Usage:
+        decoder = SSEDecoder()
+        async for chunk in response.aiter_bytes():
+            for event in decoder.feed(chunk):
+                ...
+        for event in decoder.flush():
+            ...
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._skip_lf = False
+        self._event_type = ""
+        self._data: List[str] = []
+        self.last_event_id: Optional[str] = None
+        self.retry: Optional[int] = None
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """Feed raw bytes and return any events completed by them."""
+        if self._skip_lf:
+            # Second half of a CRLF that was split across chunks
+            self._skip_lf = False
+            if chunk[:1] == b"\n":
+                chunk = chunk[1:]
+        if not chunk:
+            return []
+
+        # Only the new bytes are searched for a line terminator; the
+        # buffered tail is already known to contain none.
+        last = max(chunk.rfind(b"\n"), chunk.rfind(b"\r"))
+        if last < 0:
+            self._buffer += chunk
+            return []
+
+        if self._buffer:
+            self._buffer += chunk[:last + 1]
+            complete = bytes(self._buffer)
+            self._buffer = bytearray(chunk[last + 1:])
+        else:
+            complete = chunk[:last + 1]
+            self._buffer += chunk[last + 1:]
+        self._skip_lf = complete[-1:] == b"\r"
+
+        events: List[SSEEvent] = []
+        for raw in complete.splitlines():
+            event = self._process_line(raw)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def flush(self) -> List[SSEEvent]:
+        """Process any unterminated line and dispatch the pending event at EOF."""
+        events: List[SSEEvent] = []
+        if self._buffer:
+            event = self._process_line(bytes(self._buffer))
+            if event is not None:
+                events.append(event)
+            self._buffer.clear()
+        event = self._dispatch()
+        if event is not None:
+            events.append(event)
+        self._skip_lf = False
+        return events
+
+    def _process_line(self, raw: bytes) -> Optional[SSEEvent]:
+        """Apply a single line to the pending event, dispatching on a blank line."""
+        if not raw:
+            return self._dispatch()
+
+        line = raw.decode("utf-8", errors="replace")
+        if line[0] == ":":
+            return None
+
+        field, sep, value = line.partition(":")
+        if sep and value[:1] == " ":
+            value = value[1:]
+
+        if field == "data":
+            self._data.append(value)
+        elif field == "event":
+            self._event_type = value
+        elif field == "id":
+            if "\x00" not in value:
+                self.last_event_id = value
+        elif field == "retry":
+            if value.isdigit():
+                self.retry = int(value)
+        return None
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        """Build the pending event and reset per-event state."""
+        if not self._data:
+            self._event_type = ""
+            return None
+
+        event = SSEEvent(
+            event=self._event_type or "message",
+            data="\n".join(self._data),
+            id=self.last_event_id,
+            retry=self.retry,
+        )
+        self._event_type = ""
+        self._data = []
+        return event
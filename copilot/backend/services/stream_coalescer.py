@@ -0,0 +1,145 @@
+"""
+Text delta coalescing for TERRA chat streaming
+
+The Cortex Agent emits one event per generated token. Forwarding each as
+its own SSE frame costs a JSON encode and a socket write per token, so
+consecutive "text" events are merged into a single frame once either a
+size limit or a short time window is reached. The first text delta is
+always forwarded immediately so time-to-first-token is not delayed.
+Non-text events flush pending text first to preserve ordering.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+
+@dataclass
+class StreamStats:
+    """End-to-end timing for one streamed chat response"""
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    text_events: int = 0
+    frames: int = 0
+    chars: int = 0
+
+    @property
+    def time_to_first_token_ms(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return (self.first_token_at - self.started_at) * 1000
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        elapsed = self.finished_at - self.first_token_at
+        return self.text_events / elapsed if elapsed > 0 else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        ttft = self.time_to_first_token_ms
+        tps = self.tokens_per_second
+        return {
+            "ttft_ms": round(ttft, 1) if ttft is not None else None,
+            "tokens_per_sec": round(tps, 1) if tps is not None else None,
+            "text_events": self.text_events,
+            "frames": self.frames,
+            "chars": self.chars,
+        }
+
+
+async def coalesce_text_events(
+    events: AsyncIterator[Dict[str, Any]],
+    max_chars: int = 256,
+    max_delay: float = 0.03,
+    stats: Optional[StreamStats] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Merge consecutive text events from an agent stream.
+
+    Args:
+        events: Async iterator of stream event dicts
+        max_chars: Flush pending text once it reaches this many characters
+        max_delay: Flush pending text at most this many seconds after it started
+        stats: Optional StreamStats updated as events are forwarded
+
+    Yields:
+        Event dicts, with runs of text deltas combined into one event
+    """
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    pending: List[str] = []
+    pending_chars = 0
+    deadline = 0.0
+    first_text_sent = False
+    next_event: Optional[asyncio.Future] = None
+
+    def take_pending() -> Dict[str, Any]:
+        nonlocal pending, pending_chars
+        event = {"type": "text", "content": "".join(pending)}
+        pending = []
+        pending_chars = 0
+        if stats:
+            stats.frames += 1
+        return event
+
+    try:
+        while True:
+            if next_event is None:
+                next_event = asyncio.ensure_future(iterator.__anext__())
+
+            if pending:
+                timeout = max(0.0, deadline - loop.time())
+                done, _ = await asyncio.wait({next_event}, timeout=timeout)
+                if not done:
+                    # Window elapsed while the agent was still generating
+                    yield take_pending()
+                    continue
+
+            try:
+                event = await next_event
+            except StopAsyncIteration:
+                break
+            finally:
+                next_event = None
+
+            if event.get("type") == "text":
+                content = event.get("content", "")
+                if stats:
+                    stats.text_events += 1
+                    stats.chars += len(content)
+                if not first_text_sent:
+                    first_text_sent = True
+                    if stats:
+                        stats.first_token_at = time.perf_counter()
+                        stats.frames += 1
+                    yield event
+                    continue
+                if not pending:
+                    deadline = loop.time() + max_delay
+                pending.append(content)
+                pending_chars += len(content)
+                if pending_chars >= max_chars:
+                    yield take_pending()
+                continue
+
+            if pending:
+                yield take_pending()
+            if stats:
+                stats.frames += 1
+            yield event
+
+        if pending:
+            yield take_pending()
+    finally:
+        if next_event is not None and not next_event.done():
+            next_event.cancel()
+            # Let the cancellation land so the caller can aclose() the source
+            try:
+                await next_event
+            except (asyncio.CancelledError, StopAsyncIteration):
+                pass
+        if stats:
+            stats.finished_at = time.perf_counter()
@@ -0,0 +1,139 @@
+"""
+Stale-while-revalidate cache for TERRA dashboard endpoints
+
+Dashboard reads go through this cache so a slow or failing warehouse does
+not show up as latency or fake data:
+- fresh entry   -> served as-is
+- stale entry   -> served immediately, refreshed once in the background
+- no entry      -> loaded inline; errors propagate to the caller
+A failed background refresh keeps the previous value, so the last good
+result is served (with its age) until the warehouse recovers.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    stored_at: float
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+
+class StaleWhileRevalidateCache:
+    """Bounded LRU cache with stale-while-revalidate reads"""
+
+    def __init__(self, max_entries: int = 512, default_fresh_for: float = 30.0):
+        self.max_entries = max_entries
+        self.default_fresh_for = default_fresh_for
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Future] = {}
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "refresh_errors": 0}
+
+    async def get(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        fresh_for: Optional[float] = None,
+    ) -> Tuple[Any, float, str]:
+        """
+        Get a value, loading or revalidating as needed.
+
+        Args:
+            key: Cache key (endpoint + parameters)
+            loader: Blocking function producing the value; run in a worker thread
+            fresh_for: Seconds a value is served without revalidation
+
+        Returns:
+            (value, age_seconds, status) where status is HIT, STALE or MISS
+        """
+        fresh_for = self.default_fresh_for if fresh_for is None else fresh_for
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = entry.age
+            if age <= fresh_for:
+                self.stats["hits"] += 1
+                return entry.value, age, HIT
+            self.stats["stale"] += 1
+            self._schedule_refresh(key, loader)
+            return entry.value, age, STALE
+
+        self.stats["misses"] += 1
+        # Share one in-flight load between concurrent misses
+        pending = self._refreshing.get(key)
+        if pending is None:
+            pending = self._schedule_refresh(key, loader)
+        value = await asyncio.shield(pending)
+        return value, 0.0, MISS
+
+    def _schedule_refresh(self, key: str, loader: Callable[[], Any]) -> asyncio.Future:
+        pending = self._refreshing.get(key)
+        if pending is not None:
+            return pending
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(None, loader)
+        self._refreshing[key] = future
+
+        def _done(fut: asyncio.Future):
+            self._refreshing.pop(key, None)
+            if fut.cancelled():
+                return
+            error = fut.exception()
+            if error is not None:
+                self.stats["refresh_errors"] += 1
+                if key in self._entries:
+                    logger.warning(f"Background refresh failed for {key}, keeping last good value: {error}")
+                return
+            self._store(key, fut.result())
+
+        future.add_done_callback(_done)
+        return future
+
+    def _store(self, key: str, value: Any):
+        self._entries[key] = CacheEntry(value=value, stored_at=time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one key, or everything"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "refreshing": len(self._refreshing),
+        }
+
+
+# Singleton instance
+_dashboard_cache: Optional[StaleWhileRevalidateCache] = None
+
+
+def get_dashboard_cache() -> StaleWhileRevalidateCache:
+    """Get or create the dashboard SWR cache singleton"""
+    global _dashboard_cache
+    if _dashboard_cache is None:
+        _dashboard_cache = StaleWhileRevalidateCache()
+    return _dashboard_cache
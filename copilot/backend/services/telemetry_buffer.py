@@ -0,0 +1,373 @@
+"""
+Telemetry ring buffer for TERRA
+
+Keeps the last few minutes of telemetry of every piece of equipment in
+memory, so realtime features (rolling averages, standard deviations and
+deltas, as in notebook 01) are computed in the backend instead of by
+re-querying the warehouse.
+
+Storage is columnar and preallocated: one (max_equipment, capacity) NumPy
+array per field, where each equipment owns a row used as a ring. Memory is
+fixed by the two sizes - 40 bytes per sample slot, about 24 MB for 5,000
+assets x 120 samples - whatever the fleet does. Appending a reading writes
+one slot and advances the row's head (O(1)); a batch is written with a few
+fancy-indexed assignments. When all rows are taken, the equipment heard
+from least recently gives up its row.
+
+A row's samples are in time order, so the start of a trailing window is
+found by a binary search back from the head (O(log capacity)), and only
+the samples inside it are gathered. features() computes the rolling
+statistics for the whole fleet at once on an (equipment x window) gather,
+as deep as the fullest window (or the delta lag, if longer).
+"""
+
+import os
+import threading
+import warnings
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Samples kept per equipment: 10 minutes of 5-second telemetry
+BUFFER_SAMPLES = int(os.environ.get("TERRA_TELEMETRY_BUFFER_SAMPLES", "120"))
+
+# Rows preallocated for equipment
+MAX_EQUIPMENT = int(os.environ.get("TERRA_TELEMETRY_BUFFER_EQUIPMENT", "5000"))
+
+# Notebook 01: 5-minute rolling window, deltas over 6 readings
+ROLLING_WINDOW_SECONDS = 300.0
+DELTA_LAG = 6
+
+# Stored fields and their dtypes; positions and time need float64
+FIELDS = {
+    "timestamp": np.float64,        # epoch seconds of the recorded time
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "speed_mph": np.float32,
+    "engine_load_pct": np.float32,
+    "fuel_rate_gph": np.float32,
+    "payload_tons": np.float32,
+}
+
+# Fields with rolling statistics
+STAT_FIELDS = ("speed_mph", "engine_load_pct", "fuel_rate_gph", "payload_tons")
+
+# Event keys of each field (first present wins)
+EVENT_KEYS = {
+    "latitude": ("latitude",),
+    "longitude": ("longitude",),
+    "speed_mph": ("speed_mph",),
+    "engine_load_pct": ("engine_load_percent", "engine_load_pct"),
+    "fuel_rate_gph": ("fuel_rate_gph",),
+    "payload_tons": ("payload_tons",),
+}
+
+
+def epoch_seconds(timestamps: Iterable[Any]) -> np.ndarray:
+    """Epoch seconds of ISO timestamps (naive ones taken as UTC); NaN where unparseable."""
+    parsed = pd.to_datetime(pd.Series(list(timestamps), dtype=object), errors="coerce", utc=True, format="mixed")
+    ns = parsed.dt.tz_localize(None).to_numpy(dtype="datetime64[ns]")
+    seconds = ns.astype(np.int64) / 1e9
+    seconds[np.isnat(ns)] = np.nan
+    return seconds
+
+
+class TelemetryRingBuffer:
+    """Fixed-capacity per-equipment telemetry history in columnar NumPy arrays"""
+
+    def __init__(self, capacity: int = BUFFER_SAMPLES, max_equipment: int = MAX_EQUIPMENT):
+        self.capacity = capacity
+        self.max_equipment = max_equipment
+        self._data = {
+            name: np.full((max_equipment, capacity), np.nan, dtype=dtype) for name, dtype in FIELDS.items()
+        }
+        # Next slot to write and samples held, per row
+        self._head = np.zeros(max_equipment, dtype=np.int64)
+        self._count = np.zeros(max_equipment, dtype=np.int64)
+        self._row_of: Dict[str, int] = {}
+        self._equipment: List[Optional[str]] = [None] * max_equipment
+        self._free = list(range(max_equipment - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.appended = 0
+        self.dropped = 0
+        self.evicted = 0
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(a.nbytes for a in self._data.values()) + self._head.nbytes + self._count.nbytes
+
+    def _row(self, equipment_id: str, reserved: Optional[np.ndarray] = None) -> int:
+        """
+        The equipment's row, taking a free one or the least recently updated
+        one not reserved (in use by the current batch); -1 if none is left.
+        """
+        row = self._row_of.get(equipment_id)
+        if row is not None:
+            return row
+        if self._free:
+            row = self._free.pop()
+        else:
+            latest = self._latest(np.arange(self.max_equipment))
+            if reserved is not None:
+                latest[reserved] = np.inf
+            row = int(np.argmin(latest))
+            if latest[row] == np.inf:
+                return -1
+            del self._row_of[self._equipment[row]]
+            self._count[row] = self._head[row] = 0
+            self.evicted += 1
+        self._row_of[equipment_id] = row
+        self._equipment[row] = equipment_id
+        return row
+
+    def _latest(self, rows: np.ndarray) -> np.ndarray:
+        """Timestamp of each row's newest sample; -inf for empty rows."""
+        latest = self._data["timestamp"][rows, (self._head[rows] - 1) % self.capacity]
+        return np.where(self._count[rows] > 0, latest, -np.inf)
+
+    def append(self, equipment_id: str, timestamp: float, **values: float):
+        """Append one reading (timestamp in epoch seconds); one not newer than the newest is dropped."""
+        with self._lock:
+            if not np.isfinite(timestamp):
+                self.dropped += 1
+                return
+            row = self._row(equipment_id)
+            if not timestamp > self._latest(np.array([row]))[0]:
+                self.dropped += 1
+                return
+            slot = self._head[row]
+            self._data["timestamp"][row, slot] = timestamp
+            for name in FIELDS:
+                if name != "timestamp":
+                    self._data[name][row, slot] = values.get(name, np.nan)
+            self._head[row] = (slot + 1) % self.capacity
+            self._count[row] = min(self._count[row] + 1, self.capacity)
+            self.appended += 1
+
+    def extend(self, equipment_ids: Sequence[str], timestamps: Sequence[float],
+               columns: Dict[str, Sequence[float]]) -> int:
+        """
+        Append a batch of readings of many equipment; returns how many were kept.
+
+        Readings not newer than their equipment's newest sample (late or
+        repeated), repeats of a time within the batch (the first is kept), or
+        without a time, are dropped.
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(timestamps) == 0:
+            return 0
+        with self._lock:
+            # Readings without a time never take (or evict for) a row
+            reserved = np.zeros(self.max_equipment, dtype=bool)
+            rows = np.full(len(timestamps), -1, dtype=np.int64)
+            for i in np.flatnonzero(np.isfinite(timestamps)):
+                row = self._row(equipment_ids[i], reserved)
+                if row >= 0:
+                    rows[i] = row
+                    reserved[row] = True
+            keep = rows >= 0
+            keep[keep] = timestamps[keep] > self._latest(rows[keep])
+            order = np.flatnonzero(keep)
+            order = order[np.lexsort((timestamps[order], rows[order]))]
+            rows_k, ts_k = rows[order], timestamps[order]
+            # Same equipment and time twice in the batch: the sort is stable, keep the first
+            repeat = np.r_[False, (rows_k[1:] == rows_k[:-1]) & (ts_k[1:] == ts_k[:-1])]
+            order, rows_k, ts_k = order[~repeat], rows_k[~repeat], ts_k[~repeat]
+            # Rank of each reading within its equipment, to lay them out after the head
+            starts = np.r_[True, rows_k[1:] != rows_k[:-1]]
+            first = np.flatnonzero(starts)
+            group_len = np.diff(np.append(first, len(rows_k)))
+            rank = np.arange(len(rows_k)) - np.repeat(first, group_len)
+            n_in_group = np.repeat(group_len, group_len)
+            # More readings than slots: only the newest capacity survive
+            fits = rank >= n_in_group - self.capacity
+            rows_k, ts_k, rank, order = rows_k[fits], ts_k[fits], rank[fits], order[fits]
+            slot = (self._head[rows_k] + rank - np.maximum(n_in_group[fits] - self.capacity, 0)) % self.capacity
+
+            self._data["timestamp"][rows_k, slot] = ts_k
+            for name, values in columns.items():
+                self._data[name][rows_k, slot] = np.asarray(values, dtype=np.float64)[order]
+            for name in FIELDS:
+                if name != "timestamp" and name not in columns:
+                    self._data[name][rows_k, slot] = np.nan
+
+            added = np.bincount(rows_k, minlength=self.max_equipment)
+            touched = np.flatnonzero(added)
+            self._head[touched] = (self._head[touched] + added[touched]) % self.capacity
+            self._count[touched] = np.minimum(self._count[touched] + added[touched], self.capacity)
+            self.appended += len(rows_k)
+            self.dropped += len(timestamps) - len(rows_k)
+            return len(rows_k)
+
+    def ingest(self, events: List[Dict[str, Any]]) -> int:
+        """Append live telemetry events; returns how many were kept."""
+        events = [e for e in events if e.get("equipment_id")]
+        if not events:
+            return 0
+        columns = {}
+        for name, keys in EVENT_KEYS.items():
+            columns[name] = np.array(
+                [next((e[k] for k in keys if e.get(k) is not None), None) for e in events], dtype=np.float64
+            )
+        # Replayed events carry the recorded time
+        timestamps = epoch_seconds(e.get("source_timestamp") or e.get("timestamp") for e in events)
+        return self.extend([str(e["equipment_id"]) for e in events], timestamps, columns)
+
+    def _gather(self, rows: np.ndarray, samples: int) -> Dict[str, np.ndarray]:
+        """(rows x samples) of the newest samples, oldest first; NaN beyond each row's count."""
+        samples = min(samples, self.capacity)
+        back = np.arange(samples - 1, -1, -1)
+        slots = (self._head[rows, None] - 1 - back) % self.capacity
+        valid = back < self._count[rows, None]
+        return {
+            name: np.where(valid, self._data[name][rows[:, None], slots].astype(np.float64), np.nan)
+            for name in FIELDS
+        }
+
+    def _within(self, rows: np.ndarray, seconds: float) -> np.ndarray:
+        """
+        Samples of each row within `seconds` of its newest, by a binary
+        search back from the head over the time-ordered ring.
+        """
+        count = self._count[rows]
+        newest = self._latest(rows)
+        lo, hi = np.minimum(count, 1), count.copy()
+        while True:
+            searching = lo < hi
+            if not searching.any():
+                return lo
+            mid = (lo + hi + 1) // 2
+            inside = self._data["timestamp"][rows, (self._head[rows] - mid) % self.capacity] >= newest - seconds
+            lo = np.where(searching & inside, mid, lo)
+            hi = np.where(searching & ~inside, mid - 1, hi)
+
+    def window(self, equipment_id: str, seconds: Optional[float] = None,
+               samples: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        An equipment's samples, oldest first: the last `samples` readings,
+        or those within `seconds` of its newest; None if unknown.
+        """
+        with self._lock:
+            row = self._row_of.get(equipment_id)
+            if row is None:
+                return None
+            rows = np.array([row])
+            n = int(self._count[row]) if samples is None else min(samples, int(self._count[row]))
+            if seconds is not None:
+                n = min(n, int(self._within(rows, seconds)[0]))
+            return {name: values[0] for name, values in self._gather(rows, n).items()}
+
+    def rolling_stats(self, equipment_id: str, seconds: float = ROLLING_WINDOW_SECONDS) -> Optional[Dict[str, Any]]:
+        """Mean, sample std, min, max and latest of each field over a trailing window."""
+        samples = self.window(equipment_id, seconds=seconds)
+        if samples is None or len(samples["timestamp"]) == 0:
+            return None
+        stats: Dict[str, Any] = {
+            "equipment_id": equipment_id,
+            "samples": int(len(samples["timestamp"])),
+            "window_seconds": round(float(samples["timestamp"][-1] - samples["timestamp"][0]), 1),
+        }
+        with np.errstate(all="ignore"), _quiet_nan_warnings():
+            for name in STAT_FIELDS:
+                values = samples[name]
+                known = values[np.isfinite(values)]
+                stats[name] = {
+                    "latest": _round(values[-1]),
+                    "mean": _round(known.mean()) if len(known) else None,
+                    "std": _round(known.std(ddof=1)) if len(known) > 1 else None,
+                    "min": _round(known.min()) if len(known) else None,
+                    "max": _round(known.max()) if len(known) else None,
+                }
+        return stats
+
+    def features(self, equipment_ids: Optional[Sequence[str]] = None,
+                 seconds: float = ROLLING_WINDOW_SECONDS, lag: int = DELTA_LAG) -> pd.DataFrame:
+        """
+        Notebook 01 realtime features of many equipment, computed together.
+
+        Rolling means and sample standard deviations cover each equipment's
+        readings within `seconds` of its newest; deltas compare the newest
+        reading with the one `lag` readings earlier.
+        """
+        lag = min(lag, self.capacity - 1)
+        with self._lock:
+            if equipment_ids is None:
+                equipment_ids = [e for e in self._equipment if e is not None]
+            known = [e for e in equipment_ids if e in self._row_of]
+            rows = np.array([self._row_of[e] for e in known], dtype=np.int64)
+            depth = int(self._within(rows, seconds).max()) if len(rows) else 0
+            g = self._gather(rows, max(depth, lag + 1))
+        if not known:
+            return pd.DataFrame()
+        latest = g["timestamp"][:, -1]
+        in_window = g["timestamp"] >= latest[:, None] - seconds
+        speed = g["speed_mph"]
+        load = g["engine_load_pct"]
+
+        def rolling(values: np.ndarray, fn, **kwargs) -> np.ndarray:
+            with np.errstate(all="ignore"), _quiet_nan_warnings():
+                return fn(np.where(in_window, values, np.nan), axis=1, **kwargs)
+
+        now_speed, now_load = speed[:, -1], load[:, -1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(now_load > 0, now_speed / now_load, 0.0)
+        frame = pd.DataFrame({
+            "EQUIPMENT_ID": known,
+            "TIMESTAMP": pd.to_datetime(latest, unit="s"),
+            "SAMPLES": in_window.sum(axis=1),
+            "LATITUDE": g["latitude"][:, -1],
+            "LONGITUDE": g["longitude"][:, -1],
+            "SPEED_MPH": now_speed,
+            "ENGINE_LOAD_PERCENT": now_load,
+            "FUEL_RATE_GPH": g["fuel_rate_gph"][:, -1],
+            "PAYLOAD_TONS": g["payload_tons"][:, -1],
+            "SPEED_AVG_5MIN": rolling(speed, np.nanmean),
+            "ENGINE_LOAD_AVG_5MIN": rolling(load, np.nanmean),
+            "FUEL_RATE_AVG_5MIN": rolling(g["fuel_rate_gph"], np.nanmean),
+            "SPEED_STD_5MIN": rolling(speed, np.nanstd, ddof=1),
+            "ENGINE_LOAD_STD_5MIN": rolling(load, np.nanstd, ddof=1),
+            "SPEED_DELTA": now_speed - speed[:, -1 - lag],
+            "ENGINE_LOAD_DELTA": now_load - load[:, -1 - lag],
+            "SPEED_TO_LOAD_RATIO": ratio,
+            "IS_EMPTY": (g["payload_tons"][:, -1] < 10).astype(np.int64),
+        })
+        return frame
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "equipment": len(self._row_of),
+                "max_equipment": self.max_equipment,
+                "capacity": self.capacity,
+                "samples": int(self._count.sum()),
+                "memory_bytes": self.memory_bytes,
+                "appended": self.appended,
+                "dropped": self.dropped,
+                "evicted": self.evicted,
+            }
+
+
+def _round(value: float, digits: int = 2) -> Optional[float]:
+    return round(float(value), digits) if np.isfinite(value) else None
+
+
+@contextmanager
+def _quiet_nan_warnings():
+    """No 'Mean of empty slice' / 'Degrees of freedom <= 0' warnings for all-NaN windows."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        yield
+
+
+# Singleton instance
+_buffer: Optional[TelemetryRingBuffer] = None
+
+
+def get_telemetry_buffer() -> TelemetryRingBuffer:
+    """Get or create the telemetry ring buffer singleton"""
+    global _buffer
+    if _buffer is None:
+        _buffer = TelemetryRingBuffer()
+    return _buffer
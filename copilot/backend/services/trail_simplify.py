@@ -0,0 +1,232 @@
+"""
+GPS trail simplification for TERRA map rendering
+
+A full shift of 1 Hz breadcrumbs is tens of thousands of points per truck,
+far more than a map can show at any zoom level. Trails are projected to
+local metres and simplified with Douglas-Peucker or Visvalingam-Whyatt at a
+tolerance derived from the map zoom (a fraction of a screen pixel), while
+stops (speed dropping below STOP_SPEED_MPH) are always kept as vertices.
+Optionally the result is returned as a Google encoded polyline.
+
+Douglas-Peucker is vectorized with NumPy, computing the perpendicular
+distances of a whole span per split; Visvalingam keeps the effective areas
+in a heap and recomputes only the neighbours of each removed point.
+"""
+
+import heapq
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from .geodesy import LocalProjection
+except ImportError:
+    from services.geodesy import LocalProjection
+
+# Web Mercator ground resolution at zoom 0, metres per pixel at the equator
+METERS_PER_PIXEL_Z0 = 156_543.03392
+
+# Default simplification tolerance in screen pixels
+DEFAULT_TOLERANCE_PX = 1.0
+
+# Readings at or below this speed count as stopped
+STOP_SPEED_MPH = 0.5
+
+ALGORITHMS = ("douglas-peucker", "visvalingam")
+
+
+def zoom_tolerance(zoom: float, latitude: float, tolerance_px: float = DEFAULT_TOLERANCE_PX) -> float:
+    """Simplification tolerance in metres for a Web Mercator zoom level."""
+    return tolerance_px * METERS_PER_PIXEL_Z0 * np.cos(np.radians(latitude)) / 2.0 ** zoom
+
+
+def _segment_distances(xy: np.ndarray, start: int, end: int) -> np.ndarray:
+    """Distances of the points strictly between start and end to the chord start-end."""
+    a, b = xy[start], xy[end]
+    points = xy[start + 1:end]
+    ab = b - a
+    length_sq = ab @ ab
+    if length_sq == 0.0:
+        return np.hypot(*(points - a).T)
+    t = np.clip((points - a) @ ab / length_sq, 0.0, 1.0)
+    nearest = a + t[:, None] * ab
+    return np.hypot(*(points - nearest).T)
+
+
+def douglas_peucker(xy: np.ndarray, tolerance: float, keep: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Douglas-Peucker simplification.
+
+    Args:
+        xy: (n, 2) projected coordinates in metres
+        tolerance: Maximum distance of a dropped point from the simplified line
+        keep: Optional boolean mask of points that must be retained
+
+    Returns:
+        Boolean mask of retained points
+    """
+    n = len(xy)
+    mask = np.zeros(n, dtype=bool) if keep is None else keep.copy()
+    if n == 0:
+        return mask
+    mask[0] = mask[-1] = True
+
+    # Forced vertices split the trail into independent spans
+    anchors = np.flatnonzero(mask)
+    stack = list(zip(anchors[:-1], anchors[1:]))
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = _segment_distances(xy, start, end)
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            split = start + 1 + i
+            mask[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return mask
+
+
+def visvalingam(xy: np.ndarray, tolerance: float, keep: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Visvalingam-Whyatt simplification by effective area.
+
+    The point whose triangle with its neighbours is smallest is removed
+    while that area is below tolerance²; only the two neighbours' areas
+    change, so they are recomputed and stale heap entries are skipped.
+
+    Returns:
+        Boolean mask of retained points
+    """
+    n = len(xy)
+    forced = np.zeros(n, dtype=bool) if keep is None else keep.copy()
+    if n == 0:
+        return forced
+    forced[0] = forced[-1] = True
+    threshold = tolerance * tolerance
+
+    prev_xy, cur, next_xy = xy[:-2], xy[1:-1], xy[2:]
+    area = np.full(n, np.inf)
+    area[1:-1] = 0.5 * np.abs(
+        (cur[:, 0] - prev_xy[:, 0]) * (next_xy[:, 1] - prev_xy[:, 1])
+        - (next_xy[:, 0] - prev_xy[:, 0]) * (cur[:, 1] - prev_xy[:, 1])
+    )
+    area[forced] = np.inf
+    candidates = np.flatnonzero(area < threshold)
+    heap = list(zip(area[candidates].tolist(), candidates.tolist()))
+    heapq.heapify(heap)
+
+    # The loop works on plain lists; NumPy scalar access would dominate it
+    x, y = xy[:, 0].tolist(), xy[:, 1].tolist()
+    area = area.tolist()
+    fixed = forced.tolist()
+    removed = [False] * n
+    # Doubly linked list over the points still in the trail
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    while heap:
+        a, i = heapq.heappop(heap)
+        # Stale entry: the point was removed or its area has changed since
+        if removed[i] or a != area[i]:
+            continue
+        removed[i] = True
+        p, q = prev[i], nxt[i]
+        nxt[p], prev[q] = q, p
+        for j in (p, q):
+            if fixed[j]:
+                continue
+            h, k = prev[j], nxt[j]
+            area[j] = 0.5 * abs((x[j] - x[h]) * (y[k] - y[h]) - (x[k] - x[h]) * (y[j] - y[h]))
+            if area[j] < threshold:
+                heapq.heappush(heap, (area[j], j))
+    return ~np.array(removed)
+
+
+def stop_vertices(speed: np.ndarray, stop_speed: float = STOP_SPEED_MPH) -> np.ndarray:
+    """Mask of the first and last reading of every stop."""
+    stopped = np.nan_to_num(speed, nan=np.inf) <= stop_speed
+    edges = np.zeros(len(speed), dtype=bool)
+    if len(speed) == 0:
+        return edges
+    change = stopped[1:] != stopped[:-1]
+    # Index of a reading whose state differs from the one before / after it
+    edges[1:] |= change & stopped[1:]
+    edges[:-1] |= change & stopped[:-1]
+    return edges
+
+
+def encode_polyline(lat: np.ndarray, lng: np.ndarray, precision: int = 5) -> str:
+    """Google encoded polyline of a coordinate sequence (vectorized)."""
+    if len(lat) == 0:
+        return ""
+    factor = 10 ** precision
+    coords = np.column_stack([np.round(np.asarray(lat) * factor), np.round(np.asarray(lng) * factor)])
+    deltas = np.diff(coords, axis=0, prepend=0).astype(np.int64).ravel()
+    # Zig-zag sign encoding, then 5-bit chunks least significant first
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1).astype(np.uint64)
+    shifts = np.arange(0, 35, 5, dtype=np.uint64)
+    chunks = (values[:, None] >> shifts) & np.uint64(0x1F)
+    bit_length = np.floor(np.log2(np.maximum(values, 1).astype(np.float64))).astype(np.int64) + 1
+    n_chunks = np.maximum(1, -(-bit_length // 5))
+    used = np.arange(len(shifts)) < n_chunks[:, None]
+    more = np.arange(len(shifts)) < (n_chunks - 1)[:, None]
+    chars = chunks | np.where(more, np.uint64(0x20), np.uint64(0))
+    return (chars[used] + np.uint64(63)).astype(np.uint8).tobytes().decode("ascii")
+
+
+def simplify_trail(
+    lat: Sequence[float],
+    lng: Sequence[float],
+    speed: Optional[Sequence[float]] = None,
+    tolerance_m: Optional[float] = None,
+    zoom: Optional[float] = None,
+    tolerance_px: float = DEFAULT_TOLERANCE_PX,
+    algorithm: str = "douglas-peucker",
+    keep_stops: bool = True,
+) -> Tuple[np.ndarray, Dict[str, float]]:
+    """
+    Simplify a chronologically ordered trail.
+
+    Args:
+        lat, lng: Coordinates in degrees
+        speed: Optional speeds in mph, used to keep stop vertices
+        tolerance_m: Tolerance in metres (overrides zoom)
+        zoom: Map zoom level the trail is drawn at
+        tolerance_px: Tolerance in screen pixels at that zoom
+        algorithm: "douglas-peucker" or "visvalingam"
+        keep_stops: Always keep the first and last reading of each stop
+
+    Returns:
+        (indices of retained points, stats)
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {ALGORITHMS}")
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    valid = np.isfinite(lat) & np.isfinite(lng)
+    positions = np.flatnonzero(valid)
+    lat, lng = lat[valid], lng[valid]
+
+    if tolerance_m is None:
+        latitude = float(np.mean(lat)) if len(lat) else 0.0
+        tolerance_m = zoom_tolerance(zoom if zoom is not None else 16, latitude, tolerance_px)
+
+    keep = None
+    if keep_stops and speed is not None:
+        keep = stop_vertices(np.asarray(speed, dtype=np.float64)[valid])
+
+    if len(lat) <= 2:
+        retained = np.arange(len(lat))
+    else:
+        xy = LocalProjection.around(lat, lng).forward(lat, lng)
+        simplify = douglas_peucker if algorithm == "douglas-peucker" else visvalingam
+        retained = np.flatnonzero(simplify(xy, tolerance_m, keep))
+
+    stats = {
+        "input_points": int(len(valid)),
+        "output_points": int(len(retained)),
+        "tolerance_m": round(float(tolerance_m), 3),
+        "reduction": round(len(valid) / max(len(retained), 1), 1),
+    }
+    return positions[retained], stats
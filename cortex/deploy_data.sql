@@ -79,6 +79,30 @@ INSERT INTO EQUIPMENT VALUES
 -- GPS BREADCRUMBS (Sample - last 24 hours)
 -- =====================================================
 
+-- Integer geohash cell (precision 10) for GRID_CELL, as services/spatial_grid.encode
+CREATE OR REPLACE FUNCTION GEOHASH_TO_CELL(GEOHASH VARCHAR)
+RETURNS NUMBER(18, 0)
+AS
+$$
+    BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 1, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 45)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 2, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 40)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 3, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 35)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 4, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 30)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 5, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 25)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 6, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 20)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 7, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 15)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 8, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 10)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 9, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 5)
+  + (POSITION(SUBSTR(GEOHASH, 10, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1)
+$$;
+
+CREATE OR REPLACE FUNCTION GEOHASH_CELL(LAT FLOAT, LNG FLOAT)
+RETURNS NUMBER(18, 0)
+AS
+$$
+    GEOHASH_TO_CELL(ST_GEOHASH(ST_MAKEPOINT(LNG, LAT), 10))
+$$;
+
 CREATE OR REPLACE TABLE GPS_BREADCRUMBS (
     BREADCRUMB_ID VARCHAR(50) PRIMARY KEY,
     EQUIPMENT_ID VARCHAR(50),
@@ -86,11 +110,15 @@ CREATE OR REPLACE TABLE GPS_BREADCRUMBS (
     LATITUDE FLOAT,
     LONGITUDE FLOAT,
     SPEED_MPH FLOAT,
-    HEADING_DEGREES FLOAT
+    HEADING_DEGREES FLOAT,
+    SITE_ID VARCHAR(50),
+    GRID_CELL BIGINT                      -- Integer geohash cell, precision 10
 );
 
 -- Generate synthetic GPS data with Ghost Cycle patterns
-INSERT INTO GPS_BREADCRUMBS
+INSERT INTO GPS_BREADCRUMBS (
+    BREADCRUMB_ID, EQUIPMENT_ID, TIMESTAMP, LATITUDE, LONGITUDE, SPEED_MPH, HEADING_DEGREES, SITE_ID
+)
 SELECT 
     'GPS-' || SEQ8() AS BREADCRUMB_ID,
     e.EQUIPMENT_ID,
@@ -102,12 +130,15 @@ SELECT
         WHEN uniform(0, 100, random()) < 15 THEN uniform(8, 20, random())  -- 15% Ghost Cycles
         ELSE uniform(0, 25, random())
     END AS SPEED_MPH,
-    uniform(0, 360, random()) AS HEADING_DEGREES
+    uniform(0, 360, random()) AS HEADING_DEGREES,
+    e.SITE_ID
 FROM EQUIPMENT e
 JOIN SITES s ON e.SITE_ID = s.SITE_ID
 WHERE e.EQUIPMENT_TYPE = 'haul_truck',
 TABLE(GENERATOR(ROWCOUNT => 500));
 
+UPDATE GPS_BREADCRUMBS SET GRID_CELL = GEOHASH_CELL(LATITUDE, LONGITUDE);
+
 -- =====================================================
 -- EQUIPMENT TELEMATICS (Sample - matches GPS timestamps)
 -- =====================================================
@@ -52,6 +52,7 @@ CREATE OR REPLACE TABLE GPS_BREADCRUMBS (
     speed_mph FLOAT,
     heading_degrees FLOAT,
     accuracy_m FLOAT,
+    grid_cell BIGINT,                     -- Integer geohash cell, precision 10
     created_at TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
 );
 
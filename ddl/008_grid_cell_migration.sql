@@ -0,0 +1,65 @@
+-- ============================================================================
+-- TERRA Construction Geospatial Analytics - GRID_CELL Migration
+-- ============================================================================
+-- Adds the integer geohash GRID_CELL (and SITE_ID, missing from the cortex/
+-- setup tables) to existing GPS_BREADCRUMBS tables and backfills them, so
+-- /api/choke-points/{site_id}/zones and notebook 03 see existing data.
+-- Safe to re-run: only rows with a NULL column are updated.
+--
+-- GRID_CELL is the precision-10 geohash as an integer, the value
+-- services/spatial_grid.encode computes: the geohash's base32 digits read
+-- as a 50-bit number.
+-- ============================================================================
+
+USE DATABASE CONSTRUCTION_GEO_DB;
+USE SCHEMA RAW;
+
+-- ============================================================================
+-- GEOHASH_CELL - integer geohash cell of a point (precision 10)
+-- ============================================================================
+CREATE OR REPLACE FUNCTION GEOHASH_TO_CELL(GEOHASH VARCHAR)
+RETURNS NUMBER(18, 0)
+AS
+$$
+    BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 1, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 45)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 2, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 40)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 3, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 35)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 4, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 30)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 5, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 25)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 6, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 20)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 7, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 15)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 8, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 10)
+  + BITSHIFTLEFT(POSITION(SUBSTR(GEOHASH, 9, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1, 5)
+  + (POSITION(SUBSTR(GEOHASH, 10, 1), '0123456789bcdefghjkmnpqrstuvwxyz') - 1)
+$$;
+
+CREATE OR REPLACE FUNCTION GEOHASH_CELL(LAT FLOAT, LNG FLOAT)
+RETURNS NUMBER(18, 0)
+AS
+$$
+    GEOHASH_TO_CELL(ST_GEOHASH(ST_MAKEPOINT(LNG, LAT), 10))
+$$;
+
+-- ============================================================================
+-- GPS_BREADCRUMBS - add and backfill SITE_ID and GRID_CELL
+-- ============================================================================
+ALTER TABLE GPS_BREADCRUMBS ADD COLUMN IF NOT EXISTS SITE_ID VARCHAR(50);
+ALTER TABLE GPS_BREADCRUMBS ADD COLUMN IF NOT EXISTS GRID_CELL BIGINT;
+
+UPDATE GPS_BREADCRUMBS g
+SET SITE_ID = e.SITE_ID
+FROM EQUIPMENT e
+WHERE g.EQUIPMENT_ID = e.EQUIPMENT_ID
+  AND g.SITE_ID IS NULL;
+
+UPDATE GPS_BREADCRUMBS
+SET GRID_CELL = GEOHASH_CELL(LATITUDE, LONGITUDE)
+WHERE GRID_CELL IS NULL
+  AND LATITUDE BETWEEN -90 AND 90
+  AND LONGITUDE BETWEEN -180 AND 180;
+
+SELECT
+    COUNT(*) AS BREADCRUMBS,
+    COUNT(GRID_CELL) AS WITH_GRID_CELL,
+    COUNT(SITE_ID) AS WITH_SITE_ID
+FROM GPS_BREADCRUMBS;
@@ -0,0 +1,139 @@
+"""
+TERRA Cycle Backfill
+
+Derives haul cycles from recorded GPS breadcrumbs (generate_sample_data.py
+output, partitioned or --single-file) with the vectorized cycle
+segmentation, one site and day at a time, and writes them as a
+cycle_events dataset partitioned by site_id/date of cycle start.
+
+Each day is read together with MAX_CYCLE_MINUTES on either side: after it,
+so cycles starting late in the day (e.g. night shifts across midnight) are
+complete, and before it, so a load dwell that started the evening before is
+seen whole. Only cycles starting on the day itself are kept, so every cycle
+is written exactly once.
+
+Zones come either from a JSON file mapping site_id to circular load/dump
+zones:
+
+    {"alpha": [{"name": "Cut Zone A", "kind": "LOAD", "latitude": 33.45,
+                "longitude": -112.08, "radius_m": 75}, ...]}
+
+or from a directory of per-site geofence GeoJSON files ({site_id}.geojson,
+as served by /api/geofences), whose CUT/LOAD and FILL/DUMP polygons are
+used as load and dump zones.
+
+Usage:
+    python backfill_cycles.py --input ./data --zones zones.json --output ./cycles
+    python backfill_cycles.py --input ./data --geofences ./config/geofences --output ./cycles
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "copilot" / "backend"))
+
+import generate_sample_data as gen  # noqa: E402
+from services.cycle_segmentation import (  # noqa: E402
+    MAX_CYCLE_MINUTES, MIN_DWELL_SECONDS, load_zones, segment_cycles,
+)
+from services.geofence import GeofenceSet  # noqa: E402
+
+GPS_COLUMNS = ["equipment_id", "timestamp", "latitude", "longitude"]
+
+
+def _open_dataset(root: Path, name: str) -> ds.Dataset:
+    directory = root / name
+    if directory.is_dir():
+        return ds.dataset(directory, partitioning="hive")
+    return ds.dataset(root / f"{name}.parquet")
+
+
+def _days(gps: ds.Dataset) -> List[pd.Timestamp]:
+    """Days covered by the dataset, from row group statistics."""
+    lo, hi = None, None
+    for fragment in gps.get_fragments():
+        fragment.ensure_complete_metadata()
+        for row_group in fragment.row_groups:
+            stats = row_group.statistics.get("timestamp")
+            if stats:
+                lo = stats["min"] if lo is None else min(lo, stats["min"])
+                hi = stats["max"] if hi is None else max(hi, stats["max"])
+    if lo is None:
+        return []
+    return list(pd.date_range(pd.Timestamp(lo).floor("D"), pd.Timestamp(hi).floor("D"), freq="D"))
+
+
+def iter_site_days(gps: ds.Dataset, site_id: str) -> Iterator[Tuple[pd.Timestamp, pd.DataFrame]]:
+    """Breadcrumbs of one site per day, with MAX_CYCLE_MINUTES of the neighbouring days."""
+    lead = timedelta(minutes=MAX_CYCLE_MINUTES)
+    # Room for the load dwell that closes a cycle starting just before midnight
+    tail = lead + timedelta(seconds=2 * MIN_DWELL_SECONDS)
+    for day in _days(gps):
+        start, end = day.to_pydatetime(), (day + pd.Timedelta(days=1)).to_pydatetime()
+        table = gps.to_table(
+            columns=GPS_COLUMNS,
+            filter=(ds.field("site_id") == site_id)
+            & (ds.field("timestamp") >= start - lead) & (ds.field("timestamp") < end + tail),
+        )
+        if table.num_rows:
+            yield day, table.to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill haul cycles from recorded GPS breadcrumbs")
+    parser.add_argument("--input", type=Path, required=True, help="generate_sample_data.py output directory")
+    zone_source = parser.add_mutually_exclusive_group(required=True)
+    zone_source.add_argument("--zones", type=Path, help="JSON file of circular load/dump zones per site")
+    zone_source.add_argument("--geofences", type=Path, help="Directory of {site_id}.geojson geofence files")
+    parser.add_argument("--output", type=Path, required=True, help="Output directory")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet")
+    args = parser.parse_args()
+
+    if args.zones:
+        zone_config = json.loads(args.zones.read_text())
+        sites = {site_id: (load_zones(zone_config, site_id), None) for site_id in zone_config}
+    else:
+        sites = {}
+        for path in sorted(args.geofences.glob("*.geojson")):
+            fences = GeofenceSet.from_geojson(json.loads(path.read_text()))
+            sites[path.stem] = (fences.cycle_zones()[0], fences)
+
+    gps = _open_dataset(args.input, "gps_breadcrumbs")
+    writer = gen.PartitionedWriter(args.output / "cycle_events", args.format, "cycle_start")
+
+    started = time.perf_counter()
+    breadcrumbs = 0
+    try:
+        for site_id, (zones, fences) in sites.items():
+            site_cycles = 0
+            for day, df in iter_site_days(gps, site_id):
+                cycles = segment_cycles(
+                    df["equipment_id"], df["timestamp"], df["latitude"], df["longitude"], zones,
+                    zone_index=fences.cycle_zone_index(df["latitude"], df["longitude"]) if fences else None,
+                )
+                next_day = day + pd.Timedelta(days=1)
+                cycles = cycles[(cycles["cycle_start"] >= day) & (cycles["cycle_start"] < next_day)]
+                writer.write(cycles.assign(site_id=site_id))
+                # The neighbouring days' rows are counted on their own day
+                breadcrumbs += int(((df["timestamp"] >= day) & (df["timestamp"] < next_day)).sum())
+                site_cycles += len(cycles)
+            print(f"  {site_id}: {site_cycles:,} cycles ({len(zones)} zones)")
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Backfilled {writer.rows:,} cycles from {breadcrumbs:,} breadcrumbs in {elapsed:.1f}s "
+          f"-> {args.output / 'cycle_events'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+TERRA Cycle Segmentation Benchmark
+
+Synthesizes 1 Hz breadcrumbs for trucks shuttling between a load zone and a
+dump zone (with GPS noise and a drive-through zone on the route), runs the
+vectorized cycle segmentation over them and checks the detected cycles
+against the synthesized ground truth.
+
+Usage:
+    python bench_cycle_segmentation.py --trucks 50 --hours 24
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "copilot" / "backend"))
+
+from services.cycle_segmentation import Zone, segment_cycles  # noqa: E402
+
+SITE = (33.4484, -112.0740)
+LOAD_ZONE = Zone("Cut Zone A", "LOAD", SITE[0], SITE[1], 60.0)
+DUMP_ZONE = Zone("Fill Zone 1", "DUMP", SITE[0] + 0.012, SITE[1] + 0.004, 60.0)
+# On the haul route, so trucks drive through it without stopping
+PASS_ZONE = Zone("Cut Zone B", "LOAD", SITE[0] + 0.006, SITE[1] + 0.002, 40.0)
+
+
+def synthesize(trucks: int, hours: float, seed: int):
+    """Breadcrumbs of shuttling trucks, and the number of complete cycles per truck."""
+    rng = np.random.default_rng(seed)
+    period = int(hours * 3600)
+    ids, secs, lats, lngs, expected = [], [], [], [], 0
+    for truck in range(trucks):
+        t, phases = int(rng.integers(0, 600)), []
+        # Phases: load dwell, haul, dump dwell, return (seconds)
+        while t < period:
+            durations = [rng.integers(180, 300), rng.integers(360, 540), rng.integers(60, 120), rng.integers(300, 480)]
+            phases.append((t, durations))
+            t += int(sum(durations))
+        starts = [p[0] for p in phases]
+        # A cycle is complete when the next load dwell starts inside the period
+        expected += sum(1 for s in starts[1:] if s < period)
+
+        s = np.arange(starts[0], period)
+        cycle = np.searchsorted(starts, s, side="right") - 1
+        into = s - np.array(starts)[cycle]
+        d = np.array([p[1] for p in phases])[cycle]
+        edges = np.cumsum(d, axis=1)
+        # Fraction of the way from load to dump zone
+        frac = np.select(
+            [into < edges[:, 0], into < edges[:, 1], into < edges[:, 2]],
+            [0.0, (into - edges[:, 0]) / d[:, 1], 1.0],
+            1.0 - (into - edges[:, 2]) / d[:, 3],
+        )
+        lat = LOAD_ZONE.latitude + frac * (DUMP_ZONE.latitude - LOAD_ZONE.latitude) + rng.normal(0, 1e-5, len(s))
+        lng = LOAD_ZONE.longitude + frac * (DUMP_ZONE.longitude - LOAD_ZONE.longitude) + rng.normal(0, 1e-5, len(s))
+        ids.append(np.full(len(s), f"HT-{truck:04d}"))
+        secs.append(s)
+        lats.append(lat)
+        lngs.append(lng)
+
+    ts = np.datetime64("2026-01-05T06:00:00", "s") + np.concatenate(secs).astype("timedelta64[s]")
+    return np.concatenate(ids), ts, np.concatenate(lats), np.concatenate(lngs), expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GPS cycle segmentation")
+    parser.add_argument("--trucks", type=int, default=50, help="Trucks to synthesize")
+    parser.add_argument("--hours", type=float, default=24, help="Hours of 1 Hz breadcrumbs per truck")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    ids, ts, lat, lng, expected = synthesize(args.trucks, args.hours, args.seed)
+    # Shuffle so the benchmark includes the sort
+    order = np.random.default_rng(args.seed).permutation(len(ts))
+    ids, ts, lat, lng = ids[order], ts[order], lat[order], lng[order]
+    print(f"Breadcrumbs: {len(ts):,} ({args.trucks} trucks x {args.hours:g} h at 1 Hz)")
+
+    start = time.perf_counter()
+    cycles = segment_cycles(ids, ts, lat, lng, [LOAD_ZONE, DUMP_ZONE, PASS_ZONE])
+    elapsed = time.perf_counter() - start
+
+    print(f"  -> {len(cycles):,} cycles (expected {expected:,}) in {elapsed:.2f}s "
+          f"({len(ts) / elapsed / 1e6:.1f}M breadcrumbs/s)")
+    if len(cycles):
+        print(f"     cycle time {cycles['cycle_time_minutes'].mean():.1f} min avg, "
+              f"haul {cycles['haul_distance_miles'].mean():.2f} mi avg, "
+              f"load zones {sorted(cycles['load_location'].unique())}")
+    if len(cycles) != expected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
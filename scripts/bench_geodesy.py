@@ -0,0 +1,113 @@
+"""
+TERRA Geodesy Benchmark
+
+Times the shared geodesic utilities on millions of synthetic breadcrumbs
+and checks them against straightforward references:
+
+    haversine        vectorized vs a per-point math loop
+    path length      grouped cumulative distance vs a per-truck loop
+    implied speed    speed between consecutive breadcrumbs
+    projection       tangent-plane distances vs great-circle distances
+                     across a site, and forward/inverse round trip
+
+Usage:
+    python bench_geodesy.py --points 5000000 --trucks 500
+"""
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "copilot" / "backend"))
+
+from services.geodesy import (  # noqa: E402
+    EARTH_RADIUS_M, LocalProjection, haversine_m, implied_speed_mph, path_length_m,
+)
+
+SITE = (33.4484, -112.0740)
+
+
+def legacy_haversine(lat1, lng1, lat2, lng2) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def breadcrumbs(points: int, trucks: int, seed: int):
+    """Random-walk 1 Hz breadcrumbs of trucks around a site, sorted by truck and time."""
+    rng = np.random.default_rng(seed)
+    truck = np.sort(rng.integers(0, trucks, points))
+    step_lat = rng.normal(0, 5e-5, points)
+    step_lng = rng.normal(0, 6e-5, points)
+    lat = SITE[0] + np.cumsum(step_lat) + rng.uniform(-0.02, 0.02, trucks)[truck]
+    lng = SITE[1] + np.cumsum(step_lng) + rng.uniform(-0.02, 0.02, trucks)[truck]
+    ts = np.datetime64("2026-01-05T06:00:00", "s") + np.arange(points).astype("timedelta64[s]")
+    return truck, ts, lat, lng
+
+
+def timed(label: str, points: int, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:7.3f}s  {points / elapsed / 1e6:7.1f}M points/s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark geodesic utilities")
+    parser.add_argument("--points", type=int, default=5_000_000, help="Breadcrumbs to synthesize")
+    parser.add_argument("--trucks", type=int, default=500, help="Trucks the breadcrumbs belong to")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    truck, ts, lat, lng = breadcrumbs(args.points, args.trucks, args.seed)
+    n = args.points
+    print(f"Breadcrumbs: {n:,} ({args.trucks} trucks)")
+
+    # Haversine
+    distance, vector_s = timed("haversine (vectorized)", n - 1, lambda: haversine_m(lat[:-1], lng[:-1], lat[1:], lng[1:]))
+    sample = min(n - 1, 200_000)
+    legacy, legacy_s = timed("haversine (math loop)", sample, lambda: np.array([
+        legacy_haversine(lat[i], lng[i], lat[i + 1], lng[i + 1]) for i in range(sample)
+    ]))
+    print(f"    speedup {legacy_s / sample / (vector_s / (n - 1)):.0f}x, "
+          f"max difference {np.abs(distance[:sample] - legacy).max():.2e} m")
+
+    # Path length per truck
+    path, _ = timed("path length (grouped)", n, lambda: path_length_m(lat, lng, truck))
+    firsts = np.flatnonzero(np.r_[True, truck[1:] != truck[:-1]])
+    lasts = np.append(firsts[1:], n) - 1
+    check = firsts[:20]
+    reference = np.array([
+        sum(legacy_haversine(lat[i], lng[i], lat[i + 1], lng[i + 1]) for i in range(f, l))
+        for f, l in zip(check, lasts[:20])
+    ])
+    print(f"    per-truck totals match a loop to {np.abs(path[lasts[:20]] - reference).max():.2e} m, "
+          f"mean {path[lasts].mean() / 1000:.1f} km per truck")
+
+    # Implied speed
+    speed, _ = timed("implied speed", n, lambda: implied_speed_mph(ts, lat, lng, truck))
+    print(f"    median {np.nanmedian(speed):.1f} mph")
+
+    # Projection
+    projection = LocalProjection(*SITE)
+    xy, _ = timed("projection forward", n, lambda: projection.forward(lat, lng))
+    back_lat, back_lng = projection.inverse(xy[:, 0], xy[:, 1])
+    print(f"    round trip error {max(np.abs(back_lat - lat).max(), np.abs(back_lng - lng).max()) * 1e9:.2f} nano-degrees")
+    rng = np.random.default_rng(args.seed)
+    a, b = rng.integers(0, n, 100_000), rng.integers(0, n, 100_000)
+    planar = np.hypot(*(xy[a] - xy[b]).T)
+    great_circle = haversine_m(lat[a], lng[a], lat[b], lng[b])
+    far = great_circle > 100
+    error = np.abs(planar - great_circle)[far] / great_circle[far]
+    # Mostly the ellipsoid's local radii vs the sphere's mean radius
+    print(f"    projected vs spherical great-circle distance, pairs up to {great_circle.max() / 1000:.1f} km: "
+          f"mean {error.mean() * 100:.3f}%, max {error.max() * 100:.3f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+TERRA Geofence Benchmark
+
+Synthesizes irregular polygon fences (some with holes) over a site, times
+the grid-indexed point-in-polygon test on random breadcrumbs and checks
+every answer against a brute-force even-odd ray cast over all edges.
+
+Besides the requested layout, a site-scale and two large-extent layouts
+are checked; on large extents the grid grows its cells to stay within
+MAX_GRID_CELLS.
+
+Usage:
+    python bench_geofence.py --fences 40 --extent-km 3 --points 1000000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "copilot" / "backend"))
+
+from services.geodesy import LocalProjection  # noqa: E402
+from services.geofence import GeofenceSet  # noqa: E402
+
+SITE = (33.4484, -112.0740)
+
+# (fences, extent km) always checked against brute force
+LAYOUTS = [(40, 3.0), (200, 50.0), (40, 100.0)]
+
+# Breadcrumbs per brute-force check (brute force is O(points x edges))
+CHECK_POINTS = 5000
+
+
+def synthesize(fences: int, extent_km: float, vertices: int, rng) -> list:
+    """Star-shaped fences scattered over a square site; every third one has a hole."""
+    projection = LocalProjection(*SITE)
+    extent_m = extent_km * 1000
+    radius = extent_m / np.sqrt(fences) / 3
+    result = []
+    for i in range(fences):
+        cx, cy = rng.uniform(-extent_m / 2, extent_m / 2, 2)
+        angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+        r = radius * rng.uniform(0.4, 1.0, vertices)
+        lat, lng = projection.inverse(cx + r * np.cos(angles), cy + r * np.sin(angles))
+        polygon = [np.column_stack([lng, lat]).tolist()]
+        if i % 3 == 0:
+            hole = np.linspace(0, 2 * np.pi, 12, endpoint=False)
+            lat, lng = projection.inverse(cx + 0.2 * radius * np.cos(hole), cy + 0.2 * radius * np.sin(hole))
+            polygon.append(np.column_stack([lng, lat]).tolist())
+        result.append({"fence_id": f"F{i:03d}", "kind": "GENERAL", "polygons": [polygon]})
+    return result
+
+
+def brute_force(fence_set: GeofenceSet, fences: list, lat: np.ndarray, lng: np.ndarray) -> np.ndarray:
+    """Even-odd ray cast of every point against every edge, in the set's projection."""
+    xy = fence_set.project(lat, lng)
+    px, py = xy[:, 0:1], xy[:, 1:2]
+    inside = np.zeros((len(xy), len(fences)), dtype=bool)
+    for i, fence in enumerate(fences):
+        for polygon in fence["polygons"]:
+            for ring in polygon:
+                ring = np.asarray(ring)
+                a = fence_set.project(ring[:, 1], ring[:, 0])
+                b = np.roll(a, -1, axis=0)
+                ax, ay, bx, by = a[:, 0], a[:, 1], b[:, 0], b[:, 1]
+                straddles = (ay > py) != (by > py)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    x_cross = ax + (py - ay) * (bx - ax) / (by - ay)
+                inside[:, i] ^= ((straddles & (px < x_cross)).sum(axis=1) % 2).astype(bool)
+    return inside
+
+
+def random_points(fence_set: GeofenceSet, extent_km: float, n: int, rng):
+    extent_m = extent_km * 1000 * 1.1
+    x, y = rng.uniform(-extent_m / 2, extent_m / 2, (2, n))
+    return fence_set.projection.inverse(x, y)
+
+
+def check(fences: int, extent_km: float, vertices: int, rng) -> int:
+    """Mismatches against brute force for one layout."""
+    polygons = synthesize(fences, extent_km, vertices, rng)
+    fence_set = GeofenceSet(polygons, projection=LocalProjection(*SITE))
+    lat, lng = random_points(fence_set, extent_km, CHECK_POINTS, rng)
+    expected = brute_force(fence_set, polygons, lat, lng)
+    got = fence_set.contains(lat, lng)
+    mismatched = int((got != expected).any(axis=1).sum())
+    print(f"  {fences} fences over {extent_km:g} km (cell {fence_set.cell_m:.0f} m): "
+          f"{int(expected.any(axis=1).sum()):,} of {CHECK_POINTS:,} points inside a fence, "
+          f"{mismatched} mismatched")
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark geofence point-in-polygon")
+    parser.add_argument("--fences", type=int, default=40, help="Fences to synthesize")
+    parser.add_argument("--extent-km", type=float, default=3.0, help="Width of the site")
+    parser.add_argument("--vertices", type=int, default=200, help="Vertices per fence exterior")
+    parser.add_argument("--points", type=int, default=1_000_000, help="Breadcrumbs to time")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    polygons = synthesize(args.fences, args.extent_km, args.vertices, rng)
+    start = time.perf_counter()
+    fence_set = GeofenceSet(polygons, projection=LocalProjection(*SITE))
+    print(f"Prepared {args.fences} fences x {args.vertices} vertices in {time.perf_counter() - start:.2f}s")
+
+    lat, lng = random_points(fence_set, args.extent_km, args.points, rng)
+    start = time.perf_counter()
+    inside = fence_set.contains(lat, lng)
+    elapsed = time.perf_counter() - start
+    print(f"  -> {args.points:,} breadcrumbs in {elapsed:.2f}s ({args.points / elapsed / 1e6:.1f}M points/s), "
+          f"{int(inside.any(axis=1).sum()):,} inside a fence")
+
+    print("Brute-force check")
+    mismatched = sum(
+        check(fences, extent_km, args.vertices, rng)
+        for fences, extent_km in [(args.fences, args.extent_km)] + LAYOUTS
+    )
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+TERRA Intent Classifier Benchmark
+
+Checks the compiled single-pass intent matcher against the previous
+per-pattern classifier on a labeled corpus plus randomized keyword mixes,
+then times both. Exits non-zero if any classification differs.
+
+Usage:
+    python bench_intent_classifier.py
+    python bench_intent_classifier.py --iterations 20000 --fuzz 50000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "copilot" / "backend"))
+
+from agents.orchestrator import INTENT_PATTERNS, classify_intent  # noqa: E402
+
+
+# (message, expected intent)
+LABELED_CORPUS = [
+    ("Show me Ghost Cycle alerts", "ghost_cycle"),
+    ("Which equipment is wasting fuel?", "status"),
+    ("Any fuel waste on site ALPHA today?", "ghost_cycle"),
+    ("Which trucks are idle right now?", "ghost_cycle"),
+    ("Why is H-07 so inefficient?", "ghost_cycle"),
+    ("Dozer D-02 is burning fuel but not working", "ghost_cycle"),
+    ("Predict idle time for the loaders", "ghost_cycle"),
+    ("Any choke points?", "route"),
+    ("Best route to dump site?", "route"),
+    ("How bad is traffic at Stockpile B Intersection?", "route"),
+    ("Should we divert trucks around the bottleneck?", "route"),
+    ("Is there an alternate haul road?", "route"),
+    ("Congestion forecast for North Road Bend", "route"),
+    ("What's the average cycle time?", "cycle_time"),
+    ("Predict my next cycle", "general"),
+    ("How long does a load-haul-dump take?", "cycle_time"),
+    ("Estimate the haul time to the crusher", "cycle_time"),
+    ("Can you predict the total time for 40 loads?", "cycle_time"),
+    ("Why did the model detect a ghost cycle on H-12?", "ghost_cycle"),
+    ("Why did you detect H-12?", "ml_explain"),
+    ("Explain the choke point model", "route"),
+    ("Explain the cycle time model", "cycle_time"),
+    ("Explain the detection model", "ml_explain"),
+    ("Which features are important? show SHAP values", "ml_explain"),
+    ("What does the model predict for tomorrow?", "ml_explain"),
+    ("How many trucks are active?", "analytical"),
+    ("Total volume moved this week", "analytical"),
+    ("Count of assets per site", "analytical"),
+    ("List the sites", "analytical"),
+    ("Show me the haul data for BETA", "analytical"),
+    ("Give me statistics for GAMMA", "analytical"),
+    ("Find safety procedures", "search"),
+    ("Search geotechnical reports", "search"),
+    ("Any documents about slope stability?", "search"),
+    ("Maintenance history for L-03", "search"),
+    ("Current fleet status", "status"),
+    ("What is happening right now?", "status"),
+    ("Equipment overview", "status"),
+    ("Status of site DELTA", "status"),
+    ("Hello", "general"),
+    ("What can you do?", "general"),
+    ("", "general"),
+    ("GHOST-CYCLE", "ghost_cycle"),
+    ("cycletime trends", "cycle_time"),
+    ("predict\nthe time", "general"),
+]
+
+
+def legacy_classify(message: str) -> str:
+    """The previous classifier: one re.search per pattern in priority order."""
+    message_lower = message.lower()
+    for intent, patterns in INTENT_PATTERNS:
+        for pattern in patterns:
+            if re.search(pattern, message_lower):
+                return intent
+    return "general"
+
+
+def fuzz_messages(count: int, seed: int = 7):
+    """Random mixes of trigger words and filler so patterns overlap and compete."""
+    rng = random.Random(seed)
+    triggers = [
+        "ghost", "cycle", "time", "fuel", "waste", "idle", "route", "choke", "point",
+        "predict", "estimate", "why", "detect", "explain", "model", "feature", "import",
+        "what", "how", "long", "many", "show", "me", "data", "find", "status", "current",
+        "right", "now", "fleet", "equipment", "list", "total", "history", "shap",
+    ]
+    filler = ["the", "truck", "H-07", "at", "site", "ALPHA", "for", "and", "?", "\n"]
+    separators = [" ", "", "-", "_"]
+    words = triggers + filler
+    for _ in range(count):
+        parts = [rng.choice(words) for _ in range(rng.randint(1, 12))]
+        yield "".join(p + rng.choice(separators) for p in parts)
+
+
+def time_classifier(fn, messages, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for message in messages:
+            fn(message)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the orchestrator intent classifier")
+    parser.add_argument("--iterations", type=int, default=2000, help="Passes over the corpus when timing")
+    parser.add_argument("--fuzz", type=int, default=20000, help="Randomized messages to cross-check")
+    args = parser.parse_args()
+
+    failures = 0
+    for message, expected in LABELED_CORPUS:
+        legacy, compiled = legacy_classify(message), classify_intent(message)
+        if not legacy == compiled == expected:
+            failures += 1
+            print(f"  MISMATCH {message!r}: expected={expected} legacy={legacy} compiled={compiled}")
+    print(f"Labeled corpus: {len(LABELED_CORPUS) - failures}/{len(LABELED_CORPUS)} agree")
+
+    fuzz_failures = 0
+    for message in fuzz_messages(args.fuzz):
+        if legacy_classify(message) != classify_intent(message):
+            fuzz_failures += 1
+            if fuzz_failures <= 10:
+                print(f"  MISMATCH {message!r}: legacy={legacy_classify(message)} "
+                      f"compiled={classify_intent(message)}")
+    print(f"Fuzzed messages: {args.fuzz - fuzz_failures}/{args.fuzz} agree")
+
+    messages = [m for m, _ in LABELED_CORPUS]
+    calls = args.iterations * len(messages)
+    for name, fn in [("compiled", classify_intent), ("legacy", legacy_classify)]:
+        elapsed = time_classifier(fn, messages, args.iterations)
+        print(f"  -> {name:<8} {calls:>9,} calls  {elapsed * 1000:8.1f} ms  "
+              f"{elapsed / calls * 1e6:6.2f} us/call")
+
+    if failures or fuzz_failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
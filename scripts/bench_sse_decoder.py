@@ -0,0 +1,98 @@
+"""
+TERRA Cortex Agent SSE Decoder Benchmark
+
+Replays a recorded (or synthesized) Cortex Agent event stream through the
+incremental SSEDecoder and through the previous string-buffer parser,
+feeding both the same network-sized chunks.
+
+Usage:
+    python bench_sse_decoder.py --size-mb 8 --chunk 512
+    python bench_sse_decoder.py --input ./agent_stream.txt
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "copilot" / "backend"))
+
+from services.sse_decoder import SSEDecoder  # noqa: E402
+
+
+def synthesize_stream(size_mb: float) -> bytes:
+    """Build an agent-like stream: status, large tool results, then text deltas."""
+    parts = [
+        b'event: response.status\ndata: {"status": "planning", "message": "Planning"}\n\n',
+        b'event: response.status\ndata: {"status": "streaming_analyst_results"}\n\n',
+    ]
+    words = ["Truck", "H-07", "idled", "at", "Stockpile", "B", "for", "14", "minutes", "while", "moving. "]
+    # Analyst tool results carry whole result sets in a single event
+    rows = [{"EQUIPMENT_ID": f"H-{i:02d}", "GHOST_COUNT": i, "FUEL_WASTED": i * 8.0} for i in range(20000)]
+    for _ in range(2):
+        payload = json.dumps({"content": [{"json": {"sql": "SELECT ...", "data": rows}}]})
+        parts.append(f"event: response.tool_result\ndata: {payload}\n\n".encode())
+    target = int(size_mb * 1024 * 1024)
+    size = sum(len(p) for p in parts)
+    i = 0
+    while size < target:
+        payload = json.dumps({"text": words[i % len(words)] + " ", "content_index": 0})
+        frame = f"event: response.output_text.delta\r\ndata: {payload}\r\n\r\n".encode()
+        parts.append(frame)
+        size += len(frame)
+        i += 1
+    parts.append(b"event: response.done\ndata: {}\n\n")
+    return b"".join(parts)
+
+
+def legacy_parse(chunks) -> int:
+    """The previous parser: str buffer + split on blank line per chunk."""
+    count = 0
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk.decode("utf-8", errors="replace")
+        while "\n\n" in buffer:
+            event_str, buffer = buffer.split("\n\n", 1)
+            for line in event_str.strip().split("\n"):
+                if line.startswith("data:"):
+                    count += 1
+    return count
+
+
+def decoder_parse(chunks) -> int:
+    count = 0
+    decoder = SSEDecoder()
+    for chunk in chunks:
+        count += len(decoder.feed(chunk))
+    count += len(decoder.flush())
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Cortex Agent SSE decoder")
+    parser.add_argument("--input", type=str, default=None, help="Recorded raw SSE stream")
+    parser.add_argument("--size-mb", type=float, default=4.0, help="Synthetic stream size")
+    parser.add_argument("--chunk", type=int, default=512, help="Bytes per network chunk")
+    args = parser.parse_args()
+
+    raw = Path(args.input).read_bytes() if args.input else synthesize_stream(args.size_mb)
+    # The legacy parser only understands LF framing
+    legacy_raw = raw.replace(b"\r\n", b"\n")
+
+    def chunked(data: bytes):
+        return [data[i:i + args.chunk] for i in range(0, len(data), args.chunk)]
+
+    print(f"Stream: {len(raw) / 1e6:.1f} MB in {args.chunk}-byte chunks")
+
+    for name, fn, data in [("SSEDecoder", decoder_parse, raw), ("legacy split", legacy_parse, legacy_raw)]:
+        chunks = chunked(data)
+        start = time.perf_counter()
+        events = fn(chunks)
+        elapsed = time.perf_counter() - start
+        print(f"  -> {name:<12} {events:>9,} events  {elapsed * 1000:8.1f} ms  "
+              f"{len(data) / 1e6 / elapsed:7.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+TERRA Cycle Time Feature Check
+
+Builds CYCLE_TIME_OPTIMIZER features for the request shapes that
+/api/cycle-time/predict has to accept and checks the time features:
+- rows mixing key case
+- CYCLE_START values with different UTC offsets in one batch
+- DataFrames with timezone-aware and naive start columns
+- unparseable or missing starts, which fall back to the given hour
+
+Usage:
+    python check_cycle_time_features.py
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "copilot" / "backend"))
+
+from services.cycle_time_predictor import feature_frame  # noqa: E402
+
+FALLBACK_HOUR = 3
+
+# (description, rows, expected HOUR_OF_DAY per row)
+CASES = [
+    (
+        "mixed key case",
+        [{"load_volume_yd3": 200, "cycle_start": "2026-10-18T08:15:00"},
+         {"LOAD_VOLUME_YD3": 190, "CYCLE_START": "2026-10-18T09:15:00"}],
+        [8, 9],
+    ),
+    (
+        "mixed UTC offsets (local hour per row)",
+        [{"cycle_start": "2026-10-18T10:00:00-07:00"},
+         {"cycle_start": "2026-10-18T17:00:00Z"},
+         {"cycle_start": "2026-10-18T12:30:00+05:30"}],
+        [10, 17, 12],
+    ),
+    (
+        "timezone-aware DataFrame column",
+        pd.DataFrame({"CYCLE_START": pd.to_datetime(["2026-10-18T17:00:00Z"]).tz_convert("America/Phoenix")}),
+        [10],
+    ),
+    (
+        "naive DataFrame column",
+        pd.DataFrame({"cycle_start": ["2026-10-18 06:30"]}),
+        [6],
+    ),
+    (
+        "unparseable and missing starts",
+        [{"cycle_start": "not a time"}, {"cycle_start": None}, {}],
+        [FALLBACK_HOUR] * 3,
+    ),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check cycle time feature building")
+    parser.parse_args()
+
+    failed = 0
+    for description, rows, expected in CASES:
+        try:
+            got = feature_frame(rows, hour=FALLBACK_HOUR)["HOUR_OF_DAY"].astype(int).tolist()
+        except Exception as e:
+            got = f"{type(e).__name__}: {e}"
+        ok = got == expected
+        failed += not ok
+        print(f"  {'ok  ' if ok else 'FAIL'} {description}: HOUR_OF_DAY {got} (expected {expected})")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,20 +7,39 @@ Generates realistic construction site data with:
 - Volume surveys with plan vs actual
 - Site documents for Cortex Search
 
+GPS breadcrumbs and telematics are generated with NumPy, shard by shard and
+day by day, and streamed into site_id/date partitions, so large load-test
+datasets are produced in bounded memory. Each run replaces the datasets in
+--output, and every partition ends up as a single part-00000 file.
+
 Usage:
     python generate_sample_data.py --output ./data --format parquet
+    python generate_sample_data.py --output ./data --single-file
+    python generate_sample_data.py --trucks 2000 --days 30 --workers 8
+    python generate_sample_data.py --trucks 500 --sites 20 --days 30 --seed 7
 """
 
 import argparse
 import json
+import math
 import random
+import shutil
+import sys
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "copilot" / "backend"))
+
+from services.spatial_grid import encode as grid_cell  # noqa: E402
 
 # ============================================================================
 # CONFIGURATION
@@ -53,14 +72,42 @@ CHOKE_POINTS = [
     {"name": "North Road Bend", "lat_offset": 0.004, "lng_offset": -0.002},
 ]
 
+# Trucks generated together from one RNG stream; fixed so output does not
+# depend on how the work is split up
+TRUCKS_PER_SHARD = 64
+
+# GPS/telematics are generated one window at a time per shard
+WINDOW_MINUTES = 24 * 60
+
+
+def build_sites(count: int = len(SITES)) -> List[Dict[str, Any]]:
+    """
+    Return `count` sites: the real Phoenix sites first, then synthetic sites
+    placed on rings around them for load tests.
+    """
+    sites = [dict(site) for site in SITES[:count]]
+    for i in range(len(sites), count):
+        base = SITES[i % len(SITES)]
+        ring = i // len(SITES)
+        angle = math.radians((i * 137.5) % 360)
+        lat = base["lat"] + 0.03 * ring * math.cos(angle)
+        lng = base["lng"] + 0.03 * ring * math.sin(angle)
+        sites.append({
+            "site_id": f"{base['site_id']}_{ring}",
+            "name": f"{base['name']} {ring + 1}",
+            "type": base["type"],
+            "lat": lat, "lng": lng, "center_lat": lat, "center_lng": lng,
+        })
+    return sites
+
 # ============================================================================
 # DATA GENERATORS
 # ============================================================================
 
-def generate_sites() -> pd.DataFrame:
+def generate_sites(sites: List[Dict[str, Any]] = SITES) -> pd.DataFrame:
     """Generate sites master data"""
     records = []
-    for site in SITES:
+    for site in sites:
         records.append({
             "site_id": site["site_id"],
             "site_name": site["name"],
@@ -76,15 +123,16 @@ def generate_sites() -> pd.DataFrame:
     return pd.DataFrame(records)
 
 
-def generate_equipment() -> pd.DataFrame:
-    """Generate equipment master data"""
+def generate_equipment(sites: List[Dict[str, Any]] = SITES, trucks: Optional[int] = None) -> pd.DataFrame:
+    """Generate equipment master data (`trucks` overrides the haul truck count)"""
     records = []
     eq_counter = 1
     
     for eq_type in EQUIPMENT_TYPES:
-        for i in range(eq_type["count"]):
+        count = trucks if trucks is not None and eq_type["type"] == "haul_truck" else eq_type["count"]
+        for i in range(count):
             # Distribute equipment across sites
-            site = SITES[eq_counter % len(SITES)]
+            site = sites[eq_counter % len(sites)]
             prefix = eq_type["type"][0].upper()
             
             records.append({
@@ -104,145 +152,240 @@ def generate_equipment() -> pd.DataFrame:
     return pd.DataFrame(records)
 
 
-def generate_gps_breadcrumbs(equipment_df: pd.DataFrame, hours: int = 24) -> pd.DataFrame:
+_HEX_PAIRS = np.frombuffer(b"".join(f"{i:02x}".encode() for i in range(256)), dtype=np.uint16)
+
+
+def random_uuids(rng: np.random.Generator, n: int) -> pd.Series:
+    """Random version-4 UUID strings, built as bytes without a Python call per row."""
+    raw = np.frombuffer(rng.bytes(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hexed = _HEX_PAIRS[raw].view(np.uint8)
+    out = np.empty((n, 36), dtype=np.uint8)
+    out[:, [8, 13, 18, 23]] = ord("-")
+    out[:, 0:8] = hexed[:, 0:8]
+    out[:, 9:13] = hexed[:, 8:12]
+    out[:, 14:18] = hexed[:, 12:16]
+    out[:, 19:23] = hexed[:, 16:20]
+    out[:, 24:36] = hexed[:, 20:32]
+    return pa.array(out.view("S36").ravel()).cast(pa.string()).to_pandas()
+
+
+def _haul_trucks(equipment_df: pd.DataFrame) -> pd.DataFrame:
+    return equipment_df[equipment_df["equipment_type"] == "haul_truck"].reset_index(drop=True)
+
+
+def iter_gps_telematics(
+    equipment_df: pd.DataFrame,
+    hours: int = 24,
+    sites: List[Dict[str, Any]] = SITES,
+    seed: int = 42,
+    end: Optional[datetime] = None,
+    shards: Optional[List[int]] = None,
+) -> Iterator[Tuple[pd.DataFrame, pd.DataFrame]]:
     """
-    Generate GPS breadcrumb data with realistic patterns including:
-    - Normal haul routes
-    - Ghost Cycles at choke points
-    - Varied speeds by segment
+    Generate GPS breadcrumbs and matching telematics in chunks.
+    
+    Haul trucks are split into shards of TRUCKS_PER_SHARD, each with its own
+    RNG seeded from (seed, shard index), and every shard is generated one
+    WINDOW_MINUTES window at a time. Yields one (gps_df, telematics_df) pair
+    per shard and window, so memory stays bounded however long the period.
+    
+    Args:
+        shards: Only generate these shard indices (default: all)
     """
-    records = []
-    now = datetime.now()
-    start_time = now - timedelta(hours=hours)
+    end = end or datetime.now()
+    start = np.datetime64(end - timedelta(hours=hours), "us")
+    trucks = _haul_trucks(equipment_df)
+    n_shards = math.ceil(len(trucks) / TRUCKS_PER_SHARD)
     
-    # Only generate for haul trucks
-    trucks = equipment_df[equipment_df["equipment_type"] == "haul_truck"]
+    for shard in (range(n_shards) if shards is None else shards):
+        shard_trucks = trucks.iloc[shard * TRUCKS_PER_SHARD:(shard + 1) * TRUCKS_PER_SHARD]
+        rng = np.random.default_rng([seed, shard])
+        state = _ShardState(shard_trucks, sites, hours * 60)
+        for window_end in range(WINDOW_MINUTES, hours * 60 + WINDOW_MINUTES, WINDOW_MINUTES):
+            gps_df = state.next_window(rng, start, min(window_end, hours * 60))
+            if len(gps_df):
+                yield gps_df, generate_telematics(gps_df, rng)
+
+
+class _ShardState:
+    """Per-truck cycle schedule carried from one window to the next"""
+    
+    def __init__(self, trucks: pd.DataFrame, sites: List[Dict[str, Any]], period_minutes: int):
+        self.period_minutes = period_minutes
+        centers = {s["site_id"]: (s["center_lat"], s["center_lng"]) for s in sites}
+        self.equipment_ids = trucks["equipment_id"].to_numpy()
+        self.site_ids = trucks["site_id"].to_numpy()
+        self.center = np.array([centers[site_id] for site_id in self.site_ids]).reshape(-1, 2)
+        # Minute offset (from the start of the period) of each truck's next cycle
+        self.next_start = np.zeros(len(trucks), dtype=np.int64)
     
-    for _, truck in trucks.iterrows():
-        site = next(s for s in SITES if s["site_id"] == truck["site_id"])
-        current_time = start_time
+    def next_window(self, rng: np.random.Generator, start: np.datetime64, window_end: int) -> pd.DataFrame:
+        """GPS rows for every cycle that starts before window_end (minutes)."""
+        n_trucks = len(self.next_start)
+        if n_trucks == 0:
+            return pd.DataFrame()
         
-        while current_time < now:
-            # Simulate a cycle (roughly 15-20 minutes)
-            cycle_duration = random.randint(12, 22)
-            
-            for minute in range(cycle_duration):
-                ts = current_time + timedelta(minutes=minute)
-                
-                # Determine if this is a choke point (ghost cycle candidate)
-                is_choke = random.random() < 0.15  # 15% chance at choke point
-                
-                if is_choke:
-                    # Ghost cycle pattern: slow movement, low engine load
-                    choke = random.choice(CHOKE_POINTS)
-                    lat = site["center_lat"] + choke["lat_offset"] + random.uniform(-0.0005, 0.0005)
-                    lng = site["center_lng"] + choke["lng_offset"] + random.uniform(-0.0005, 0.0005)
-                    speed = random.uniform(1, 5)  # Crawling speed
-                else:
-                    # Normal operation
-                    lat = site["center_lat"] + random.uniform(-0.01, 0.01)
-                    lng = site["center_lng"] + random.uniform(-0.01, 0.01)
-                    speed = random.uniform(8, 25)
-                
-                records.append({
-                    "breadcrumb_id": str(uuid.uuid4()),
-                    "equipment_id": truck["equipment_id"],
-                    "site_id": truck["site_id"],
-                    "timestamp": ts,
-                    "latitude": lat,
-                    "longitude": lng,
-                    "altitude_m": 340 + random.uniform(-5, 5),
-                    "speed_mph": speed,
-                    "heading_degrees": random.uniform(0, 360),
-                    "accuracy_m": random.uniform(1, 5),
-                    "created_at": datetime.now()
-                })
-            
-            current_time += timedelta(minutes=cycle_duration + random.randint(2, 8))
+        # Cycles of 12-22 one-minute breadcrumbs separated by 2-8 minute gaps.
+        # Every cycle + gap is >= 14 minutes, so k cycles per truck always
+        # reach past the window end.
+        k = max(1, math.ceil((window_end - self.next_start.min()) / 14) + 1)
+        duration = rng.integers(12, 23, size=(n_trucks, k))
+        step = duration + rng.integers(2, 9, size=(n_trucks, k))
+        starts = self.next_start[:, None] + np.cumsum(step, axis=1) - step
+        used = starts < window_end
+        self.next_start = starts[np.arange(n_trucks), used.sum(axis=1)]
+        
+        truck_idx, _ = np.nonzero(used)
+        cycle_start = starts[used]
+        cycle_len = duration[used]
+        n = int(cycle_len.sum())
+        row_truck = np.repeat(truck_idx, cycle_len)
+        minute = np.repeat(cycle_start, cycle_len) + (
+            np.arange(n) - np.repeat(np.cumsum(cycle_len) - cycle_len, cycle_len)
+        )
+        # The last cycle of the period is cut off at the end time
+        if window_end >= self.period_minutes:
+            keep = minute < self.period_minutes
+            row_truck, minute = row_truck[keep], minute[keep]
+            n = len(minute)
+        
+        # 15% of breadcrumbs crawl through a choke point (ghost cycle candidates)
+        is_choke = rng.random(n) < 0.15
+        choke_offsets = np.array([[c["lat_offset"], c["lng_offset"]] for c in CHOKE_POINTS])
+        choke = choke_offsets[rng.integers(0, len(CHOKE_POINTS), n)]
+        center = self.center[row_truck]
+        lat = center[:, 0] + np.where(
+            is_choke, choke[:, 0] + rng.uniform(-0.0005, 0.0005, n), rng.uniform(-0.01, 0.01, n)
+        )
+        lng = center[:, 1] + np.where(
+            is_choke, choke[:, 1] + rng.uniform(-0.0005, 0.0005, n), rng.uniform(-0.01, 0.01, n)
+        )
+        speed = np.where(is_choke, rng.uniform(1, 5, n), rng.uniform(8, 25, n))
+        
+        return pd.DataFrame({
+            "breadcrumb_id": random_uuids(rng, n),
+            "equipment_id": self.equipment_ids[row_truck],
+            "site_id": self.site_ids[row_truck],
+            "timestamp": start + minute.astype("timedelta64[m]"),
+            "latitude": lat,
+            "longitude": lng,
+            "altitude_m": 340 + rng.uniform(-5, 5, n),
+            "speed_mph": speed,
+            "heading_degrees": rng.uniform(0, 360, n),
+            "accuracy_m": rng.uniform(1, 5, n),
+            "grid_cell": grid_cell(lat, lng),
+            "created_at": np.datetime64(datetime.now(), "us"),
+        })
+
+
+def generate_gps_breadcrumbs(
+    equipment_df: pd.DataFrame,
+    hours: int = 24,
+    sites: List[Dict[str, Any]] = SITES,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """
+    Generate GPS breadcrumb data with realistic patterns including:
+    - Normal haul routes
+    - Ghost Cycles at choke points
+    - Varied speeds by segment
     
-    return pd.DataFrame(records)
+    Collects iter_gps_telematics in memory; use the iterator for large runs.
+    """
+    frames = [gps for gps, _ in iter_gps_telematics(equipment_df, hours, sites, seed)]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
 
-def generate_telematics(gps_df: pd.DataFrame) -> pd.DataFrame:
+def generate_telematics(gps_df: pd.DataFrame, rng: Optional[np.random.Generator] = None) -> pd.DataFrame:
     """
     Generate telematics data correlated with GPS.
     Key: Ghost Cycles show low engine load despite movement.
     """
-    records = []
+    rng = rng or np.random.default_rng()
+    n = len(gps_df)
+    speed = gps_df["speed_mph"].to_numpy()
     
-    for _, gps in gps_df.iterrows():
-        speed = gps["speed_mph"]
-        
-        # Determine engine load based on speed pattern
-        if speed < 5:
-            # Low speed - either loading/dumping (high load) or ghost cycle (low load)
-            is_ghost = random.random() < 0.6  # 60% of slow periods are ghost cycles
-            engine_load = random.uniform(15, 30) if is_ghost else random.uniform(60, 85)
-        else:
-            # Normal hauling
-            engine_load = random.uniform(55, 90)
-        
-        # Fuel rate correlates with engine load
-        fuel_rate = 15 + (engine_load / 100) * 35
-        
-        records.append({
-            "telematics_id": str(uuid.uuid4()),
-            "equipment_id": gps["equipment_id"],
-            "timestamp": gps["timestamp"],
-            "engine_load_percent": engine_load,
-            "fuel_rate_gph": fuel_rate + random.uniform(-2, 2),
-            "engine_rpm": int(800 + engine_load * 15 + random.uniform(-50, 50)),
-            "coolant_temp_f": random.uniform(180, 210),
-            "oil_pressure_psi": random.uniform(40, 60),
-            "transmission_gear": min(6, max(1, int(speed / 5) + 1)),
-            "payload_tons": random.uniform(180, 240) if engine_load > 50 else 0,
-            "created_at": datetime.now()
-        })
+    # Low speed is either loading/dumping (high load) or a ghost cycle (low load);
+    # 60% of slow periods are ghost cycles. Normal hauling runs at 55-90%.
+    is_ghost = rng.random(n) < 0.6
+    engine_load = np.where(
+        speed < 5,
+        np.where(is_ghost, rng.uniform(15, 30, n), rng.uniform(60, 85, n)),
+        rng.uniform(55, 90, n),
+    )
     
-    return pd.DataFrame(records)
+    # Fuel rate correlates with engine load
+    fuel_rate = 15 + (engine_load / 100) * 35
+    
+    return pd.DataFrame({
+        "telematics_id": random_uuids(rng, n),
+        "equipment_id": gps_df["equipment_id"].to_numpy(),
+        "timestamp": gps_df["timestamp"].to_numpy(),
+        "engine_load_percent": engine_load,
+        "fuel_rate_gph": fuel_rate + rng.uniform(-2, 2, n),
+        "engine_rpm": (800 + engine_load * 15 + rng.uniform(-50, 50, n)).astype(np.int64),
+        "coolant_temp_f": rng.uniform(180, 210, n),
+        "oil_pressure_psi": rng.uniform(40, 60, n),
+        "transmission_gear": np.clip((speed / 5).astype(np.int64) + 1, 1, 6),
+        "payload_tons": np.where(engine_load > 50, rng.uniform(180, 240, n), 0.0),
+        "created_at": np.datetime64(datetime.now(), "us"),
+    })
 
 
-def generate_cycle_events(equipment_df: pd.DataFrame, days: int = 7) -> pd.DataFrame:
-    """Generate load/dump cycle events"""
-    records = []
-    trucks = equipment_df[equipment_df["equipment_type"] == "haul_truck"]
+LOAD_ZONES = np.array(["Cut Zone A", "Cut Zone B", "Cut Zone C"], dtype=object)
+DUMP_ZONES = np.array(["Fill Zone 1", "Fill Zone 2", "Fill Zone 3"], dtype=object)
+
+
+def generate_cycle_events(
+    equipment_df: pd.DataFrame,
+    days: int = 7,
+    seed: int = 42,
+    end: Optional[datetime] = None,
+) -> pd.DataFrame:
+    """Generate load/dump cycle events: 8-12 cycles per truck per day from 06:00"""
+    rng = np.random.default_rng([seed, days])
+    trucks = _haul_trucks(equipment_df)
+    end = end or datetime.now()
+    first_day = np.datetime64(end.date(), "D") - (days - 1)
+    n_days = len(trucks) * days
     
-    for day in range(days):
-        date = datetime.now() - timedelta(days=day)
-        
-        for _, truck in trucks.iterrows():
-            # 8-12 cycles per day per truck
-            cycles_today = random.randint(8, 12)
-            
-            for c in range(cycles_today):
-                start = date.replace(hour=6) + timedelta(hours=c + random.uniform(0, 1))
-                duration = random.uniform(12, 22)  # minutes
-                
-                records.append({
-                    "cycle_id": str(uuid.uuid4()),
-                    "equipment_id": truck["equipment_id"],
-                    "site_id": truck["site_id"],
-                    "cycle_start": start,
-                    "cycle_end": start + timedelta(minutes=duration),
-                    "load_location": f"Cut Zone {random.choice(['A', 'B', 'C'])}",
-                    "dump_location": f"Fill Zone {random.choice(['1', '2', '3'])}",
-                    "load_volume_yd3": random.uniform(180, 240),
-                    "cycle_time_minutes": duration,
-                    "haul_distance_miles": random.uniform(0.5, 2.0),
-                    "fuel_consumed_gal": duration * random.uniform(0.4, 0.6),
-                    "created_at": datetime.now()
-                })
+    # One row per (day, truck), then one per cycle of that truck that day
+    day_truck = np.arange(n_days)
+    cycles_today = rng.integers(8, 13, n_days)
+    row = np.repeat(day_truck, cycles_today)
+    n = len(row)
+    c = np.arange(n) - np.repeat(np.cumsum(cycles_today) - cycles_today, cycles_today)
+    day, truck = np.divmod(row, max(len(trucks), 1))
     
-    return pd.DataFrame(records)
+    start_hours = 6 + c + rng.uniform(0, 1, n)
+    start = (first_day + day).astype("datetime64[us]") + (start_hours * 3600e6).astype("timedelta64[us]")
+    duration = rng.uniform(12, 22, n)  # minutes
+    
+    return pd.DataFrame({
+        "cycle_id": random_uuids(rng, n),
+        "equipment_id": trucks["equipment_id"].to_numpy()[truck],
+        "site_id": trucks["site_id"].to_numpy()[truck],
+        "cycle_start": start,
+        "cycle_end": start + (duration * 60e6).astype("timedelta64[us]"),
+        "load_location": LOAD_ZONES[rng.integers(0, len(LOAD_ZONES), n)],
+        "dump_location": DUMP_ZONES[rng.integers(0, len(DUMP_ZONES), n)],
+        "load_volume_yd3": rng.uniform(180, 240, n),
+        "cycle_time_minutes": duration,
+        "haul_distance_miles": rng.uniform(0.5, 2.0, n),
+        "fuel_consumed_gal": duration * rng.uniform(0.4, 0.6, n),
+        "created_at": np.datetime64(datetime.now(), "us"),
+    })
 
 
-def generate_volume_surveys(days: int = 14) -> pd.DataFrame:
+def generate_volume_surveys(days: int = 14, sites: List[Dict[str, Any]] = SITES) -> pd.DataFrame:
     """Generate volume survey data with plan vs actual"""
     records = []
     zones = ["Cut Zone North", "Cut Zone Central", "Cut Zone South", 
              "Fill Zone West", "Fill Zone East"]
     
-    for site in SITES:
+    for site in sites:
         for day in range(days):
             date = (datetime.now() - timedelta(days=days-1-day)).date()
             
@@ -427,6 +570,243 @@ def generate_documents() -> pd.DataFrame:
     return pd.DataFrame(records)
 
 
+# ============================================================================
+# OUTPUT
+# ============================================================================
+
+DEFAULT_ROW_GROUP_ROWS = 128 * 1024
+DEFAULT_COMPRESSION = "zstd"
+
+
+class ChunkWriter:
+    """Append DataFrame chunks to a single parquet or CSV file"""
+    
+    def __init__(self, path: Path, fmt: str, compression: str = DEFAULT_COMPRESSION,
+                 row_group_rows: int = DEFAULT_ROW_GROUP_ROWS):
+        self.path = path
+        self.fmt = fmt
+        self.compression = compression
+        self.row_group_rows = row_group_rows
+        self.rows = 0
+        self._writer = None
+    
+    def write(self, df: pd.DataFrame):
+        if self.fmt == "parquet":
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema, compression=self.compression)
+            self._writer.write_table(table, row_group_size=self.row_group_rows)
+        else:
+            df.to_csv(self.path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        self.rows += len(df)
+    
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class PartitionedWriter:
+    """
+    Stream DataFrame chunks into a Hive-partitioned dataset:
+    
+        <root>/site_id=<site>/date=<YYYY-MM-DD>/<file_prefix>-<n>.<format>
+    
+    Rows are buffered per partition and written as full row groups of
+    row_group_rows. At most max_open_files partitions are kept open; the least
+    recently written one is flushed and closed when another is needed (a later
+    chunk for it starts a new part file). Buffered rows are therefore bounded
+    by max_open_files * row_group_rows.
+    
+    The partition columns are stored in the directory names, not in the files.
+    Several writers may share a root with different file prefixes (one per
+    shard); merge_partitions() then combines each partition's parts.
+    """
+    
+    def __init__(self, root: Path, fmt: str, time_column: str = "timestamp",
+                 compression: str = DEFAULT_COMPRESSION, row_group_rows: int = DEFAULT_ROW_GROUP_ROWS,
+                 max_open_files: int = 32, file_prefix: str = "part"):
+        self.root = root
+        self.file_prefix = file_prefix
+        self.fmt = fmt
+        self.time_column = time_column
+        self.compression = compression
+        self.row_group_rows = row_group_rows
+        self.max_open_files = max_open_files
+        self.rows = 0
+        self.files = 0
+        # (site_id, date) -> [writer or None, buffered frames, buffered rows, path]
+        self._open: "OrderedDict[Tuple[str, str], list]" = OrderedDict()
+        self._parts: Dict[Tuple[str, str], int] = {}
+        # CSV part files this writer has started (later rows are appended)
+        self._started: set = set()
+    
+    def write(self, df: pd.DataFrame, site_ids: Optional[np.ndarray] = None):
+        """Write a chunk; site_ids overrides df["site_id"] for tables without one."""
+        if df.empty:
+            return
+        sites = np.asarray(site_ids) if site_ids is not None else df["site_id"].to_numpy()
+        dates = df[self.time_column].dt.strftime("%Y-%m-%d").to_numpy()
+        data = df.drop(columns=["site_id"], errors="ignore")
+        keys = pd.MultiIndex.from_arrays([sites, dates])
+        for (site, date), positions in pd.Series(np.arange(len(df))).groupby(keys, sort=False).indices.items():
+            self._append((site, date), data.iloc[positions])
+        self.rows += len(df)
+    
+    def _append(self, key: Tuple[str, str], df: pd.DataFrame):
+        entry = self._open.get(key)
+        if entry is None:
+            while len(self._open) >= self.max_open_files:
+                old_key, old_entry = self._open.popitem(last=False)
+                self._flush(old_entry, final=True)
+            part = self._parts.get(key, 0)
+            self._parts[key] = part + 1
+            directory = self.root / f"site_id={key[0]}" / f"date={key[1]}"
+            directory.mkdir(parents=True, exist_ok=True)
+            entry = [None, [], 0, directory / f"{self.file_prefix}-{part:05d}.{self.fmt}"]
+            self._open[key] = entry
+            self.files += 1
+        self._open.move_to_end(key)
+        entry[1].append(df)
+        entry[2] += len(df)
+        if entry[2] >= self.row_group_rows:
+            self._flush(entry, final=False)
+    
+    def _flush(self, entry: list, final: bool):
+        """Write buffered rows as full row groups (and the remainder when final)."""
+        if not entry[1]:
+            if final and entry[0] is not None:
+                entry[0].close()
+            return
+        buffered = pd.concat(entry[1], ignore_index=True) if len(entry[1]) > 1 else entry[1][0]
+        cut = len(buffered) if final else len(buffered) - len(buffered) % self.row_group_rows
+        if cut:
+            self._write_rows(entry, buffered.iloc[:cut])
+        remainder = buffered.iloc[cut:]
+        entry[1] = [remainder] if len(remainder) else []
+        entry[2] = len(remainder)
+        if final and entry[0] is not None:
+            entry[0].close()
+    
+    def _write_rows(self, entry: list, df: pd.DataFrame):
+        if self.fmt == "parquet":
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if entry[0] is None:
+                entry[0] = pq.ParquetWriter(entry[3], table.schema, compression=self.compression)
+            entry[0].write_table(table, row_group_size=self.row_group_rows)
+        else:
+            # A part file left by an earlier run is overwritten, not appended to
+            started = entry[3] in self._started
+            df.to_csv(entry[3], mode="a" if started else "w", header=not started, index=False)
+            self._started.add(entry[3])
+    
+    def close(self):
+        while self._open:
+            _, entry = self._open.popitem(last=False)
+            self._flush(entry, final=True)
+
+
+# ============================================================================
+# SHARDED GENERATION
+# ============================================================================
+
+SHARD_TABLES = ("gps_breadcrumbs", "equipment_telematics")
+
+
+def generate_shard(job: Dict[str, Any]) -> Tuple[int, int]:
+    """
+    Generate and write GPS + telematics for one truck shard.
+    
+    Runs in a worker process. Each shard has its own seed and its own output
+    files, so the data is identical whatever the worker count.
+    
+    Returns:
+        (shard index, rows written per table)
+    """
+    shard = job["shard"]
+    fmt = job["format"]
+    if job["single_file"]:
+        # Merged into one file per table by the parent, in shard order
+        shard_dir = job["output_dir"] / ".shards"
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        writers = {
+            name: ChunkWriter(shard_dir / f"{name}-{shard:05d}.{fmt}", fmt,
+                              job["compression"], job["row_group_rows"])
+            for name in SHARD_TABLES
+        }
+    else:
+        writers = {
+            name: PartitionedWriter(job["output_dir"] / name, fmt, "timestamp", job["compression"],
+                                    job["row_group_rows"], file_prefix=f"part-s{shard:05d}")
+            for name in SHARD_TABLES
+        }
+    
+    try:
+        for gps_df, telematics_df in iter_gps_telematics(
+            job["equipment_df"], job["hours"], job["sites"], job["seed"], job["end"], shards=[shard]
+        ):
+            if job["single_file"]:
+                writers["equipment_telematics"].write(telematics_df)
+            else:
+                # Telematics rows carry no site_id; partition them like their GPS rows
+                writers["equipment_telematics"].write(telematics_df, site_ids=gps_df["site_id"].to_numpy())
+            writers["gps_breadcrumbs"].write(gps_df)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return shard, writers["gps_breadcrumbs"].rows
+
+
+def merge_shard_files(output_dir: Path, name: str, fmt: str, shards: int,
+                      compression: Optional[str], row_group_rows: int):
+    """Concatenate per-shard files into <name>.<fmt>, streaming row groups in shard order."""
+    shard_dir = output_dir / ".shards"
+    paths = [shard_dir / f"{name}-{shard:05d}.{fmt}" for shard in range(shards)]
+    concat_files([path for path in paths if path.exists()], output_dir / f"{name}.{fmt}",
+                 fmt, compression, row_group_rows)
+
+
+def merge_partitions(root: Path, fmt: str, compression: Optional[str], row_group_rows: int):
+    """Combine the part files of every site_id/date partition under root into part-00000."""
+    for directory in sorted(root.glob("site_id=*/date=*")):
+        parts = sorted(directory.glob(f"part-*.{fmt}"))
+        target = directory / f"part-00000.{fmt}"
+        if len(parts) == 1:
+            parts[0].rename(target)
+        elif parts:
+            merged = directory / f".merging.{fmt}"
+            concat_files(parts, merged, fmt, compression, row_group_rows)
+            merged.rename(target)
+
+
+def concat_files(paths: List[Path], target: Path, fmt: str, compression: Optional[str],
+                 row_group_rows: int):
+    """Concatenate parquet/CSV files with the same schema into target and delete them."""
+    if fmt == "parquet":
+        writer = None
+        try:
+            for path in paths:
+                source = pq.ParquetFile(path)
+                if writer is None:
+                    writer = pq.ParquetWriter(target, source.schema_arrow, compression=compression)
+                for group in range(source.num_row_groups):
+                    writer.write_table(source.read_row_group(group), row_group_size=row_group_rows)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(target, "w") as out:
+            for i, path in enumerate(paths):
+                with open(path) as f:
+                    header = f.readline()
+                    if i == 0:
+                        out.write(header)
+                    for line in f:
+                        out.write(line)
+    
+    for path in paths:
+        path.unlink()
+
+
 # ============================================================================
 # MAIN
 # ============================================================================
@@ -436,31 +816,45 @@ def main():
     parser.add_argument("--output", type=str, default="./data", help="Output directory")
     parser.add_argument("--format", type=str, choices=["parquet", "csv"], default="parquet")
     parser.add_argument("--hours", type=int, default=24, help="Hours of GPS data to generate")
+    parser.add_argument("--days", type=int, default=None,
+                        help="Days of GPS data (overrides --hours) and of cycle events (default 7)")
+    parser.add_argument("--trucks", type=int, default=None, help="Haul trucks to simulate (default 30)")
+    parser.add_argument("--sites", type=int, default=len(SITES), help="Sites to simulate")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--single-file", action="store_true",
+                        help="Write one file per table instead of site_id/date partitions")
+    parser.add_argument("--row-group-rows", type=int, default=DEFAULT_ROW_GROUP_ROWS,
+                        help="Parquet row group size")
+    parser.add_argument("--compression", type=str, default=DEFAULT_COMPRESSION,
+                        choices=["zstd", "snappy", "gzip", "none"], help="Parquet compression codec")
+    parser.add_argument("--end", type=str, default=None,
+                        help="End of the GPS period, ISO format (default now); fix it for reproducible runs")
+    parser.add_argument("--workers", type=int, default=1,
+                        help=f"Processes generating GPS/telematics ({TRUCKS_PER_SHARD} trucks per shard)")
     args = parser.parse_args()
     
+    hours = args.days * 24 if args.days is not None else args.hours
+    random.seed(args.seed)
+    end = datetime.fromisoformat(args.end) if args.end else datetime.now()
+    
     output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
     
     print("Generating TERRA sample data...")
     
     # Generate data
+    sites = build_sites(args.sites)
     print("  -> Sites...")
-    sites_df = generate_sites()
+    sites_df = generate_sites(sites)
     
     print("  -> Equipment...")
-    equipment_df = generate_equipment()
-    
-    print("  -> GPS Breadcrumbs (this may take a moment)...")
-    gps_df = generate_gps_breadcrumbs(equipment_df, hours=args.hours)
-    
-    print("  -> Equipment Telematics...")
-    telematics_df = generate_telematics(gps_df)
+    equipment_df = generate_equipment(sites, trucks=args.trucks)
     
     print("  -> Cycle Events...")
-    cycles_df = generate_cycle_events(equipment_df)
+    cycles_df = generate_cycle_events(equipment_df, days=args.days or 7, seed=args.seed, end=end)
     
     print("  -> Volume Surveys...")
-    volumes_df = generate_volume_surveys()
+    volumes_df = generate_volume_surveys(sites=sites)
     
     print("  -> Site Documents...")
     documents_df = generate_documents()
@@ -468,26 +862,77 @@ def main():
     # Save data
     print(f"\nSaving data to {output_dir} as {args.format}...")
     
+    compression = None if args.compression == "none" else args.compression
+    
     datasets = {
         "sites": sites_df,
         "equipment": equipment_df,
-        "gps_breadcrumbs": gps_df,
-        "equipment_telematics": telematics_df,
-        "cycle_events": cycles_df,
         "volume_surveys": volumes_df,
         "site_documents": documents_df,
     }
     
     for name, df in datasets.items():
         if args.format == "parquet":
-            df.to_parquet(output_dir / f"{name}.parquet", index=False)
+            df.to_parquet(output_dir / f"{name}.parquet", index=False, compression=compression)
         else:
             df.to_csv(output_dir / f"{name}.csv", index=False)
         print(f"  -> {name}: {len(df):,} rows")
     
+    def open_writer(name: str, time_column: str = "timestamp"):
+        if args.single_file:
+            return ChunkWriter(output_dir / f"{name}.{args.format}", args.format,
+                               compression, args.row_group_rows)
+        return PartitionedWriter(output_dir / name, args.format, time_column,
+                                 compression, args.row_group_rows)
+    
+    # Re-running into the same --output replaces the datasets instead of
+    # adding part files next to the previous run's
+    for name in ("cycle_events",) + SHARD_TABLES + (".shards",):
+        shutil.rmtree(output_dir / name, ignore_errors=True)
+    
+    cycles_writer = open_writer("cycle_events", time_column="cycle_start")
+    cycles_writer.write(cycles_df)
+    cycles_writer.close()
+    print(f"  -> cycle_events: {cycles_writer.rows:,} rows")
+    
+    # GPS and telematics are generated per truck shard and streamed to disk
+    n_shards = math.ceil(len(_haul_trucks(equipment_df)) / TRUCKS_PER_SHARD)
+    workers = max(1, min(args.workers, n_shards))
+    print(f"  -> GPS Breadcrumbs + Equipment Telematics ({len(_haul_trucks(equipment_df))} trucks, "
+          f"{hours} hours, {n_shards} shard(s) on {workers} worker(s))...")
+    jobs = [{
+        "shard": shard,
+        "equipment_df": equipment_df,
+        "sites": sites,
+        "hours": hours,
+        "seed": args.seed,
+        "end": end,
+        "output_dir": output_dir,
+        "format": args.format,
+        "compression": compression,
+        "row_group_rows": args.row_group_rows,
+        "single_file": args.single_file,
+    } for shard in range(n_shards)]
+    
+    if workers == 1:
+        results = [generate_shard(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(generate_shard, jobs))
+    total_rows = sum(rows for _, rows in results)
+    
+    if args.single_file and n_shards:
+        for name in SHARD_TABLES:
+            merge_shard_files(output_dir, name, args.format, n_shards, compression, args.row_group_rows)
+        (output_dir / ".shards").rmdir()
+    elif not args.single_file:
+        # One file per partition instead of one per shard and writer flush
+        for name in ("cycle_events",) + SHARD_TABLES:
+            merge_partitions(output_dir / name, args.format, compression, args.row_group_rows)
+    
     print(f"\nData generation complete!")
-    print(f"Total GPS breadcrumbs: {len(gps_df):,}")
-    print(f"Total telematics records: {len(telematics_df):,}")
+    print(f"Total GPS breadcrumbs: {total_rows:,}")
+    print(f"Total telematics records: {total_rows:,}")
 
 
 if __name__ == "__main__":
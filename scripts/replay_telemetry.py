@@ -0,0 +1,259 @@
+"""
+TERRA Telemetry Replay Simulator
+
+Replays GPS breadcrumbs + telematics as live events, in real time or N times
+faster, so /ws/realtime/{site_id} and alerting can be load-tested with
+hundreds of trucks without Snowflake.
+
+Events are read from generate_sample_data.py output (partitioned or
+--single-file) or generated on the fly, merged into one time-ordered stream
+and sent in batches to a sink:
+
+    http://host:port/api/ingest/telemetry   POST JSON batches to the backend
+    tcp://host:port                         JSON lines to a local socket
+    -                                       JSON lines to stdout
+
+Each event is stamped with the wall-clock time it is sent; the recorded
+time is kept as source_timestamp.
+
+Usage:
+    python replay_telemetry.py --input ./data --speed 60 --sink http://localhost:8000/api/ingest/telemetry
+    python replay_telemetry.py --generate --trucks 500 --speed 10 --sink tcp://localhost:9000
+"""
+
+import argparse
+import json
+import math
+import socket
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import generate_sample_data as gen  # noqa: E402
+
+EVENT_COLUMNS = [
+    "equipment_id", "site_id", "timestamp", "latitude", "longitude", "speed_mph",
+    "heading_degrees", "engine_load_percent", "fuel_rate_gph", "payload_tons",
+]
+
+
+# ============================================================================
+# SOURCES - yield time-ordered DataFrames of EVENT_COLUMNS
+# ============================================================================
+
+def _open_dataset(root: Path, name: str) -> ds.Dataset:
+    directory = root / name
+    if directory.is_dir():
+        return ds.dataset(directory, partitioning="hive")
+    return ds.dataset(root / f"{name}.parquet")
+
+
+def read_recorded(root: Path, window_minutes: int) -> Iterator[pd.DataFrame]:
+    """Read generated parquet one time window at a time (partition/row-group pruned)."""
+    gps = _open_dataset(root, "gps_breadcrumbs")
+    telematics = _open_dataset(root, "equipment_telematics")
+
+    # Period bounds from row group statistics, without scanning the data
+    lo, hi = None, None
+    for fragment in gps.get_fragments():
+        fragment.ensure_complete_metadata()
+        for row_group in fragment.row_groups:
+            stats = row_group.statistics.get("timestamp")
+            if stats:
+                lo = stats["min"] if lo is None else min(lo, stats["min"])
+                hi = stats["max"] if hi is None else max(hi, stats["max"])
+    if lo is None:
+        return
+
+    window = timedelta(minutes=window_minutes)
+    start = pd.Timestamp(lo).floor("min").to_pydatetime()
+    while start <= hi:
+        end = start + window
+        time_filter = (ds.field("timestamp") >= start) & (ds.field("timestamp") < end)
+        g = gps.to_table(filter=time_filter).to_pandas()
+        if len(g):
+            t = telematics.to_table(
+                filter=time_filter,
+                columns=["equipment_id", "timestamp", "engine_load_percent", "fuel_rate_gph", "payload_tons"],
+            ).to_pandas()
+            events = g.merge(t, on=["equipment_id", "timestamp"], how="left")
+            yield events[EVENT_COLUMNS].sort_values("timestamp", kind="stable")
+        start = end
+
+
+def generate_live(trucks: Optional[int], sites: int, hours: int, seed: int) -> Iterator[pd.DataFrame]:
+    """Generate on the fly, advancing every truck shard one window at a time."""
+    site_list = gen.build_sites(sites)
+    equipment_df = gen.generate_equipment(site_list, trucks=trucks)
+    haul = gen._haul_trucks(equipment_df)
+    start = np.datetime64(datetime.now() - timedelta(hours=hours), "us")
+
+    shards = []
+    for shard in range(math.ceil(len(haul) / gen.TRUCKS_PER_SHARD)):
+        shard_trucks = haul.iloc[shard * gen.TRUCKS_PER_SHARD:(shard + 1) * gen.TRUCKS_PER_SHARD]
+        shards.append((np.random.default_rng([seed, shard]), gen._ShardState(shard_trucks, site_list, hours * 60)))
+
+    for window_end in range(gen.WINDOW_MINUTES, hours * 60 + gen.WINDOW_MINUTES, gen.WINDOW_MINUTES):
+        frames = []
+        for rng, state in shards:
+            g = state.next_window(rng, start, min(window_end, hours * 60))
+            if len(g):
+                t = gen.generate_telematics(g, rng)
+                frames.append(pd.concat(
+                    [g, t[["engine_load_percent", "fuel_rate_gph", "payload_tons"]]], axis=1
+                ))
+        if frames:
+            yield pd.concat(frames, ignore_index=True)[EVENT_COLUMNS].sort_values("timestamp", kind="stable")
+
+
+# ============================================================================
+# SINKS
+# ============================================================================
+
+class StdoutSink:
+    def send(self, events: List[Dict[str, Any]]):
+        sys.stdout.write("".join(json.dumps(e) + "\n" for e in events))
+
+    def close(self):
+        sys.stdout.flush()
+
+
+class TcpSink:
+    """JSON lines over a TCP socket (e.g. a local queue or streaming detector)"""
+
+    def __init__(self, host: str, port: int):
+        self.sock = socket.create_connection((host, port))
+
+    def send(self, events: List[Dict[str, Any]]):
+        self.sock.sendall("".join(json.dumps(e) + "\n" for e in events).encode())
+
+    def close(self):
+        self.sock.close()
+
+
+class HttpSink:
+    """POST JSON batches to the backend ingest endpoint"""
+
+    def __init__(self, url: str):
+        import httpx
+        self.url = url
+        self.client = httpx.Client(timeout=10.0)
+        self.errors = 0
+
+    def send(self, events: List[Dict[str, Any]]):
+        try:
+            self.client.post(self.url, json=events).raise_for_status()
+        except Exception as e:
+            self.errors += 1
+            print(f"  ! ingest failed: {e}", file=sys.stderr)
+
+    def close(self):
+        self.client.close()
+
+
+def open_sink(target: str):
+    if target == "-":
+        return StdoutSink()
+    if target.startswith("tcp://"):
+        host, port = target[len("tcp://"):].rsplit(":", 1)
+        return TcpSink(host, int(port))
+    if target.startswith(("http://", "https://")):
+        return HttpSink(target)
+    raise ValueError(f"Unsupported sink: {target}")
+
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+def to_events(batch: pd.DataFrame, sent_at: str) -> List[Dict[str, Any]]:
+    records = batch.assign(
+        source_timestamp=batch["timestamp"].dt.strftime("%Y-%m-%dT%H:%M:%S"),
+        timestamp=sent_at,
+    )
+    records = records.astype(object).where(records.notna(), None)
+    return records.to_dict("records")
+
+
+def replay(frames: Iterator[pd.DataFrame], sink, speed: float, batch_size: int,
+           duration: Optional[float], max_events: Optional[int], report_every: float = 5.0):
+    """Send events so that recorded time advances `speed` times faster than wall time."""
+    wall_start = time.monotonic()
+    source_start = None
+    sent = 0
+    max_lag = 0.0
+    last_report = wall_start
+
+    for frame in frames:
+        for ts, tick in frame.groupby("timestamp", sort=False):
+            if source_start is None:
+                source_start = ts
+            due = wall_start + (ts - source_start).total_seconds() / speed
+            now = time.monotonic()
+            if due > now:
+                time.sleep(due - now)
+            else:
+                max_lag = max(max_lag, now - due)
+
+            sent_at = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            for i in range(0, len(tick), batch_size):
+                sink.send(to_events(tick.iloc[i:i + batch_size], sent_at))
+            sent += len(tick)
+
+            now = time.monotonic()
+            if now - last_report >= report_every:
+                elapsed = now - wall_start
+                print(f"  -> {sent:,} events  {sent / elapsed:,.0f} events/s  "
+                      f"replay time {ts}  max lag {max_lag:.2f}s", file=sys.stderr)
+                last_report = now
+            if (duration and now - wall_start >= duration) or (max_events and sent >= max_events):
+                return sent, time.monotonic() - wall_start
+    return sent, time.monotonic() - wall_start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay TERRA telemetry as live events")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", type=str, help="generate_sample_data.py output directory")
+    source.add_argument("--generate", action="store_true", help="Generate events on the fly")
+    parser.add_argument("--trucks", type=int, default=None, help="Haul trucks when generating (default 30)")
+    parser.add_argument("--sites", type=int, default=len(gen.SITES), help="Sites when generating")
+    parser.add_argument("--hours", type=int, default=24, help="Hours of data when generating")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed when generating")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (1 = real time)")
+    parser.add_argument("--sink", type=str, default="-", help="http(s):// ingest URL, tcp://host:port or - for stdout")
+    parser.add_argument("--batch-size", type=int, default=500, help="Events per send")
+    parser.add_argument("--window-minutes", type=int, default=60, help="Recorded data read per step")
+    parser.add_argument("--duration", type=float, default=None, help="Stop after this many wall seconds")
+    parser.add_argument("--max-events", type=int, default=None, help="Stop after this many events")
+    args = parser.parse_args()
+
+    if args.generate:
+        frames = generate_live(args.trucks, args.sites, args.hours, args.seed)
+    else:
+        frames = read_recorded(Path(args.input), args.window_minutes)
+
+    sink = open_sink(args.sink)
+    print(f"Replaying at {args.speed:g}x into {args.sink}...", file=sys.stderr)
+    try:
+        sent, elapsed = replay(frames, sink, args.speed, args.batch_size, args.duration, args.max_events)
+    except KeyboardInterrupt:
+        sent, elapsed = None, None
+    finally:
+        sink.close()
+
+    if sent is not None:
+        print(f"\nReplay complete: {sent:,} events in {elapsed:.1f}s "
+              f"({sent / max(elapsed, 1e-9):,.0f} events/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()